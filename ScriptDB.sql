@@ -2,6 +2,11 @@
 -- SCRIPT OPTIMIZADO: BASE DE DATOS AEROPUERTO IOT v2.0
 -- SISTEMA DE REGISTRO Y ACCESO CON RFID + BIOMETRIA
 -- Solo campos necesarios para el proyecto
+--
+-- BORRA Y RECREA la BD con el esquema inicial (version 1).
+-- Cambios posteriores del esquema viven en backend/migraciones/;
+-- despues de este script ejecutar:  cd backend && python migrar.py
+-- Para un sistema en produccion usar SOLO migrar.py.
 -- -----------------------------------------------------
 
 DROP DATABASE IF EXISTS aeropuerto;
@@ -0,0 +1,531 @@
+"""
+almacen_embeddings.py - Almacen de embeddings en disco, mapeado en memoria
+SmartPort v2.0
+
+Guarda los embeddings faciales de pasajeros en archivos binarios planos
+que cada proceso (workers Flask, kioskos, scripts) mapea con np.memmap.
+El sistema operativo comparte las paginas entre procesos y un reinicio
+no tiene que releer ni deserializar la tabla pasajeros.
+
+Archivos en ALMACEN_DIR:
+- matriz.f32   (capacidad, 128) float32 C-contiguo
+- ids.i64      (capacidad,) id_pasajero de cada fila
+- versiones.i64 (capacidad,) fecha_actualizacion en microsegundos
+- validos.bits (capacidad/8,) bitmap de filas con embedding vigente
+- meta.json    filas usadas, capacidad, generacion y cursor de sync
+               (ultima_sync, ultimo_id)
+
+Un solo proceso escribe (el que obtiene almacen.lock); el resto mapea en
+solo lectura y vuelve a abrir cuando cambia la generacion en meta.json.
+La sincronizacion es incremental por keyset sobre
+(pasajeros.fecha_actualizacion, id_pasajero) (migracion 004). Cada
+pasada vuelve a leer SYNC_MARGEN segundos antes del cursor: una
+transaccion que fija fecha_actualizacion y confirma despues de la
+pasada anterior queda detras del cursor y sin el margen se perderia.
+Las filas ya aplicadas se reconocen por version y no se reescriben.
+"""
+
+import fcntl
+import json
+import os
+import pickle
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from db import get_db_connection
+
+ALMACEN_DIR = os.environ.get(
+    "SMARTPORT_EMBEDDINGS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "embeddings")
+)
+DIMENSION = 128
+ESCRIBIENDO = -1  # Version marcada mientras el escritor reemplaza un vector
+LECTURA_INTENTOS = 3
+CAPACIDAD_INICIAL = 1024
+SYNC_LOTE = 1000
+SYNC_INTERVALO = float(os.environ.get("SMARTPORT_EMBEDDINGS_INTERVALO", "10"))
+# Mayor que la transaccion mas larga que actualiza pasajeros
+SYNC_MARGEN = float(os.environ.get("SMARTPORT_EMBEDDINGS_MARGEN", "30"))
+
+ARCHIVOS = {
+    'matriz': ('matriz.f32', np.float32),
+    'ids': ('ids.i64', np.int64),
+    'versiones': ('versiones.i64', np.int64),
+    'validos': ('validos.bits', np.uint8),
+}
+
+def _ruta(nombre):
+    return os.path.join(ALMACEN_DIR, nombre)
+
+def _forma(clave, capacidad):
+    """Forma de cada archivo para una capacidad dada"""
+    if clave == 'matriz':
+        return (capacidad, DIMENSION)
+    if clave == 'validos':
+        return ((capacidad + 7) // 8,)
+    return (capacidad,)
+
+def _a_microsegundos(fecha):
+    """datetime de MySQL -> entero (microsegundos desde epoch)"""
+    return int(round(fecha.timestamp() * 1_000_000))
+
+def _inicio_ventana(ultima_sync):
+    """Inicio del keyset de sincronizar(): el cursor menos SYNC_MARGEN"""
+    if not ultima_sync:
+        return '1970-01-01 00:00:00'
+    inicio = datetime.fromisoformat(ultima_sync) - timedelta(seconds=SYNC_MARGEN)
+    return inicio.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+def _clave_cursor(ultima_sync, ultimo_id):
+    """(fecha, id) comparable del cursor de sync (None = nunca sincronizado)"""
+    if not ultima_sync:
+        return (datetime.min, 0)
+    return (datetime.fromisoformat(ultima_sync), ultimo_id or 0)
+
+def _leer_meta():
+    try:
+        with open(_ruta('meta.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _escribir_meta(meta):
+    """Reemplazo atomico: los lectores ven el meta anterior o el nuevo"""
+    temporal = _ruta('meta.json.tmp')
+    with open(temporal, 'w') as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, _ruta('meta.json'))
+
+class AlmacenEmbeddings:
+    """
+    Vista mapeada del almacen de embeddings
+
+    Args:
+        escritura: True solo en el proceso que sincroniza desde la BD
+    """
+
+    def __init__(self, escritura=False):
+        self.escritura = escritura
+        self.meta = None
+        self.mapas = {}
+        self.indice = {}  # id_pasajero -> fila
+        self._lock = threading.Lock()
+
+    # ========================================
+    # APERTURA Y CRECIMIENTO
+    # ========================================
+
+    def _crear(self, capacidad):
+        """Crear archivos vacios (solo escritor)"""
+        os.makedirs(ALMACEN_DIR, exist_ok=True)
+        for clave, (nombre, dtype) in ARCHIVOS.items():
+            mapa = np.memmap(_ruta(nombre), dtype=dtype, mode='w+', shape=_forma(clave, capacidad))
+            mapa.flush()
+            del mapa
+        _escribir_meta({
+            'filas': 0,
+            'capacidad': capacidad,
+            'dimension': DIMENSION,
+            'generacion': 1,
+            'ultima_sync': None,
+            'ultimo_id': 0
+        })
+
+    def _mapear(self, meta):
+        modo = 'r+' if self.escritura else 'r'
+        self.mapas = {
+            clave: np.memmap(_ruta(nombre), dtype=dtype, mode=modo,
+                             shape=_forma(clave, meta['capacidad']))
+            for clave, (nombre, dtype) in ARCHIVOS.items()
+        }
+        self.meta = meta
+        filas = meta['filas']
+        self.indice = {int(i): fila for fila, i in enumerate(self.mapas['ids'][:filas])}
+
+    def abrir(self):
+        """
+        Mapear los archivos (o crearlos si es el escritor y no existen)
+
+        Returns:
+            bool: True si el almacen quedo disponible
+        """
+        with self._lock:
+            meta = _leer_meta()
+            if meta is None:
+                if not self.escritura:
+                    return False
+                self._crear(CAPACIDAD_INICIAL)
+                meta = _leer_meta()
+            if meta.get('dimension') != DIMENSION:
+                print(f"[EMBEDDINGS] Dimension {meta.get('dimension')} incompatible - se ignora el almacen")
+                return False
+            self._mapear(meta)
+            return True
+
+    def recargar_si_cambio(self):
+        """
+        Volver a mapear si el escritor crecio los archivos o agrego filas
+
+        En el escritor no hace nada: su meta en memoria va por delante de
+        meta.json entre lotes de sincronizar(), y volver al del disco
+        reutilizaria filas ya asignadas a otros pasajeros.
+        """
+        if self.escritura and self.meta is not None:
+            return True
+        meta = _leer_meta()
+        if meta is None:
+            return False
+        if self.meta is None or meta['generacion'] != self.meta['generacion']:
+            with self._lock:
+                self._mapear(meta)
+        elif meta['filas'] > self.meta['filas']:
+            with self._lock:
+                for fila in range(self.meta['filas'], meta['filas']):
+                    self.indice[int(self.mapas['ids'][fila])] = fila
+                self.meta = meta
+        return True
+
+    def _crecer(self, minimo):
+        """
+        Duplicar la capacidad copiando a archivos nuevos y renombrando
+
+        Los lectores conservan el mapeo del archivo anterior (mismo inodo)
+        hasta que ven la nueva generacion en meta.json.
+        """
+        capacidad = max(self.meta['capacidad'] * 2, minimo)
+        filas = self.meta['filas']
+        for clave, (nombre, dtype) in ARCHIVOS.items():
+            temporal = _ruta(nombre + '.tmp')
+            nuevo = np.memmap(temporal, dtype=dtype, mode='w+', shape=_forma(clave, capacidad))
+            usados = (filas + 7) // 8 if clave == 'validos' else filas
+            nuevo[:usados] = self.mapas[clave][:usados]
+            nuevo.flush()
+            del nuevo
+            os.replace(temporal, _ruta(nombre))
+        meta = dict(self.meta, capacidad=capacidad, generacion=self.meta['generacion'] + 1)
+        _escribir_meta(meta)
+        self._mapear(meta)
+        print(f"[EMBEDDINGS] Capacidad ampliada a {capacidad} filas")
+
+    # ========================================
+    # BITMAP DE VALIDEZ
+    # ========================================
+
+    def _es_valida(self, fila):
+        return bool(self.mapas['validos'][fila >> 3] & (0x80 >> (fila & 7)))
+
+    def _marcar(self, fila, valida):
+        if valida:
+            self.mapas['validos'][fila >> 3] |= (0x80 >> (fila & 7))
+        else:
+            self.mapas['validos'][fila >> 3] &= ~np.uint8(0x80 >> (fila & 7))
+
+    # ========================================
+    # CONSULTAS (cualquier proceso)
+    # ========================================
+
+    def obtener(self, id_pasajero, version_minima=None):
+        """
+        Embedding de un pasajero sin tocar la BD
+
+        Args:
+            id_pasajero: ID del pasajero
+            version_minima: datetime fecha_actualizacion leida de la BD;
+                si el almacen tiene una version anterior se considera obsoleto
+
+        Returns:
+            np.ndarray: Copia (128,) float32, o None (la BD decide)
+        """
+        if self.meta is None:
+            return None
+        fila = self.indice.get(int(id_pasajero))
+        if fila is None or not self._es_valida(fila):
+            return None
+
+        # El escritor puede reemplazar el vector mientras se copia (otro
+        # proceso, sin lock comun): la version antes y despues debe coincidir
+        versiones = self.mapas['versiones']
+        for _ in range(LECTURA_INTENTOS):
+            version = int(versiones[fila])
+            if version == ESCRIBIENDO:
+                continue
+            embedding = np.array(self.mapas['matriz'][fila])
+            if int(versiones[fila]) != version:
+                continue
+            if version_minima is not None and version < _a_microsegundos(version_minima):
+                return None
+            return embedding
+        return None
+
+    def matriz_valida(self):
+        """
+        Todas las plantillas vigentes para comparacion 1:N (similitud.py)
+
+        Returns:
+            tuple: (ids (K,) int64, matriz (K,128) float32)
+        """
+        if self.meta is None:
+            return np.empty(0, dtype=np.int64), np.empty((0, DIMENSION), dtype=np.float32)
+        filas = self.meta['filas']
+        mascara = np.unpackbits(self.mapas['validos'])[:filas].astype(bool)
+        return self.mapas['ids'][:filas][mascara], self.mapas['matriz'][:filas][mascara]
+
+    def precargar(self, ids_pasajeros):
+        """
+        Traer a memoria las paginas de unos pasajeros (ej. el vuelo que embarca)
+
+        El primer acceso a una fila del memmap es un fallo de pagina que lee
+        del disco; al abrir el embarque se paga aqui y no en el kiosko.
+
+        Returns:
+            int: Filas precargadas
+        """
+        if self.meta is None:
+            return 0
+        filas = [self.indice[i] for i in map(int, ids_pasajeros) if i in self.indice]
+        if filas:
+            filas.sort()
+            np.take(self.mapas['matriz'], filas, axis=0).sum()
+            np.take(self.mapas['versiones'], filas).sum()
+        return len(filas)
+
+    def estado(self):
+        """Filas, validas y marca de la ultima sincronizacion"""
+        if self.meta is None:
+            return {'disponible': False}
+        filas = self.meta['filas']
+        return {
+            'disponible': True,
+            'escritura': self.escritura,
+            'filas': filas,
+            'validas': int(np.unpackbits(self.mapas['validos'])[:filas].sum()),
+            'capacidad': self.meta['capacidad'],
+            'generacion': self.meta['generacion'],
+            'ultima_sync': self.meta['ultima_sync']
+        }
+
+    # ========================================
+    # SINCRONIZACION INCREMENTAL (solo escritor)
+    # ========================================
+
+    def _aplicar(self, fila_bd):
+        """
+        Escribir una fila de pasajeros en el almacen
+
+        Returns:
+            bool: True si cambio algun vector, version o bit de validez
+        """
+        id_pasajero = int(fila_bd['id_pasajero'])
+        fila = self.indice.get(id_pasajero)
+        version = _a_microsegundos(fila_bd['fecha_actualizacion'])
+
+        if fila is None:
+            if not fila_bd['rostro_embedding']:
+                return False  # Sin biometria y sin fila previa: nada que guardar
+            fila = self.meta['filas']
+            if fila >= self.meta['capacidad']:
+                self._crecer(fila + 1)
+            self.mapas['ids'][fila] = id_pasajero
+            self.indice[id_pasajero] = fila
+            self.meta['filas'] = fila + 1
+        elif self.mapas['versiones'][fila] == version and \
+                self._es_valida(fila) == bool(fila_bd['rostro_embedding']):
+            return False  # Ya aplicada
+
+        if fila_bd['rostro_embedding']:
+            embedding = np.asarray(pickle.loads(fila_bd['rostro_embedding']), dtype=np.float32)
+            self.mapas['versiones'][fila] = ESCRIBIENDO
+            self.mapas['matriz'][fila] = embedding.reshape(DIMENSION)
+            self.mapas['versiones'][fila] = version
+            self._marcar(fila, True)
+        else:
+            self._marcar(fila, False)
+            self.mapas['versiones'][fila] = version
+        return True
+
+    def sincronizar(self):
+        """
+        Aplicar los cambios de pasajeros desde la ultima sincronizacion
+
+        Returns:
+            int: Pasajeros cuyo embedding cambio, o None si no hay conexion
+        """
+        if not self.escritura:
+            raise RuntimeError("El almacen esta abierto en solo lectura")
+
+        conn = get_db_connection()
+        if not conn:
+            return None
+
+        procesadas = 0
+        cambios = 0
+        try:
+            cursor = conn.cursor()
+            desde = _inicio_ventana(self.meta['ultima_sync'])
+            ultimo_id = 0
+            while True:
+                # Keyset: varias filas pueden compartir marca, el id desempata
+                cursor.execute("""
+                    SELECT id_pasajero, rostro_embedding, fecha_actualizacion
+                    FROM pasajeros
+                    WHERE (fecha_actualizacion, id_pasajero) > (%s, %s)
+                    ORDER BY fecha_actualizacion, id_pasajero
+                    LIMIT %s
+                """, (desde, ultimo_id, SYNC_LOTE))
+                filas = cursor.fetchall()
+                if not filas:
+                    break
+                with self._lock:
+                    for fila_bd in filas:
+                        cambios += self._aplicar(fila_bd)
+                procesadas += len(filas)
+                desde = filas[-1]['fecha_actualizacion'].strftime('%Y-%m-%d %H:%M:%S.%f')
+                ultimo_id = filas[-1]['id_pasajero']
+                if len(filas) < SYNC_LOTE:
+                    break
+            cursor.close()
+        finally:
+            conn.close()
+
+        # La ventana re-lee filas anteriores al cursor: solo avanza
+        if procesadas and _clave_cursor(desde, ultimo_id) > \
+                _clave_cursor(self.meta['ultima_sync'], self.meta.get('ultimo_id')):
+            with self._lock:
+                self.meta['ultima_sync'] = desde
+                self.meta['ultimo_id'] = ultimo_id
+                # Sin vectores nuevos el cursor avanza solo en memoria
+                if cambios:
+                    for mapa in self.mapas.values():
+                        mapa.flush()
+                    _escribir_meta(self.meta)
+        return cambios
+
+# ========================================
+# INSTANCIA DEL PROCESO
+# ========================================
+
+_almacen = None
+_archivo_lock = None
+_embarques_precargados = set()  # (numero_vuelo, fecha_apertura) ya precargados
+
+def _intentar_lock_escritor():
+    """Solo un proceso sincroniza; el resto queda en solo lectura"""
+    global _archivo_lock
+    os.makedirs(ALMACEN_DIR, exist_ok=True)
+    archivo = open(_ruta('almacen.lock'), 'w')
+    try:
+        fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        archivo.close()
+        return False
+    _archivo_lock = archivo
+    return True
+
+def obtener_almacen():
+    """
+    Almacen compartido del proceso (None si no esta disponible)
+
+    Returns:
+        AlmacenEmbeddings o None
+    """
+    global _almacen
+    if _almacen is None:
+        return None
+    _almacen.recargar_si_cambio()
+    return _almacen
+
+def _precargar_embarques(almacen):
+    """Precargar los pasajeros de los embarques abiertos desde la ultima vuelta"""
+    from db import listar_embarques, ids_pasajeros_vuelo
+
+    embarques = listar_embarques(solo_abiertos=True)
+    if not embarques:
+        return
+    for embarque in embarques:
+        clave = (embarque['numero_vuelo'], embarque['fecha_apertura'])
+        if clave in _embarques_precargados:
+            continue
+        ids = ids_pasajeros_vuelo(embarque['numero_vuelo'])
+        with almacen._lock:
+            filas = almacen.precargar(ids)
+        _embarques_precargados.add(clave)
+        print(f"[EMBEDDINGS] Embarque vuelo {embarque['numero_vuelo']}: {filas} rostros precargados")
+
+def _loop_sincronizacion(almacen):
+    while True:
+        try:
+            if almacen.escritura:
+                procesadas = almacen.sincronizar()
+                if procesadas:
+                    print(f"[EMBEDDINGS] {procesadas} pasajeros sincronizados")
+            elif _intentar_lock_escritor():
+                # El escritor anterior termino: este proceso toma el relevo
+                almacen.escritura = True
+                almacen.abrir()
+            else:
+                almacen.recargar_si_cambio()
+            _precargar_embarques(almacen)
+        except Exception as e:
+            print(f"[EMBEDDINGS] Error sincronizando: {e}")
+        time.sleep(SYNC_INTERVALO)
+
+def iniciar_almacen():
+    """
+    Mapear el almacen y arrancar la sincronizacion en segundo plano
+
+    Returns:
+        AlmacenEmbeddings: Instancia del proceso
+    """
+    global _almacen
+    if _almacen is not None:
+        return _almacen
+
+    almacen = AlmacenEmbeddings(escritura=_intentar_lock_escritor())
+    almacen.abrir()
+    _almacen = almacen
+
+    print(f"[EMBEDDINGS] Almacen en {ALMACEN_DIR} "
+          f"({'escritura' if almacen.escritura else 'solo lectura'})")
+
+    thread = threading.Thread(target=_loop_sincronizacion, args=(almacen,),
+                              daemon=True, name='embeddings')
+    thread.start()
+    return almacen
+
+# ========================================
+# CLI
+# ========================================
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Almacen de embeddings mapeado en memoria")
+    parser.add_argument('--reconstruir', action='store_true',
+                        help="Borrar el almacen y releer toda la tabla pasajeros")
+    parser.add_argument('--estado', action='store_true', help="Mostrar estado y salir")
+    args = parser.parse_args()
+
+    if not _intentar_lock_escritor():
+        print("[EMBEDDINGS] Otro proceso tiene el almacen en escritura")
+        raise SystemExit(1)
+
+    if args.reconstruir and os.path.exists(_ruta('meta.json')):
+        os.remove(_ruta('meta.json'))
+
+    almacen = AlmacenEmbeddings(escritura=True)
+    almacen.abrir()
+
+    if not args.estado:
+        inicio = datetime.now()
+        procesadas = almacen.sincronizar()
+        if procesadas is None:
+            print("[EMBEDDINGS] No hay conexion a BD")
+            raise SystemExit(2)
+        print(f"[EMBEDDINGS] {procesadas} pasajeros en {(datetime.now() - inicio).total_seconds():.2f}s")
+
+    print(json.dumps(almacen.estado(), indent=2))
@@ -0,0 +1,100 @@
+"""
+antirrebote.py - Ventana anti-rebote para toques repetidos en la puerta
+SmartPort v2.0
+
+El ESP8266 de la puerta publica el UID en cada lectura: una tarjeta
+apoyada en el lector genera una rafaga de solicitudes. Sin filtro, la
+primera abre la puerta y las siguientes (puerta_abierta ya en 1) terminan
+en DENEGAR, que contradice al ABRIR.
+
+Por cada (puerta, UID) se recuerda la decision de la primera solicitud
+durante VENTANA_SEGUNDOS; las repetidas reciben esa misma decision sin
+consultar la BD. Si llega una repetida mientras la primera aun se esta
+procesando, espera su resultado.
+
+Esta ventana es por proceso. Con varias instancias del gateway en el
+grupo compartido, la repeticion puede llegar a otra instancia: para eso
+accesos_puerta guarda la puerta y la hora del reclamo (migracion 009) y
+mqtt_gateway.es_toque_repetido() reenvia ABRIR dentro de la ventana.
+"""
+
+import os
+import threading
+import time
+
+VENTANA_SEGUNDOS = float(os.environ.get("SMARTPORT_ANTIRREBOTE_PUERTA", "3"))
+ESPERA_MAX = 5.0  # Segundos que una repetida espera a la solicitud en curso
+
+_lock = threading.Lock()
+_entradas = {}  # (puerta, uid) -> dict(listo, decision, expira)
+
+metricas = {
+    'primeras': 0,
+    'suprimidas': 0,
+    'en_curso': 0
+}
+
+def _purgar(ahora):
+    vencidas = [c for c, e in _entradas.items() if e['listo'].is_set() and e['expira'] <= ahora]
+    for clave in vencidas:
+        del _entradas[clave]
+
+def reclamar(puerta, rfid_uid):
+    """
+    Registrar un toque y decidir si es el primero de la rafaga
+
+    Args:
+        puerta: Id de la puerta
+        rfid_uid: UID leido
+
+    Returns:
+        dict: Entrada de la solicitud anterior si es repetido, None si este
+            toque debe procesarse (y luego cerrarse con resolver())
+    """
+    clave = (puerta, rfid_uid)
+    ahora = time.time()
+    with _lock:
+        _purgar(ahora)
+        entrada = _entradas.get(clave)
+        if entrada is not None:
+            metricas['suprimidas'] += 1
+            if not entrada['listo'].is_set():
+                metricas['en_curso'] += 1
+            return entrada
+        _entradas[clave] = {'listo': threading.Event(), 'decision': None, 'expira': None}
+        metricas['primeras'] += 1
+        return None
+
+def esperar_decision(entrada):
+    """
+    Decision de la solicitud original (espera si sigue en curso)
+
+    Returns:
+        str: 'ABRIR', 'DENEGAR' o None si la original no respondio
+    """
+    entrada['listo'].wait(timeout=ESPERA_MAX)
+    return entrada['decision']
+
+def resolver(puerta, rfid_uid, decision):
+    """
+    Fijar la decision de la primera solicitud y abrir la ventana
+
+    Args:
+        decision: 'ABRIR'/'DENEGAR', o None si no se envio respuesta
+    """
+    with _lock:
+        entrada = _entradas.get((puerta, rfid_uid))
+        if entrada is None or entrada['listo'].is_set():
+            return
+        entrada['decision'] = decision
+        entrada['expira'] = time.time() + VENTANA_SEGUNDOS
+        entrada['listo'].set()
+
+def estado():
+    """Contadores y claves activas"""
+    with _lock:
+        return {
+            'ventana_segundos': VENTANA_SEGUNDOS,
+            'claves': len(_entradas),
+            **metricas
+        }
@@ -0,0 +1,290 @@
+"""
+archivo_pesos.py - Retencion y archivo columnar de pesos_equipaje
+SmartPort v2.0
+
+La tabla pesos_equipaje esta particionada por dia (migracion 003). Este
+job, pensado para cron (una vez al dia), mantiene la tabla viva pequeña:
+
+1. Crea las particiones diarias de los proximos DIAS_ADELANTE dias
+2. Exporta cada particion mas vieja que la retencion a un archivo
+   columnar comprimido (NPZ: id_peso, peso_kg, fecha_hora epoch)
+3. Verifica el archivo y hace DROP PARTITION (instantaneo, sin DELETE)
+4. Purga de pesos_eventos (migracion 010) las claves fuera de la retencion
+
+El lector (consultar_historico) responde consultas historicas desde los
+archivos sin tocar MySQL.
+
+Uso:
+    python archivo_pesos.py                      # retencion default (30 dias)
+    python archivo_pesos.py --retencion 7
+    python archivo_pesos.py --historico 2026-01-01 2026-01-31
+
+Cron:
+    15 3 * * *  cd /opt/smartport/backend && python archivo_pesos.py
+"""
+
+import argparse
+import glob
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from db import get_db_connection
+
+ARCHIVO_DIR = os.environ.get(
+    "SMARTPORT_ARCHIVO",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "archivo")
+)
+RETENCION_DIAS = int(os.environ.get("SMARTPORT_RETENCION_DIAS", "30"))
+DIAS_ADELANTE = 7
+
+PARTICION_FUTURO = 'p_futuro'
+
+SQL_PURGAR_EVENTOS_PESO = "DELETE FROM pesos_eventos WHERE fecha_registro < %s"
+
+# TO_DAYS('1970-01-01') en MySQL
+_TO_DAYS_EPOCH = 719528
+
+def _to_days(dia):
+    """Equivalente a TO_DAYS() de MySQL para un date"""
+    return (dia - date(1970, 1, 1)).days + _TO_DAYS_EPOCH
+
+def _desde_to_days(valor):
+    """Inverso de TO_DAYS()"""
+    return date(1970, 1, 1) + timedelta(days=int(valor) - _TO_DAYS_EPOCH)
+
+def _ruta_archivo(dia):
+    return os.path.join(ARCHIVO_DIR, f"pesos_{dia:%Y%m%d}.npz")
+
+# ========================================
+# PARTICIONES
+# ========================================
+
+def listar_particiones(cursor):
+    """
+    Particiones de pesos_equipaje en orden
+
+    Returns:
+        list: dicts {nombre, limite (date exclusivo o None para MAXVALUE), filas}
+    """
+    cursor.execute("""
+        SELECT PARTITION_NAME AS nombre,
+               PARTITION_DESCRIPTION AS limite,
+               TABLE_ROWS AS filas
+        FROM INFORMATION_SCHEMA.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND TABLE_NAME = 'pesos_equipaje'
+          AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """)
+    particiones = []
+    for fila in cursor.fetchall():
+        limite = None if fila['limite'] == 'MAXVALUE' else _desde_to_days(fila['limite'])
+        particiones.append({'nombre': fila['nombre'], 'limite': limite, 'filas': fila['filas']})
+    return particiones
+
+def asegurar_particiones(conn, hoy=None, dias_adelante=DIAS_ADELANTE):
+    """
+    Dividir p_futuro en particiones diarias hasta hoy + dias_adelante
+
+    La primera vez (p_futuro contiene todo el historico) se agrega ademas
+    una particion p_hasta_<AAAAMMDD> con todo lo anterior a hoy.
+
+    Returns:
+        list: Nombres de particiones creadas
+    """
+    hoy = hoy or date.today()
+    cursor = conn.cursor()
+    try:
+        particiones = listar_particiones(cursor)
+        if not particiones:
+            print("[ERROR] pesos_equipaje no esta particionada (aplicar migracion 003)")
+            return []
+
+        limites = [p['limite'] for p in particiones if p['limite']]
+        ultimo = max(limites) if limites else None
+
+        nuevas = []
+        if ultimo is None:
+            nuevas.append((f"p_hasta_{hoy:%Y%m%d}", hoy))
+            ultimo = hoy
+
+        while ultimo <= hoy + timedelta(days=dias_adelante):
+            nuevas.append((f"p{ultimo:%Y%m%d}", ultimo + timedelta(days=1)))
+            ultimo += timedelta(days=1)
+
+        if not nuevas:
+            return []
+
+        definiciones = ",\n".join(
+            f"PARTITION {nombre} VALUES LESS THAN ({_to_days(limite)})"
+            for nombre, limite in nuevas
+        )
+        cursor.execute(f"""
+            ALTER TABLE pesos_equipaje
+            REORGANIZE PARTITION {PARTICION_FUTURO} INTO (
+                {definiciones},
+                PARTITION {PARTICION_FUTURO} VALUES LESS THAN MAXVALUE
+            )
+        """)
+        print(f"[OK] {len(nuevas)} particiones creadas (hasta {ultimo:%Y-%m-%d})")
+        return [nombre for nombre, _ in nuevas]
+    finally:
+        cursor.close()
+
+# ========================================
+# ARCHIVO
+# ========================================
+
+def exportar_particion(cursor, particion, ruta):
+    """
+    Escribir una particion como NPZ comprimido (escritura atomica)
+
+    Returns:
+        int: Filas exportadas
+    """
+    cursor.execute(f"""
+        SELECT id_peso, peso_kg, duracion_s, UNIX_TIMESTAMP(fecha_hora) AS ts
+        FROM pesos_equipaje PARTITION ({particion})
+        ORDER BY fecha_hora
+    """)
+    filas = cursor.fetchall()
+
+    id_peso = np.fromiter((f['id_peso'] for f in filas), dtype=np.int64, count=len(filas))
+    peso_kg = np.fromiter((float(f['peso_kg']) for f in filas), dtype=np.float32, count=len(filas))
+    fecha_hora = np.fromiter((int(f['ts']) for f in filas), dtype=np.int64, count=len(filas))
+    # NaN en filas anteriores a la migracion 005 (una fila por lectura)
+    duracion_s = np.fromiter(
+        (float(f['duracion_s']) if f['duracion_s'] is not None else np.nan for f in filas),
+        dtype=np.float32, count=len(filas)
+    )
+
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'wb') as f:
+        np.savez_compressed(f, id_peso=id_peso, peso_kg=peso_kg, fecha_hora=fecha_hora,
+                            duracion_s=duracion_s)
+
+    # Verificar antes de que el DROP PARTITION sea irreversible
+    with np.load(temporal) as verificacion:
+        if len(verificacion['id_peso']) != len(filas):
+            raise IOError(f"Archivo {temporal} incompleto")
+
+    os.replace(temporal, ruta)
+    return len(filas)
+
+def archivar(conn, retencion_dias=RETENCION_DIAS, hoy=None):
+    """
+    Archivar y eliminar las particiones completamente fuera de la retencion
+
+    Returns:
+        list: (particion, filas, ruta) archivadas
+    """
+    hoy = hoy or date.today()
+    corte = hoy - timedelta(days=retencion_dias)
+    archivadas = []
+
+    cursor = conn.cursor()
+    try:
+        for particion in listar_particiones(cursor):
+            limite = particion['limite']
+            if limite is None or limite > corte:
+                continue
+
+            # Una particion diaria pAAAAMMDD guarda el dia limite - 1
+            ruta = _ruta_archivo(limite - timedelta(days=1))
+            if particion['nombre'].startswith('p_hasta_'):
+                ruta = os.path.join(ARCHIVO_DIR, f"pesos_{particion['nombre'][2:]}.npz")
+
+            filas = exportar_particion(cursor, particion['nombre'], ruta)
+            cursor.execute(f"ALTER TABLE pesos_equipaje DROP PARTITION {particion['nombre']}")
+            archivadas.append((particion['nombre'], filas, ruta))
+            print(f"[OK] Particion {particion['nombre']} archivada: {filas} filas -> {ruta}")
+
+        # Las claves de deduplicacion no estan particionadas: se purgan con
+        # el mismo corte (una re-entrega mas vieja que la retencion no llega)
+        cursor.execute(SQL_PURGAR_EVENTOS_PESO, (corte,))
+        if cursor.rowcount:
+            print(f"[OK] {cursor.rowcount} claves de pesos_eventos purgadas (antes de {corte})")
+    finally:
+        cursor.close()
+
+    return archivadas
+
+# ========================================
+# LECTOR HISTORICO
+# ========================================
+
+def consultar_historico(desde, hasta):
+    """
+    Estadisticas diarias desde el archivo (sin consultar MySQL)
+
+    Args:
+        desde: date inicial (inclusive)
+        hasta: date final (inclusive)
+
+    Returns:
+        list: Por dia {fecha, total, promedio, maximo, minimo, sobrepesos}
+    """
+    inicio = datetime.combine(desde, datetime.min.time()).timestamp()
+    fin = datetime.combine(hasta + timedelta(days=1), datetime.min.time()).timestamp()
+
+    ts_partes = []
+    kg_partes = []
+    for ruta in sorted(glob.glob(os.path.join(ARCHIVO_DIR, "pesos_*.npz"))):
+        with np.load(ruta) as datos:
+            ts = datos['fecha_hora']
+            if len(ts) == 0 or ts[-1] < inicio or ts[0] >= fin:
+                continue
+            mascara = (ts >= inicio) & (ts < fin)
+            ts_partes.append(ts[mascara])
+            kg_partes.append(datos['peso_kg'][mascara])
+
+    if not ts_partes:
+        return []
+
+    ts = np.concatenate(ts_partes)
+    kg = np.concatenate(kg_partes)
+
+    # Agrupar por dia local
+    dias = np.array([datetime.fromtimestamp(t).date().toordinal() for t in ts])
+    resultado = []
+    for ordinal in np.unique(dias):
+        valores = kg[dias == ordinal]
+        resultado.append({
+            'fecha': date.fromordinal(int(ordinal)).isoformat(),
+            'total': int(len(valores)),
+            'promedio': round(float(valores.mean()), 2),
+            'maximo': round(float(valores.max()), 2),
+            'minimo': round(float(valores.min()), 2),
+            'sobrepesos': int((valores > 2.0).sum())
+        })
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Retencion y archivo de pesos_equipaje")
+    parser.add_argument('--retencion', type=int, default=RETENCION_DIAS,
+                        help="Dias que se conservan en MySQL")
+    parser.add_argument('--historico', nargs=2, metavar=('DESDE', 'HASTA'),
+                        help="Consultar el archivo (AAAA-MM-DD AAAA-MM-DD)")
+    args = parser.parse_args()
+
+    if args.historico:
+        desde, hasta = (date.fromisoformat(d) for d in args.historico)
+        for dia in consultar_historico(desde, hasta):
+            print(dia)
+        return
+
+    conn = get_db_connection()
+    if not conn:
+        sys.exit(1)
+    try:
+        asegurar_particiones(conn)
+        archivar(conn, args.retencion)
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+"""
+benchmark_gateway.py - Comparar el gateway paho (mqtt_gateway.py) con el asyncio (gateway_async.py)
+SmartPort v2.0
+
+Para cada modo arranca `app.py --role iot-gateway` en un subproceso,
+espera a que este conectado al broker y publica N solicitudes de puerta
+correlacionadas ({"uid", "req"} en aeropuerto/puerta/<puerta>/verificar).
+Mide:
+
+- mensajes/s: respuestas recibidas / tiempo desde la primera publicacion
+- latencia de la decision (p50/p95/p99) por id de solicitud, por separado
+  para cada camino: ABRIR (SELECT + reclamo + COMPLETO + COMMIT) y
+  DENEGAR (solo el SELECT)
+
+Una fraccion --validos de las solicitudes usa UIDs de pasajeros sembrados
+en el vuelo VUELO_BENCH, listos para abrir (ABORDADO, acceso sin usar);
+el resto son UIDs que no existen. Antes de cada modo se restablecen los
+sembrados y al terminar se borran, junto con los eventos_puerta de la
+puerta PUERTA_BENCH. La bitacora queda activa como en produccion
+(--sin-bitacora para medir sin ella). Con --pesos se publican ademas
+lecturas en aeropuerto/peso/<bascula> que se insertan en pesos_equipaje.
+La prueba escribe en la BD: usar una BD de pruebas.
+
+Necesita un broker propio (no el publico) y MySQL:
+    MQTT_BROKER=localhost python benchmark_gateway.py --modo ambos -n 2000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+
+import paho.mqtt.client as mqtt
+
+import mqtt_gateway
+from db import get_db_connection
+
+PUERTA_BENCH = "bench"
+BASCULA_BENCH = "benchmark"
+VUELO_BENCH = 9999
+DESTINO_BENCH = "BENCHMARK"
+PREFIJO_UID_BENCH = "BENCH"
+DECISIONES = ('ABRIR', 'DENEGAR')
+
+# ========================================
+# GATEWAY BAJO PRUEBA
+# ========================================
+
+def arrancar_gateway(modo, puerto, bitacora=True):
+    """Lanzar el rol iot-gateway en el modo indicado y esperar a que conecte"""
+    env = dict(os.environ,
+               SMARTPORT_GATEWAY_MODO=modo,
+               SMARTPORT_CALENTAR="0",
+               SMARTPORT_BITACORA="1" if bitacora else "0",
+               SMARTPORT_ANTIRREBOTE_PUERTA="0",
+               SMARTPORT_PESAJE_POR_MALETA="0")
+    proceso = subprocess.Popen(
+        [sys.executable, 'app.py', '--role', 'iot-gateway', '--port', str(puerto)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+    limite = time.time() + 30
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"El gateway {modo} termino al arrancar (codigo {proceso.returncode})")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/api/health", timeout=1) as r:
+                if json.load(r).get('mqtt') == 'conectado':
+                    return proceso
+        except OSError:
+            pass
+        time.sleep(0.5)
+
+    proceso.terminate()
+    raise RuntimeError(f"El gateway {modo} no conecto al broker en 30s")
+
+# ========================================
+# PASAJEROS SEMBRADOS (CAMINO ABRIR)
+# ========================================
+
+def uid_bench(i):
+    return f"{PREFIJO_UID_BENCH}{i:06X}"
+
+def sembrar_pasajeros(n):
+    """
+    Dejar n pasajeros de VUELO_BENCH listos para abrir la puerta
+
+    Crea los que falten y restablece todos (ABORDADO, acceso sin usar),
+    asi que cada modo empieza con el mismo estado.
+
+    Returns:
+        list: UIDs sembrados
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Sin conexion a MySQL para sembrar pasajeros")
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT IGNORE INTO vuelos (numero_vuelo, destino) VALUES (%s, %s)
+        """, (VUELO_BENCH, DESTINO_BENCH))
+        cursor.execute("SELECT destino FROM vuelos WHERE numero_vuelo = %s", (VUELO_BENCH,))
+        if cursor.fetchone()['destino'] != DESTINO_BENCH:
+            raise RuntimeError(f"El vuelo {VUELO_BENCH} existe y no es del benchmark")
+        cursor.execute("SELECT COUNT(*) AS total FROM pasajeros WHERE numero_vuelo = %s", (VUELO_BENCH,))
+        existentes = cursor.fetchone()['total']
+        if existentes < n:
+            cursor.executemany("""
+                INSERT INTO pasajeros (nombre_normalizado, numero_vuelo, rfid_uid, estado)
+                VALUES (%s, %s, %s, 'ABORDADO')
+            """, [(f"BENCH {i}", VUELO_BENCH, uid_bench(i)) for i in range(existentes, n)])
+        cursor.execute("""
+            UPDATE pasajeros SET estado = 'ABORDADO' WHERE numero_vuelo = %s
+        """, (VUELO_BENCH,))
+        cursor.execute("""
+            INSERT INTO accesos_puerta (id_pasajero, porcentaje_similitud)
+            SELECT id_pasajero, 99.0 FROM pasajeros WHERE numero_vuelo = %s
+            ON DUPLICATE KEY UPDATE puerta_abierta = 0, puerta_apertura = NULL
+        """, (VUELO_BENCH,))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    return [uid_bench(i) for i in range(n)]
+
+def limpiar():
+    """Borrar el vuelo sembrado (pasajeros y accesos) y la bitacora de la puerta de prueba"""
+    conn = get_db_connection()
+    if not conn:
+        print("[WARNING] Sin conexion a MySQL - datos del benchmark sin borrar")
+        return
+    try:
+        cursor = conn.cursor()
+        # El CASCADE borra sus pasajeros y accesos
+        cursor.execute("DELETE FROM vuelos WHERE numero_vuelo = %s AND destino = %s",
+                       (VUELO_BENCH, DESTINO_BENCH))
+        cursor.execute("DELETE FROM eventos_puerta WHERE dispositivo = %s", (PUERTA_BENCH,))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+# ========================================
+# CARGA Y MEDICION
+# ========================================
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)]
+
+def medir(n, pesos, tasa, espera, uids_validos=()):
+    """
+    Publicar la carga y recoger las respuestas
+
+    Args:
+        n: Solicitudes de puerta
+        pesos: Lecturas de bascula intercaladas (0 = ninguna)
+        tasa: Mensajes/s a publicar (0 = sin limite)
+        espera: Segundos maximos para recibir las respuestas pendientes
+        uids_validos: UIDs sembrados, repartidos uniformemente entre las n
+
+    Returns:
+        dict: Resultado del modo, con latencias por decision
+    """
+    enviados = {}
+    latencias = []
+    por_decision = {decision: [] for decision in DECISIONES}
+    completas = threading.Event()
+    lock = threading.Lock()
+
+    def on_message(client, userdata, msg):
+        recibido = time.perf_counter()
+        try:
+            respuesta = json.loads(msg.payload)
+            id_solicitud = respuesta['req']
+        except (ValueError, KeyError):
+            return
+        with lock:
+            inicio = enviados.pop(id_solicitud, None)
+            if inicio is not None:
+                latencias.append(recibido - inicio)
+                por_decision.setdefault(respuesta.get('decision'), []).append(recibido - inicio)
+                if len(latencias) == n:
+                    completas.set()
+
+    cliente = mqtt.Client(callback_api_version=mqtt.CallbackAPIVersion.VERSION1,
+                          client_id=f"bench-{uuid.uuid4().hex[:8]}")
+    cliente.on_message = on_message
+    cliente.connect(mqtt_gateway.MQTT_BROKER, mqtt_gateway.MQTT_PORT, 60)
+    cliente.subscribe(f"{mqtt_gateway.MQTT_TOPIC_PUERTA_PREFIJO}{PUERTA_BENCH}/respuesta", qos=1)
+    cliente.loop_start()
+    time.sleep(1)  # Que la suscripcion quede activa antes de publicar
+
+    topic_puerta = f"{mqtt_gateway.MQTT_TOPIC_PUERTA_PREFIJO}{PUERTA_BENCH}/verificar"
+    topic_peso = f"{mqtt_gateway.MQTT_TOPIC_PESO_PREFIJO}{BASCULA_BENCH}"
+    cada_peso = max(n // pesos, 1) if pesos else 0
+    intervalo = 1.0 / tasa if tasa else 0.0
+
+    # Posiciones de las solicitudes validas, repartidas en toda la carga
+    validas = {i * n // len(uids_validos): uid for i, uid in enumerate(uids_validos)} if uids_validos else {}
+
+    inicio = time.perf_counter()
+    publicados_peso = 0
+    for i in range(n):
+        id_solicitud = uuid.uuid4().hex[:12]
+        uid = validas.get(i) or uuid.uuid4().hex[:8].upper()
+        payload = json.dumps({'uid': uid, 'req': id_solicitud})
+        with lock:
+            enviados[id_solicitud] = time.perf_counter()
+        cliente.publish(topic_puerta, payload, qos=1)
+
+        if cada_peso and i % cada_peso == 0 and publicados_peso < pesos:
+            cliente.publish(topic_peso, "1.25", qos=1)
+            publicados_peso += 1
+
+        if intervalo:
+            time.sleep(max(inicio + (i + 1) * intervalo - time.perf_counter(), 0.0))
+
+    completas.wait(timeout=espera)
+    duracion = time.perf_counter() - inicio
+
+    cliente.loop_stop()
+    cliente.disconnect()
+
+    return {
+        'solicitudes': n,
+        'validas': len(validas),
+        'respuestas': len(latencias),
+        'perdidas': n - len(latencias),
+        'pesos_publicados': publicados_peso,
+        'mensajes_por_s': round(len(latencias) / duracion, 1) if duracion else None,
+        'p50_ms': _ms(percentil(latencias, 50)),
+        'p95_ms': _ms(percentil(latencias, 95)),
+        'p99_ms': _ms(percentil(latencias, 99)),
+        'decisiones': {
+            decision: {
+                'respuestas': len(valores),
+                'p50_ms': _ms(percentil(valores, 50)),
+                'p95_ms': _ms(percentil(valores, 95)),
+                'p99_ms': _ms(percentil(valores, 99))
+            }
+            for decision, valores in por_decision.items()
+        }
+    }
+
+def _ms(segundos):
+    return round(segundos * 1000, 1) if segundos is not None else None
+
+# ========================================
+# CLI
+# ========================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del gateway IoT: paho vs asyncio")
+    parser.add_argument('--modo', choices=('paho', 'async', 'ambos'), default='ambos')
+    parser.add_argument('-n', type=int, default=1000, help="Solicitudes de puerta por modo")
+    parser.add_argument('--validos', type=float, default=0.5,
+                        help="Fraccion de solicitudes con UID sembrado (camino ABRIR)")
+    parser.add_argument('--sin-bitacora', action='store_true',
+                        help="Arrancar el gateway con la bitacora desactivada")
+    parser.add_argument('--pesos', type=int, default=0,
+                        help="Lecturas de bascula intercaladas (se insertan en la BD)")
+    parser.add_argument('--tasa', type=float, default=0, help="Mensajes/s (0 = sin limite)")
+    parser.add_argument('--espera', type=float, default=60, help="Segundos maximos esperando respuestas")
+    parser.add_argument('--puerto', type=int, default=5091, help="Puerto HTTP del gateway bajo prueba")
+    args = parser.parse_args()
+
+    if mqtt_gateway.MQTT_BROKER == "broker.mqtt.cool":
+        print("[WARNING] Usando el broker publico: los resultados incluyen la latencia de internet")
+
+    if not 0 <= args.validos <= 1:
+        parser.error("--validos debe estar en [0, 1]")
+
+    modos = ('paho', 'async') if args.modo == 'ambos' else (args.modo,)
+    resultados = {}
+
+    try:
+        for modo in modos:
+            uids = sembrar_pasajeros(int(args.n * args.validos))
+            print(f"[INFO] Arrancando gateway {modo} ({len(uids)} UIDs validos, "
+                  f"bitacora {'no' if args.sin_bitacora else 'si'})...")
+            proceso = arrancar_gateway(modo, args.puerto, bitacora=not args.sin_bitacora)
+            try:
+                resultados[modo] = medir(args.n, args.pesos, args.tasa, args.espera, uids)
+            finally:
+                proceso.terminate()
+                proceso.wait(timeout=10)
+            print(f"[OK] {modo}: {json.dumps(resultados[modo])}")
+    finally:
+        limpiar()
+
+    print("\n" + "="*70)
+    print(f"{'modo':<8}{'camino':<10}{'resp':>8}{'msg/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'perdidas':>10}")
+    for modo, r in resultados.items():
+        print(f"{modo:<8}{'total':<10}{r['respuestas']:>8}{r['mensajes_por_s']!s:>10}{r['p50_ms']!s:>10}"
+              f"{r['p95_ms']!s:>10}{r['p99_ms']!s:>10}{r['perdidas']:>10}")
+        for decision, d in r['decisiones'].items():
+            print(f"{'':<8}{decision!s:<10}{d['respuestas']:>8}{'':>10}{d['p50_ms']!s:>10}"
+                  f"{d['p95_ms']!s:>10}{d['p99_ms']!s:>10}{'':>10}")
+    print("="*70)
+
+if __name__ == '__main__':
+    main()
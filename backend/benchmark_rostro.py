@@ -0,0 +1,214 @@
+"""
+benchmark_rostro.py - Precision vs latencia de los perfiles faciales (perfiles_rostro.py)
+SmartPort v2.0
+
+Recorre un directorio de imagenes con una carpeta por persona:
+
+    fixtures/
+        ana/       01.jpg 02.jpg ...
+        luis/      01.jpg ...
+
+y para cada perfil (rapido, balanceado, preciso) mide:
+
+- tiempo de deteccion y de codificacion por imagen (p50/p95)
+- imagenes sin rostro detectado
+- distancias mismo-persona (genuinas) y distinta-persona (impostoras)
+- separacion d' = |media_imp - media_gen| / sqrt((var_gen + var_imp) / 2)
+- FRR y FAR con el umbral de distancia (default similitud.UMBRAL_DISTANCIA)
+
+El perfil adecuado es el mas barato cuyo FRR sigue dentro del objetivo.
+Se necesitan al menos 2 imagenes por persona y 2 personas.
+
+Uso:
+    python benchmark_rostro.py fixtures/
+    python benchmark_rostro.py fixtures/ --perfiles rapido balanceado --umbral 0.55 --json r.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import face_recognition
+
+from perfiles_rostro import PERFILES, obtener_perfil, ubicar_rostros, codificar_rostros
+from similitud import matriz_distancias, UMBRAL_DISTANCIA
+
+EXTENSIONES = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# ========================================
+# FIXTURES
+# ========================================
+
+def cargar_fixtures(directorio):
+    """
+    Imagenes RGB agrupadas por persona (subcarpeta)
+
+    Returns:
+        list: (persona, ruta, imagen) en orden estable
+    """
+    imagenes = []
+    for persona in sorted(os.listdir(directorio)):
+        carpeta = os.path.join(directorio, persona)
+        if not os.path.isdir(carpeta):
+            continue
+        for nombre in sorted(os.listdir(carpeta)):
+            if nombre.lower().endswith(EXTENSIONES):
+                ruta = os.path.join(carpeta, nombre)
+                imagenes.append((persona, ruta, face_recognition.load_image_file(ruta)))
+    return imagenes
+
+# ========================================
+# MEDICION
+# ========================================
+
+def percentil_ms(valores, p):
+    return round(float(np.percentile(valores, p)) * 1000, 1) if valores else None
+
+def separacion(genuinas, impostoras):
+    """Indice d' entre las dos distribuciones de distancia"""
+    if len(genuinas) < 2 or len(impostoras) < 2:
+        return None
+    varianza = (genuinas.var() + impostoras.var()) / 2
+    if varianza == 0:
+        return None
+    return round(float(abs(impostoras.mean() - genuinas.mean()) / np.sqrt(varianza)), 3)
+
+def medir_perfil(nombre, imagenes, umbral, calentar=True):
+    """
+    Codificar todas las imagenes con un perfil y evaluar las distancias
+
+    Args:
+        nombre: Perfil de perfiles_rostro.PERFILES
+        imagenes: Salida de cargar_fixtures()
+        umbral: Distancia de aceptacion
+        calentar: Codificar una imagen antes de medir (carga de modelos)
+
+    Returns:
+        dict: Resultado del perfil
+    """
+    perfil = obtener_perfil(nombre)
+    if calentar and imagenes:
+        rgb = imagenes[0][2]
+        codificar_rostros(rgb, ubicar_rostros(rgb, perfil)[:1], perfil)
+
+    t_deteccion, t_codificacion = [], []
+    personas, embeddings = [], []
+    sin_rostro = []
+
+    for persona, ruta, rgb in imagenes:
+        inicio = time.perf_counter()
+        cajas = ubicar_rostros(rgb, perfil)
+        t_deteccion.append(time.perf_counter() - inicio)
+        if not cajas:
+            sin_rostro.append(ruta)
+            continue
+
+        # El rostro mas grande, como SeguidorRostro
+        caja = max(cajas, key=lambda c: (c[1] - c[3]) * (c[2] - c[0]))
+        inicio = time.perf_counter()
+        encodings = codificar_rostros(rgb, [caja], perfil)
+        t_codificacion.append(time.perf_counter() - inicio)
+        personas.append(persona)
+        embeddings.append(encodings[0])
+
+    resultado = {
+        'perfil': nombre,
+        'parametros': {k: v for k, v in perfil.items() if k != 'nombre'},
+        'imagenes': len(imagenes),
+        'sin_rostro': len(sin_rostro),
+        'deteccion_p50_ms': percentil_ms(t_deteccion, 50),
+        'deteccion_p95_ms': percentil_ms(t_deteccion, 95),
+        'codificacion_p50_ms': percentil_ms(t_codificacion, 50),
+        'codificacion_p95_ms': percentil_ms(t_codificacion, 95),
+        'total_p50_ms': percentil_ms([a + b for a, b in zip(t_deteccion, t_codificacion)], 50),
+        'umbral': umbral
+    }
+    if len(embeddings) < 2:
+        return resultado
+
+    # Todas las parejas en una pasada; solo el triangulo superior (sin i == j)
+    distancias = matriz_distancias(embeddings, embeddings)
+    etiquetas = np.array(personas)
+    misma = etiquetas[:, np.newaxis] == etiquetas[np.newaxis, :]
+    superior = np.triu(np.ones_like(misma), k=1)
+    genuinas = distancias[misma & superior]
+    impostoras = distancias[~misma & superior]
+
+    resultado.update({
+        'pares_genuinos': int(genuinas.size),
+        'pares_impostores': int(impostoras.size),
+        'genuina_media': round(float(genuinas.mean()), 4) if genuinas.size else None,
+        'genuina_p95': round(float(np.percentile(genuinas, 95)), 4) if genuinas.size else None,
+        'impostora_media': round(float(impostoras.mean()), 4) if impostoras.size else None,
+        'impostora_p5': round(float(np.percentile(impostoras, 5)), 4) if impostoras.size else None,
+        'separacion_d': separacion(genuinas, impostoras),
+        'frr': round(float((genuinas >= umbral).mean()), 4) if genuinas.size else None,
+        'far': round(float((impostoras < umbral).mean()), 4) if impostoras.size else None
+    })
+    return resultado
+
+# ========================================
+# CLI
+# ========================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de perfiles faciales: latencia vs separacion")
+    parser.add_argument('directorio', help="Carpeta con una subcarpeta de imagenes por persona")
+    parser.add_argument('--perfiles', nargs='+', default=list(PERFILES), help="Perfiles a comparar")
+    parser.add_argument('--umbral', type=float, default=UMBRAL_DISTANCIA, help="Distancia de aceptacion")
+    parser.add_argument('--frr-max', type=float, default=0.02,
+                        help="FRR objetivo para recomendar el perfil mas barato")
+    parser.add_argument('--json', help="Guardar los resultados completos en este archivo")
+    args = parser.parse_args()
+
+    imagenes = cargar_fixtures(args.directorio)
+    personas = {p for p, _, _ in imagenes}
+    if len(personas) < 2 or len(imagenes) < 4:
+        print(f"[ERROR] Se necesitan al menos 2 personas con 2 imagenes ({len(imagenes)} imagenes, "
+              f"{len(personas)} personas en {args.directorio})")
+        sys.exit(1)
+    print(f"[INFO] {len(imagenes)} imagenes de {len(personas)} personas")
+
+    resultados = []
+    for nombre in args.perfiles:
+        print(f"[INFO] Perfil {nombre}...")
+        resultado = medir_perfil(nombre, imagenes, args.umbral)
+        resultados.append(resultado)
+        if resultado['sin_rostro']:
+            print(f"[WARNING] {nombre}: {resultado['sin_rostro']} imagenes sin rostro detectado")
+
+    print("\n" + "="*84)
+    print(f"{'perfil':<12}{'det p50':>9}{'cod p50':>9}{'total':>9}{'sin rostro':>11}"
+          f"{'gen media':>10}{'imp media':>10}{'d':>7}{'FRR':>8}{'FAR':>8}")
+    for r in resultados:
+        print(f"{r['perfil']:<12}{r['deteccion_p50_ms']!s:>9}{r['codificacion_p50_ms']!s:>9}"
+              f"{r['total_p50_ms']!s:>9}{r['sin_rostro']:>11}{r.get('genuina_media')!s:>10}"
+              f"{r.get('impostora_media')!s:>10}{r.get('separacion_d')!s:>7}"
+              f"{r.get('frr')!s:>8}{r.get('far')!s:>8}")
+    print("="*84)
+
+    # Un rostro no detectado tambien es un rechazo para el pasajero
+    candidatos = []
+    for r in resultados:
+        if r.get('frr') is None:
+            continue
+        rechazo = r['frr'] + r['sin_rostro'] / r['imagenes']
+        if rechazo <= args.frr_max:
+            candidatos.append((r['total_p50_ms'] or 0, r['perfil'], rechazo))
+    if candidatos:
+        _, perfil, rechazo = min(candidatos)
+        print(f"[OK] Perfil recomendado: {perfil} (rechazo {rechazo:.2%} <= {args.frr_max:.2%} "
+              f"con umbral {args.umbral})")
+    else:
+        print(f"[WARNING] Ningun perfil mantiene el rechazo <= {args.frr_max:.2%} con umbral {args.umbral}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"[OK] Resultados en {args.json}")
+
+if __name__ == '__main__':
+    main()
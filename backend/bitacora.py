@@ -0,0 +1,236 @@
+"""
+bitacora.py - Bitacora append-only de eventos de puerta (migracion 007)
+SmartPort v2.0
+
+Cada toque RFID, intento facial y respuesta de puerta se agrega a
+eventos_puerta. registrar() solo encola en memoria: un thread escribe
+en lotes (un INSERT multi-fila cada INTERVALO segundos o LOTE eventos),
+asi que la decision de acceso no espera a la BD.
+
+Si la BD no responde, el lote se reintenta en el siguiente ciclo; con
+mas de MAX_PENDIENTES eventos en memoria se descartan los mas antiguos
+(la bitacora es para analisis: no debe crecer sin limite en la Pi).
+Si MySQL rechaza el lote por sus datos (IntegrityError/DataError), se
+escribe fila por fila y solo se descartan las filas invalidas, para que
+un evento malo no bloquee la cola para siempre.
+
+Tipos:
+    RFID    toque de tarjeta (kiosko o puerta), resultado VALIDO/NO_REGISTRADO/...
+    ROSTRO  intento facial en el kiosko: similitud, distancia, CONCEDIDO/DENEGADO/SIN_ROSTRO
+    PUERTA  respuesta a la puerta fisica: ABRIR/DENEGAR con latencia
+"""
+
+import os
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pymysql
+
+from db import get_db_connection
+
+TIPO_RFID = 'RFID'
+TIPO_ROSTRO = 'ROSTRO'
+TIPO_PUERTA = 'PUERTA'
+
+# SMARTPORT_BITACORA=0 desactiva la bitacora (p.ej. en benchmarks)
+ACTIVA = os.environ.get("SMARTPORT_BITACORA", "1") == "1"
+LOTE = int(os.environ.get("SMARTPORT_BITACORA_LOTE", "200"))
+INTERVALO = float(os.environ.get("SMARTPORT_BITACORA_INTERVALO", "2"))
+MAX_PENDIENTES = int(os.environ.get("SMARTPORT_BITACORA_MAX", "20000"))
+
+# Guardar el embedding capturado en los intentos faciales (calibracion de umbrales)
+GUARDAR_EMBEDDING = os.environ.get("SMARTPORT_BITACORA_EMBEDDING", "0") == "1"
+
+# Id de este kiosko en la bitacora (las puertas usan su id de topic)
+KIOSCO_ID = os.environ.get("SMARTPORT_KIOSCO_ID", f"kiosko-{socket.gethostname()}")
+
+SQL_INSERTAR = """
+    INSERT INTO eventos_puerta
+        (fecha_hora, tipo, dispositivo, resultado, id_pasajero, rfid_uid,
+         similitud, distancia, latencia_ms, embedding)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# Errores por el contenido de una fila: reintentar el lote no sirve
+ERRORES_DATOS = (pymysql.err.IntegrityError, pymysql.err.DataError)
+
+_lock = threading.Lock()
+_pendientes = deque()
+_despertar = threading.Event()
+_thread = None
+
+metricas = {
+    'encolados': 0,
+    'escritos': 0,
+    'descartados': 0,
+    'rechazados': 0,
+    'errores': 0,
+    'ultima_escritura': None
+}
+
+def registrar(tipo, dispositivo, resultado, id_pasajero=None, rfid_uid=None,
+              similitud=None, distancia=None, latencia_ms=None, embedding=None):
+    """
+    Encolar un evento (no bloquea ni toca la BD)
+
+    Args:
+        tipo: TIPO_RFID, TIPO_ROSTRO o TIPO_PUERTA
+        dispositivo: Id del kiosko o de la puerta
+        resultado: Resultado del evento (ej. 'CONCEDIDO', 'ABRIR', 'NO_REGISTRADO')
+        embedding: Rostro capturado; solo se guarda con SMARTPORT_BITACORA_EMBEDDING=1
+    """
+    if not ACTIVA:
+        return
+
+    if embedding is not None and GUARDAR_EMBEDDING:
+        embedding = np.asarray(embedding, dtype=np.float32).tobytes()
+    else:
+        embedding = None
+
+    fila = (
+        datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+        tipo,
+        str(dispositivo)[:64],
+        resultado,
+        id_pasajero,
+        rfid_uid,
+        round(float(similitud), 2) if similitud is not None else None,
+        float(distancia) if distancia is not None else None,
+        int(latencia_ms) if latencia_ms is not None else None,
+        embedding
+    )
+
+    with _lock:
+        _pendientes.append(fila)
+        metricas['encolados'] += 1
+        while len(_pendientes) > MAX_PENDIENTES:
+            _pendientes.popleft()
+            metricas['descartados'] += 1
+        lleno = len(_pendientes) >= LOTE
+
+    iniciar_escritor()
+    if lleno:
+        _despertar.set()
+
+def _tomar_lote():
+    with _lock:
+        return [_pendientes.popleft() for _ in range(min(LOTE, len(_pendientes)))]
+
+def _devolver_lote(lote):
+    """Reponer un lote fallido al frente de la cola (respetando MAX_PENDIENTES)"""
+    with _lock:
+        _pendientes.extendleft(reversed(lote))
+        while len(_pendientes) > MAX_PENDIENTES:
+            _pendientes.pop()
+            metricas['descartados'] += 1
+
+def _escribir_fila_a_fila(conn, lote):
+    """
+    Escribir un lote rechazado fila por fila, descartando las invalidas
+
+    Returns:
+        tuple: (escritos, filas sin intentar si se perdio la conexion)
+    """
+    escritos = 0
+    cursor = conn.cursor()
+    try:
+        for i, fila in enumerate(lote):
+            try:
+                cursor.execute(SQL_INSERTAR, fila)
+                conn.commit()
+                escritos += 1
+            except ERRORES_DATOS as e:
+                conn.rollback()
+                metricas['rechazados'] += 1
+                print(f"[ERROR] Evento de bitacora descartado ({fila[1]} {fila[2]} {fila[3]}): {e}")
+            except Exception as e:
+                print(f"[ERROR] Error escribiendo bitacora fila por fila: {e}")
+                return escritos, lote[i:]
+    finally:
+        cursor.close()
+    return escritos, []
+
+def vaciar():
+    """
+    Escribir todo lo pendiente (lo usa el thread escritor y las pruebas)
+
+    Returns:
+        int: Eventos escritos
+    """
+    escritos = 0
+    while True:
+        lote = _tomar_lote()
+        if not lote:
+            return escritos
+
+        conn = get_db_connection()
+        if not conn:
+            _devolver_lote(lote)
+            metricas['errores'] += 1
+            return escritos
+
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(SQL_INSERTAR, lote)
+            conn.commit()
+            cursor.close()
+            escritos += len(lote)
+            metricas['escritos'] += len(lote)
+            metricas['ultima_escritura'] = time.time()
+        except ERRORES_DATOS as e:
+            conn.rollback()
+            print(f"[WARNING] Lote de bitacora rechazado ({e}) - reintentando fila por fila")
+            escritos_fila, resto = _escribir_fila_a_fila(conn, lote)
+            escritos += escritos_fila
+            metricas['escritos'] += escritos_fila
+            metricas['ultima_escritura'] = time.time()
+            if resto:
+                metricas['errores'] += 1
+                _devolver_lote(resto)
+                return escritos
+        except Exception as e:
+            print(f"[ERROR] Error escribiendo bitacora ({len(lote)} eventos): {e}")
+            metricas['errores'] += 1
+            _devolver_lote(lote)
+            return escritos
+        finally:
+            conn.close()
+
+def _escribir():
+    while True:
+        _despertar.wait(timeout=INTERVALO)
+        _despertar.clear()
+        try:
+            vaciar()
+        except Exception as e:
+            print(f"[ERROR] Escritor de bitacora: {e}")
+
+def iniciar_escritor():
+    """
+    Arrancar el thread escritor (con el primer evento, o antes: el gateway
+    asyncio lo arranca al iniciar para que el event loop nunca cree threads)
+    """
+    global _thread
+    if _thread is not None or not ACTIVA:
+        return
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_escribir, daemon=True, name='bitacora')
+            _thread.start()
+
+def estado():
+    """Eventos en memoria y contadores de escritura"""
+    with _lock:
+        pendientes = len(_pendientes)
+    return {
+        'activa': ACTIVA,
+        'pendientes': pendientes,
+        'lote': LOTE,
+        'intervalo_s': INTERVALO,
+        'guardar_embedding': GUARDAR_EMBEDDING,
+        **metricas
+    }
@@ -0,0 +1,187 @@
+"""
+calentamiento.py - Pre-calentamiento al arranque y estado de readiness
+SmartPort v2.0
+
+Al iniciar cada rol se calientan en segundo plano los componentes que
+usa (modelos faciales, camara, BD). /api/ready reporta cuando cada uno
+esta listo; /api/health sigue siendo solo liveness.
+
+El lector RFID no se calienta: se inicializa al importar dispositivos.py
+(lo hace el calentamiento de la camara) y /api/health ya indica si es
+real o simulado.
+
+Con SMARTPORT_CALENTAR=0 los componentes quedan 'sin_calentar' y cuentan
+como listos: pagaran la carga en la primera peticion que los use.
+"""
+
+import os
+import threading
+import time
+
+from db import get_db_connection
+
+# Componentes que debe calentar cada rol
+COMPONENTES_POR_ROL = {
+    'kiosk': ('bd', 'camara', 'modelos'),
+    'iot-gateway': ('bd', 'mqtt'),
+    'dashboard': ('bd',),
+}
+
+REINTENTO_SEGUNDOS = int(os.environ.get("SMARTPORT_CALENTAR_REINTENTO", "10"))
+
+_estado = {}
+_estado_lock = threading.Lock()
+
+def _marcar(componente, estado, inicio=None, detalle=None):
+    """Actualizar el estado de un componente"""
+    with _estado_lock:
+        _estado[componente] = {
+            'estado': estado,
+            'segundos': round(time.time() - inicio, 3) if inicio else None,
+            'detalle': detalle
+        }
+
+def calentar_bd():
+    """
+    Abrir una conexion y ejecutar SELECT 1 para validar credenciales y red
+    
+    Returns:
+        bool: True si la BD respondio
+    """
+    conn = get_db_connection()
+    if not conn:
+        return False
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        cursor.close()
+        return True
+    finally:
+        conn.close()
+
+def calentar_camara():
+    """Abrir la camara del kiosko una vez (ver dispositivos.calentar_camara)"""
+    import dispositivos
+    return dispositivos.calentar_camara()
+
+def calentar_modelos():
+    """Cargar los modelos de dlib (ver dispositivos.calentar_modelos)"""
+    import dispositivos
+    return dispositivos.calentar_modelos()
+
+_CALENTADORES = {
+    'bd': calentar_bd,
+    'camara': calentar_camara,
+    'modelos': calentar_modelos,
+}
+
+def componentes_de(roles):
+    """Lista ordenada y sin duplicados de componentes para los roles dados"""
+    componentes = []
+    for rol in roles:
+        for componente in COMPONENTES_POR_ROL.get(rol, ()):
+            if componente not in componentes:
+                componentes.append(componente)
+    return componentes
+
+def _calentar_componente(componente):
+    """
+    Ejecutar el calentador de un componente y registrar su estado
+    
+    Returns:
+        bool: True si el componente quedo listo
+    """
+    inicio = time.time()
+    _marcar(componente, 'calentando', inicio)
+    print(f"[INFO] Calentando {componente}...")
+    
+    try:
+        if _CALENTADORES[componente]():
+            _marcar(componente, 'listo', inicio)
+            print(f"[OK] {componente} listo ({time.time() - inicio:.2f}s)")
+            return True
+        _marcar(componente, 'error', inicio, 'no disponible')
+        print(f"[WARNING] {componente} no disponible")
+    except Exception as e:
+        _marcar(componente, 'error', inicio, str(e))
+        print(f"[ERROR] Error calentando {componente}: {e}")
+    return False
+
+def calentar(roles):
+    """
+    Calentar secuencialmente los componentes de los roles
+    Los que fallan (BD caida, camara desconectada) se reintentan
+    cada REINTENTO_SEGUNDOS hasta quedar listos
+    
+    Args:
+        roles: Lista de roles cargados en este proceso
+    """
+    # 'mqtt' no tiene calentador: es estado vivo, se consulta en estado_readiness
+    pendientes = [c for c in componentes_de(roles) if c in _CALENTADORES]
+    
+    while pendientes:
+        pendientes = [c for c in pendientes if not _calentar_componente(c)]
+        if pendientes:
+            time.sleep(REINTENTO_SEGUNDOS)
+
+def iniciar_calentamiento(roles):
+    """
+    Lanzar el calentamiento en un thread para no retrasar el arranque de Flask
+    
+    Args:
+        roles: Lista de roles cargados en este proceso
+    
+    Returns:
+        threading.Thread: Thread de calentamiento
+    """
+    for componente in componentes_de(roles):
+        if componente in _CALENTADORES:
+            _marcar(componente, 'pendiente')
+    
+    thread = threading.Thread(target=calentar, args=(roles,), daemon=True,
+                              name='calentamiento')
+    thread.start()
+    return thread
+
+def omitir_calentamiento(roles):
+    """
+    Calentamiento desactivado: marcar los componentes como 'sin_calentar'
+    para que /api/ready no se quede en 'warming' para siempre
+    
+    Args:
+        roles: Lista de roles cargados en este proceso
+    """
+    for componente in componentes_de(roles):
+        if componente in _CALENTADORES:
+            _marcar(componente, 'sin_calentar', detalle='SMARTPORT_CALENTAR=0')
+
+def estado_readiness(roles):
+    """
+    Estado de cada componente y si el proceso esta listo para atender
+    
+    Args:
+        roles: Lista de roles cargados en este proceso
+    
+    Returns:
+        tuple: (listo: bool, componentes: dict)
+    """
+    with _estado_lock:
+        componentes = {c: dict(e) for c, e in _estado.items()}
+    
+    if 'mqtt' in componentes_de(roles):
+        import mqtt_gateway
+        # gateway_activo(): en modo async la conexion la lleva gateway_async
+        conectado = mqtt_gateway.gateway_activo().mqtt_conectado
+        componentes['mqtt'] = {
+            'estado': 'listo' if conectado else 'error',
+            'segundos': None,
+            'detalle': f"{mqtt_gateway.MQTT_BROKER}:{mqtt_gateway.MQTT_PORT}"
+        }
+    
+    listo = all(
+        componentes.get(c, {}).get('estado') in ('listo', 'sin_calentar')
+        for c in componentes_de(roles)
+    )
+    return listo, componentes
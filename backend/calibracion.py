@@ -0,0 +1,392 @@
+"""
+calibracion.py - Calibracion offline del umbral facial (FAR/FRR/EER)
+SmartPort v2.0
+
+El kiosko concede el acceso con similitud >= UMBRAL_SIMILITUD_ACCESO (60%),
+que con la escala de similitud.distancia_a_porcentaje equivale a distancia
+euclidiana <= 0.24; camera_recognition.verificar_persona usa 0.6. Este
+script mide que tasas de error dan esos valores con los datos reales y
+recomienda un umbral global y uno por kiosko (SMARTPORT_UMBRAL_SIMILITUD).
+
+Datos:
+- Plantillas: almacen de embeddings (almacen_embeddings.py) o, con
+  --fuente bd, la tabla pasajeros
+- Intentos: eventos ROSTRO de la bitacora (migracion 007) con el pasajero
+  que presento la tarjeta. Si el evento guardo el embedding
+  (SMARTPORT_BITACORA_EMBEDDING=1) se compara contra todas las plantillas;
+  si no, solo se usa su distancia registrada como par genuino
+
+Pares:
+- genuinos: intento vs plantilla del pasajero de la tarjeta (se asume que
+  quien presenta la tarjeta es su titular)
+- impostores: intento vs el resto de plantillas, y plantilla vs plantilla
+  (una muestra de --muestra plantillas si hay mas: con 100k plantillas
+  serian 5e9 pares)
+
+Nada se guarda par a par: cada bloque de la matriz de distancias se
+calcula con similitud.matriz_distancias, se acumula en un histograma de
+BINS clases y se descarta. La memoria la fija --memoria-mb, no el numero
+de plantillas.
+
+Uso:
+    python calibracion.py --desde 2026-09-01 --far 0.001
+    python calibracion.py --fuente bd --muestra 50000 --csv curvas.csv --json resumen.json
+"""
+
+import argparse
+import csv
+import json
+import pickle
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pymysql
+
+from db import get_db_connection
+from similitud import matriz_distancias, UMBRAL_DISTANCIA
+
+# Histograma de distancias euclidianas: [0, DISTANCIA_MAX) en pasos de 0.0005
+DISTANCIA_MAX = 2.0
+BINS = 4000
+ANCHO_BIN = DISTANCIA_MAX / BINS
+
+# Bytes por celda del bloque: distancia float32 + indice de bin + mascara
+BYTES_POR_CELDA = 12
+
+def distancia_de_similitud(porcentaje):
+    """Inversa de similitud.distancia_a_porcentaje"""
+    return UMBRAL_DISTANCIA * (1.0 - porcentaje / 100.0)
+
+def similitud_de_distancia(distancia):
+    return float(np.clip((UMBRAL_DISTANCIA - distancia) / UMBRAL_DISTANCIA * 100.0, 0.0, 100.0))
+
+# Umbrales en uso hoy (distancia con la que se acepta)
+UMBRALES_ACTUALES = {
+    'kiosko_60': distancia_de_similitud(60.0),
+    'verificar_persona': UMBRAL_DISTANCIA,
+}
+
+# ========================================
+# CARGA DE DATOS
+# ========================================
+
+def cargar_plantillas(fuente='almacen'):
+    """
+    Plantillas vigentes ordenadas por id_pasajero
+
+    Args:
+        fuente: 'almacen' (memmap, sin deserializar) o 'bd'
+
+    Returns:
+        tuple: (ids (N,) int64 ordenados, matriz (N,128) float32)
+    """
+    if fuente == 'almacen':
+        from almacen_embeddings import AlmacenEmbeddings
+        almacen = AlmacenEmbeddings(escritura=False)
+        if not almacen.abrir():
+            raise RuntimeError("Almacen de embeddings no disponible (usar --fuente bd)")
+        ids, matriz = almacen.matriz_valida()
+    else:
+        conn = get_db_connection()
+        if not conn:
+            raise RuntimeError("No hay conexion a la BD")
+        ids, filas = [], []
+        try:
+            cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+            cursor.execute("""
+                SELECT id_pasajero, rostro_embedding
+                FROM pasajeros
+                WHERE rostro_embedding IS NOT NULL
+            """)
+            for fila in cursor:
+                ids.append(fila['id_pasajero'])
+                filas.append(np.asarray(pickle.loads(fila['rostro_embedding']), dtype=np.float32))
+            cursor.close()
+        finally:
+            conn.close()
+        ids = np.array(ids, dtype=np.int64)
+        matriz = np.array(filas, dtype=np.float32).reshape(len(filas), -1)
+
+    orden = np.argsort(ids, kind='stable')
+    return ids[orden], np.ascontiguousarray(matriz[orden])
+
+def cargar_intentos(desde, hasta):
+    """
+    Intentos faciales de la bitacora agrupados por kiosko
+
+    Returns:
+        dict: dispositivo -> {'ids': [...], 'embeddings': [...],
+              'distancias': [...]} (distancias = intentos sin embedding)
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("No hay conexion a la BD")
+
+    intentos = {}
+    try:
+        cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+        cursor.execute("""
+            SELECT dispositivo, id_pasajero, distancia, embedding
+            FROM eventos_puerta
+            WHERE tipo = 'ROSTRO' AND fecha_hora >= %s AND fecha_hora < %s
+              AND id_pasajero IS NOT NULL
+              AND resultado IN ('CONCEDIDO', 'DENEGADO')
+        """, (desde, hasta))
+        for fila in cursor:
+            grupo = intentos.setdefault(fila['dispositivo'], {'ids': [], 'embeddings': [], 'distancias': []})
+            if fila['embedding']:
+                grupo['ids'].append(fila['id_pasajero'])
+                grupo['embeddings'].append(np.frombuffer(fila['embedding'], dtype=np.float32))
+            elif fila['distancia'] is not None:
+                grupo['distancias'].append(float(fila['distancia']))
+        cursor.close()
+    finally:
+        conn.close()
+    return intentos
+
+# ========================================
+# HISTOGRAMAS POR BLOQUES
+# ========================================
+
+def histograma(distancias):
+    """Conteo por bin de un arreglo de distancias (las >= DISTANCIA_MAX van al ultimo)"""
+    indices = np.minimum(np.asarray(distancias, dtype=np.float32) / ANCHO_BIN, BINS - 1).astype(np.int32)
+    return np.bincount(indices.ravel(), minlength=BINS).astype(np.int64)
+
+def filas_por_bloque(columnas, memoria_mb):
+    return max(1, int(memoria_mb * 2**20 // (max(columnas, 1) * BYTES_POR_CELDA)))
+
+def impostores_plantillas(matriz, memoria_mb, muestra=None, semilla=0):
+    """
+    Histograma de distancias plantilla vs plantilla (triangulo superior)
+
+    Args:
+        matriz: Plantillas (N,128) float32
+        memoria_mb: Memoria maxima por bloque
+        muestra: Plantillas a usar si N es mayor (None = todas)
+
+    Returns:
+        tuple: (histograma, plantillas usadas)
+    """
+    if muestra and len(matriz) > muestra:
+        rng = np.random.default_rng(semilla)
+        matriz = matriz[np.sort(rng.choice(len(matriz), muestra, replace=False))]
+
+    total = np.zeros(BINS, dtype=np.int64)
+    n = len(matriz)
+    i = 0
+    while i < n - 1:
+        # Bloque filas [i, fin) contra columnas [i, n): solo j > fila
+        fin = min(i + filas_por_bloque(n - i, memoria_mb), n - 1)
+        distancias = matriz_distancias(matriz[i:fin], matriz[i:])
+        superior = np.arange(n - i)[np.newaxis, :] > np.arange(fin - i)[:, np.newaxis]
+        total += histograma(distancias[superior])
+        i = fin
+    return total, n
+
+def evaluar_intentos(ids_plantillas, matriz, ids_intentos, embeddings, memoria_mb):
+    """
+    Histogramas genuino e impostor de intentos contra todas las plantillas
+
+    El impostor se obtiene restando al histograma del bloque completo el
+    de las distancias genuinas (la columna del pasajero de cada intento).
+
+    Returns:
+        tuple: (hist_genuinos, hist_impostores, intentos sin plantilla)
+    """
+    genuinos = np.zeros(BINS, dtype=np.int64)
+    impostores = np.zeros(BINS, dtype=np.int64)
+    if not len(embeddings) or not len(matriz):
+        return genuinos, impostores, len(embeddings)
+
+    ids_intentos = np.asarray(ids_intentos, dtype=np.int64)
+    columnas = np.searchsorted(ids_plantillas, ids_intentos)
+    columnas = np.minimum(columnas, len(ids_plantillas) - 1)
+    con_plantilla = ids_plantillas[columnas] == ids_intentos
+
+    consultas = np.asarray(embeddings, dtype=np.float32)[con_plantilla]
+    columnas = columnas[con_plantilla]
+
+    paso = filas_por_bloque(len(matriz), memoria_mb)
+    for i in range(0, len(consultas), paso):
+        distancias = matriz_distancias(consultas[i:i + paso], matriz)
+        propias = distancias[np.arange(len(distancias)), columnas[i:i + paso]]
+        hist_propias = histograma(propias)
+        genuinos += hist_propias
+        impostores += histograma(distancias) - hist_propias
+
+    return genuinos, impostores, int((~con_plantilla).sum())
+
+# ========================================
+# CURVAS Y RECOMENDACION
+# ========================================
+
+def curvas(hist_genuinos, hist_impostores):
+    """
+    FAR y FRR aceptando distancia <= umbral, con umbral en el borde superior de cada bin
+
+    Returns:
+        tuple: (umbrales, far, frr) arreglos (BINS,)
+    """
+    umbrales = (np.arange(BINS) + 1) * ANCHO_BIN
+    total_gen = max(int(hist_genuinos.sum()), 1)
+    total_imp = max(int(hist_impostores.sum()), 1)
+    far = np.cumsum(hist_impostores) / total_imp
+    frr = 1.0 - np.cumsum(hist_genuinos) / total_gen
+    return umbrales, far, frr
+
+def _punto(umbrales, far, frr, umbral):
+    k = min(int(np.ceil(umbral / ANCHO_BIN)) - 1, BINS - 1)
+    k = max(k, 0)
+    return {'far': round(float(far[k]), 6), 'frr': round(float(frr[k]), 6)}
+
+def resumir(hist_genuinos, hist_impostores, far_objetivo):
+    """
+    EER, umbral recomendado para el FAR objetivo y tasas con los umbrales actuales
+
+    Returns:
+        dict: Resumen de un grupo (global o un kiosko)
+    """
+    umbrales, far, frr = curvas(hist_genuinos, hist_impostores)
+    resumen = {
+        'genuinos': int(hist_genuinos.sum()),
+        'impostores': int(hist_impostores.sum())
+    }
+    if not resumen['genuinos'] or not resumen['impostores']:
+        return resumen
+
+    k = int(np.argmin(np.abs(far - frr)))
+    resumen['eer'] = round(float((far[k] + frr[k]) / 2), 6)
+    resumen['umbral_eer'] = round(float(umbrales[k]), 4)
+
+    # Mayor umbral (menos rechazos) que respeta el FAR objetivo
+    k = int(np.searchsorted(far, far_objetivo, side='right')) - 1
+    if k >= 0:
+        resumen['umbral_recomendado'] = round(float(umbrales[k]), 4)
+        resumen['similitud_recomendada'] = round(similitud_de_distancia(umbrales[k]), 1)
+        resumen['far_recomendado'] = round(float(far[k]), 6)
+        resumen['frr_recomendado'] = round(float(frr[k]), 6)
+        if umbrales[k] >= UMBRAL_DISTANCIA:
+            # La escala de similitud del kiosko llega a 0% en UMBRAL_DISTANCIA
+            resumen['similitud_recomendada'] = 0.0
+            resumen['aviso_escala'] = (f"umbral por encima de {UMBRAL_DISTANCIA}: el kiosko no puede "
+                                       f"expresarlo en %, cualquier similitud > 0 se acepta")
+
+    resumen['actuales'] = {
+        nombre: dict(_punto(umbrales, far, frr, umbral), umbral=round(umbral, 4))
+        for nombre, umbral in UMBRALES_ACTUALES.items()
+    }
+    return resumen
+
+# ========================================
+# CLI
+# ========================================
+
+def _fecha(texto):
+    return datetime.strptime(texto, '%Y-%m-%d')
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibracion offline del umbral facial")
+    parser.add_argument('--fuente', choices=('almacen', 'bd'), default='almacen',
+                        help="De donde leer las plantillas registradas")
+    parser.add_argument('--desde', type=_fecha, default=None, help="YYYY-MM-DD (default: hace 30 dias)")
+    parser.add_argument('--hasta', type=_fecha, default=None, help="YYYY-MM-DD exclusivo (default: mañana)")
+    parser.add_argument('--far', type=float, default=0.001, help="FAR objetivo para recomendar el umbral")
+    parser.add_argument('--muestra', type=int, default=20000,
+                        help="Plantillas para los pares plantilla vs plantilla (0 = todas)")
+    parser.add_argument('--memoria-mb', type=float, default=256, help="Memoria maxima por bloque de distancias")
+    parser.add_argument('--min-intentos', type=int, default=50,
+                        help="Intentos genuinos minimos para recomendar un umbral por kiosko")
+    parser.add_argument('--csv', help="Curvas FAR/FRR (umbral, grupo, far, frr) en CSV")
+    parser.add_argument('--json', help="Resumen completo en JSON")
+    args = parser.parse_args()
+
+    hasta = args.hasta or datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time())
+    desde = args.desde or hasta - timedelta(days=31)
+
+    inicio = time.time()
+    ids, matriz = cargar_plantillas(args.fuente)
+    print(f"[INFO] {len(ids)} plantillas ({matriz.nbytes / 2**20:.1f} MB) desde {args.fuente}")
+    if len(ids) < 2:
+        print("[ERROR] Se necesitan al menos 2 plantillas")
+        sys.exit(1)
+
+    intentos = cargar_intentos(desde, hasta)
+    print(f"[INFO] Intentos {desde.date()} - {hasta.date()}: " + (", ".join(
+        f"{d} {len(g['ids']) + len(g['distancias'])}" for d, g in sorted(intentos.items())) or "ninguno"))
+
+    hist_plantillas, usadas = impostores_plantillas(matriz, args.memoria_mb, args.muestra or None)
+    print(f"[INFO] Impostores plantilla vs plantilla: {int(hist_plantillas.sum())} pares "
+          f"({usadas} plantillas, {time.time() - inicio:.1f}s)")
+
+    grupos = {}
+    gen_global = np.zeros(BINS, dtype=np.int64)
+    imp_global = hist_plantillas.copy()
+    for dispositivo, grupo in sorted(intentos.items()):
+        genuinos, impostores, sin_plantilla = evaluar_intentos(
+            ids, matriz, grupo['ids'], grupo['embeddings'], args.memoria_mb)
+        genuinos += histograma(grupo['distancias']) if grupo['distancias'] else 0
+        gen_global += genuinos
+        imp_global += impostores
+
+        # Sin embeddings guardados en este kiosko: impostores de las plantillas
+        propios = bool(impostores.sum())
+        resumen = resumir(genuinos, impostores if propios else hist_plantillas, args.far)
+        resumen['impostores_de'] = 'intentos' if propios else 'plantillas'
+        resumen['sin_plantilla'] = sin_plantilla
+        if resumen['genuinos'] < args.min_intentos:
+            for clave in ('umbral_recomendado', 'similitud_recomendada', 'far_recomendado', 'frr_recomendado'):
+                resumen.pop(clave, None)
+            resumen['aviso'] = f"menos de {args.min_intentos} intentos genuinos: usar el umbral global"
+        grupos[dispositivo] = (resumen, genuinos, impostores if propios else hist_plantillas)
+
+    if not gen_global.sum():
+        print("[WARNING] Sin intentos genuinos en la bitacora: solo se reporta la distribucion impostora")
+    resumen_global = resumir(gen_global, imp_global, args.far)
+
+    print("\n" + "="*88)
+    print(f"{'grupo':<24}{'genuinos':>10}{'impost.':>12}{'EER':>9}{'u_EER':>8}"
+          f"{'u_rec':>8}{'sim_rec':>9}{'FRR rec':>9}")
+    for nombre, r in [('GLOBAL', resumen_global)] + [(d, g[0]) for d, g in grupos.items()]:
+        print(f"{nombre[:23]:<24}{r['genuinos']:>10}{r['impostores']:>12}{r.get('eer')!s:>9}"
+              f"{r.get('umbral_eer')!s:>8}{r.get('umbral_recomendado')!s:>8}"
+              f"{r.get('similitud_recomendada')!s:>9}{r.get('frr_recomendado')!s:>9}")
+    print("-"*88)
+    for nombre, punto in resumen_global.get('actuales', {}).items():
+        print(f"  Umbral actual {nombre} (distancia {punto['umbral']}): FAR {punto['far']}, FRR {punto['frr']}")
+    print("="*88)
+    if 'similitud_recomendada' in resumen_global:
+        print(f"[OK] Recomendado (FAR <= {args.far}): SMARTPORT_UMBRAL_SIMILITUD="
+              f"{resumen_global['similitud_recomendada']} (distancia {resumen_global['umbral_recomendado']})")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            escritor = csv.writer(f)
+            escritor.writerow(('grupo', 'umbral', 'similitud', 'far', 'frr'))
+            series = [('GLOBAL', gen_global, imp_global)] + [(d, g[1], g[2]) for d, g in grupos.items()]
+            for nombre, genuinos, impostores in series:
+                umbrales, far, frr = curvas(genuinos, impostores)
+                # Cada 10 bins (paso 0.005) basta para graficar
+                for k in range(9, BINS, 10):
+                    escritor.writerow((nombre, round(float(umbrales[k]), 4),
+                                       round(similitud_de_distancia(umbrales[k]), 2),
+                                       round(float(far[k]), 6), round(float(frr[k]), 6)))
+        print(f"[OK] Curvas en {args.csv}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'desde': desde.isoformat(),
+                'hasta': hasta.isoformat(),
+                'plantillas': int(len(ids)),
+                'muestra_plantillas': usadas,
+                'far_objetivo': args.far,
+                'global': resumen_global,
+                'kioskos': {d: g[0] for d, g in grupos.items()}
+            }, f, indent=2)
+        print(f"[OK] Resumen en {args.json}")
+
+if __name__ == '__main__':
+    main()
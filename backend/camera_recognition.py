@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
-import face_recognition as fr
+
+from perfiles_rostro import ubicar_rostros, codificar_rostros
+from similitud import matriz_distancias, UMBRAL_DISTANCIA
 
 def obtener_embedding_camara():
     return obtener_embedding_camara_headless(headless=False)
@@ -60,22 +62,24 @@ def obtener_embedding_camara_headless(headless=True, timeout_seconds=2):
         print("No se obtuvo imagen de la cÃ¡mara.")
         return None
 
-    # Detectar rostro con la librerÃ­a 'face_recognition'
-    loc = fr.face_locations(frame)
+    # Detectar rostro con la librerÃ­a 'face_recognition' (perfil del kiosko)
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    loc = ubicar_rostros(rgb)
     if len(loc) == 0:
         print("No se detectÃ³ rostro.")
         return None
 
-    encoding = fr.face_encodings(frame, loc)[0]
+    encoding = codificar_rostros(rgb, loc[:1])[0]
     return np.array(encoding)
 
-def verificar_persona(embedding_bd):
+def verificar_persona(embedding_bd, umbral=UMBRAL_DISTANCIA):
+    """Comparar la camara contra un embedding (umbral: ver calibracion.py)"""
     emb_actual = obtener_embedding_camara_headless(headless=True)
 
     if emb_actual is None:
         return False
 
-    distancia = np.linalg.norm(embedding_bd - emb_actual)
+    distancia = float(matriz_distancias(emb_actual, embedding_bd)[0, 0])
     print("Distancia facial:", distancia)
 
-    return distancia < 0.6
\ No newline at end of file
+    return distancia < umbral
\ No newline at end of file
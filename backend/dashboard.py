@@ -0,0 +1,458 @@
+"""
+dashboard.py - Endpoints de consulta para el panel de administracion
+SmartPort v2.0
+
+Solo lectura de BD: no necesita RFID, camara ni MQTT.
+"""
+
+from flask import Blueprint, request, jsonify, Response
+from datetime import date, datetime, timedelta
+import hashlib
+
+from db import (
+    listar_admins, version_admins, version_pesos, get_db_connection,
+    progreso_embarque, listar_embarques
+)
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+# ========================================
+# CONSULTAS CRITICAS (verificar_planes.py)
+# ========================================
+
+SQL_ULTIMOS_PESOS = """
+    SELECT 
+        id_peso,
+        id_bascula,
+        peso_kg,
+        fecha_hora,
+        CASE 
+            WHEN peso_kg > 2.0 THEN 'SOBREPESO'
+            WHEN peso_kg > 1.5 THEN 'ADVERTENCIA'
+            ELSE 'NORMAL'
+        END as estado
+    FROM pesos_equipaje
+    ORDER BY fecha_hora DESC
+    LIMIT %s
+"""
+
+# Rango sobre fecha_hora (no DATE(fecha_hora)) para usar idx_fecha_hora
+SQL_ESTADISTICAS_PESOS_HOY = """
+    SELECT 
+        COUNT(*) as total,
+        AVG(peso_kg) as promedio,
+        MAX(peso_kg) as maximo,
+        MIN(peso_kg) as minimo,
+        SUM(CASE WHEN peso_kg > 2.0 THEN 1 ELSE 0 END) as sobrepesos
+    FROM pesos_equipaje
+    WHERE fecha_hora >= CURDATE()
+      AND fecha_hora < CURDATE() + INTERVAL 1 DAY
+"""
+
+SQL_REINTENTOS_EVENTOS = """
+    SELECT dispositivo, id_pasajero,
+           COUNT(*) AS intentos,
+           SUM(resultado IN ('CONCEDIDO', 'ABRIR')) AS exitos,
+           TIMESTAMPDIFF(MICROSECOND, MIN(fecha_hora), MAX(fecha_hora)) / 1000000 AS duracion_s
+    FROM eventos_puerta
+    WHERE tipo = %s AND fecha_hora >= %s AND fecha_hora < %s
+      AND id_pasajero IS NOT NULL
+    GROUP BY dispositivo, id_pasajero
+"""
+
+def sql_throughput_eventos(formato_periodo, por_dispositivo):
+    """
+    Consulta de throughput de eventos_puerta
+    
+    Args:
+        formato_periodo: Formato DATE_FORMAT del periodo (PERIODOS_EVENTOS)
+        por_dispositivo: True para filtrar por dispositivo (parametro extra)
+    
+    Returns:
+        str: SQL con parametros (desde, hasta[, dispositivo])
+    """
+    # Rango sobre fecha_hora para usar idx_eventos_dispositivo_fecha / idx_eventos_tipo_fecha
+    return f"""
+        SELECT dispositivo, tipo, DATE_FORMAT(fecha_hora, '{formato_periodo}') AS periodo,
+               resultado, COUNT(*) AS eventos,
+               ROUND(AVG(latencia_ms)) AS latencia_media_ms,
+               MAX(latencia_ms) AS latencia_max_ms
+        FROM eventos_puerta
+        WHERE fecha_hora >= %s AND fecha_hora < %s
+          {'AND dispositivo = %s' if por_dispositivo else ''}
+        GROUP BY dispositivo, tipo, periodo, resultado
+        ORDER BY periodo, dispositivo, tipo
+    """
+
+def _etag(*version):
+    """ETag a partir de la version de la tabla y los parametros de la consulta"""
+    return hashlib.sha1(repr(version).encode()).hexdigest()[:20]
+
+def _responder_condicional(etag, construir):
+    """
+    304 si el cliente ya tiene esta version; si no, construir la respuesta
+    
+    Args:
+        etag: ETag de la version actual (None = no se pudo calcular)
+        construir: Funcion que arma la respuesta completa
+    
+    Returns:
+        Response de Flask (o tupla de error de construir)
+    """
+    if etag is not None and etag in request.if_none_match:
+        respuesta = Response(status=304)
+        respuesta.set_etag(etag)
+        return respuesta
+    
+    respuesta = construir()
+    if etag is not None and not isinstance(respuesta, tuple):
+        respuesta.set_etag(etag)
+        respuesta.headers['Cache-Control'] = 'no-cache'  # Revalidar siempre
+    return respuesta
+
+# ========================================
+# ENDPOINTS - ADMINISTRADOR (CONSULTA)
+# ========================================
+
+@dashboard_bp.route('/api/admin/listar-admins', methods=['GET'])
+def obtener_admins():
+    """Listar todos los administradores (ETag: max id + total)"""
+    try:
+        version = version_admins()
+        etag = _etag('admins', version) if version is not None else None
+        
+        return _responder_condicional(etag, lambda: jsonify({
+            'status': 'ok',
+            'admins': listar_admins()
+        }))
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+# ========================================
+# ENDPOINTS - DASHBOARD
+# ========================================
+
+@dashboard_bp.route('/api/admin/dashboard-pesos', methods=['GET'])
+def dashboard_pesos():
+    """
+    Obtener los últimos pesos registrados
+    Límite de sobrepeso: 2 kg
+    """
+    try:
+        # Parámetros opcionales
+        limite = request.args.get('limite', 50, type=int)  # Default: últimos 50
+        
+        # Version = (max id_peso, total); las estadisticas son del dia: la fecha tambien cuenta
+        version = version_pesos()
+        etag = _etag('pesos', version, date.today().isoformat(), limite) if version is not None else None
+        
+        return _responder_condicional(etag, lambda: _dashboard_pesos(limite))
+        
+    except Exception as e:
+        print(f"[ERROR] Error en dashboard-pesos: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+def _dashboard_pesos(limite):
+    """Ultimos pesos y estadisticas del dia (consulta completa)"""
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({
+            'status': 'error',
+            'error': 'Error de conexión a BD'
+        }), 500
+    
+    cursor = conn.cursor()
+    
+    cursor.execute(SQL_ULTIMOS_PESOS, (limite,))
+    
+    pesos = cursor.fetchall()
+    
+    # Estadísticas (AJUSTADO: límite 2kg)
+    # Rango sobre fecha_hora (no DATE(fecha_hora)) para usar idx_fecha_hora
+    cursor.execute(SQL_ESTADISTICAS_PESOS_HOY)
+    
+    stats = cursor.fetchone()
+    
+    cursor.close()
+    conn.close()
+    
+    return jsonify({
+        'status': 'ok',
+        'pesos': pesos,
+        'estadisticas': {
+            'total_hoy': stats['total'] or 0,
+            'promedio': round(stats['promedio'], 2) if stats['promedio'] else 0,
+            'maximo': round(stats['maximo'], 2) if stats['maximo'] else 0,
+            'minimo': round(stats['minimo'], 2) if stats['minimo'] else 0,
+            'sobrepesos': stats['sobrepesos'] or 0
+        }
+    })
+
+@dashboard_bp.route('/api/admin/historico-pesos', methods=['GET'])
+def historico_pesos():
+    """
+    Estadisticas diarias de pesos ya archivados (fuera de la retencion de MySQL)
+    Parametros: desde, hasta (AAAA-MM-DD, inclusive)
+    """
+    try:
+        desde = date.fromisoformat(request.args.get('desde', ''))
+        hasta = date.fromisoformat(request.args.get('hasta', ''))
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'error': 'Parametros desde/hasta requeridos (AAAA-MM-DD)'
+        }), 400
+    
+    try:
+        from archivo_pesos import consultar_historico
+        
+        return jsonify({
+            'status': 'ok',
+            'dias': consultar_historico(desde, hasta)
+        })
+        
+    except Exception as e:
+        print(f"[ERROR] Error en historico-pesos: {e}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+# ========================================
+# ENDPOINTS - BITACORA DE EVENTOS (MIGRACION 007)
+# ========================================
+
+PERIODOS_EVENTOS = {
+    'minuto': '%%Y-%%m-%%d %%H:%%i',
+    'hora': '%%Y-%%m-%%d %%H:00',
+    'dia': '%%Y-%%m-%%d'
+}
+TIPOS_EVENTOS = ('RFID', 'ROSTRO', 'PUERTA')
+
+def _rango_eventos():
+    """
+    Rango desde/hasta de los parametros (ISO, default: ultimas 24 h)
+
+    Raises:
+        ValueError: Fecha con formato invalido o rango vacio
+    """
+    hasta = request.args.get('hasta')
+    desde = request.args.get('desde')
+    hasta = datetime.fromisoformat(hasta) if hasta else datetime.now()
+    desde = datetime.fromisoformat(desde) if desde else hasta - timedelta(days=1)
+    if desde >= hasta:
+        raise ValueError("desde debe ser anterior a hasta")
+    return desde, hasta
+
+def _error_rango(e):
+    return jsonify({
+        'status': 'error',
+        'error': f'Rango invalido ({e}): desde/hasta en formato AAAA-MM-DD[THH:MM]'
+    }), 400
+
+@dashboard_bp.route('/api/admin/eventos', methods=['GET'])
+def listar_eventos():
+    """
+    Ultimos eventos de la bitacora
+    Parametros: dispositivo, tipo, id_pasajero, limite (default 100)
+    """
+    filtros = []
+    parametros = []
+    for campo in ('dispositivo', 'tipo', 'id_pasajero'):
+        valor = request.args.get(campo)
+        if valor:
+            filtros.append(f"{campo} = %s")
+            parametros.append(valor)
+    limite = min(request.args.get('limite', 100, type=int), 1000)
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'status': 'error', 'error': 'Error de conexión a BD'}), 500
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT id_evento, fecha_hora, tipo, dispositivo, resultado, id_pasajero,
+                   rfid_uid, similitud, distancia, latencia_ms
+            FROM eventos_puerta
+            {'WHERE ' + ' AND '.join(filtros) if filtros else ''}
+            ORDER BY id_evento DESC
+            LIMIT %s
+        """, (*parametros, limite))
+        eventos = cursor.fetchall()
+        cursor.close()
+        return jsonify({'status': 'ok', 'eventos': eventos})
+    except Exception as e:
+        print(f"[ERROR] Error listando eventos: {e}")
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+    finally:
+        conn.close()
+
+@dashboard_bp.route('/api/admin/eventos/throughput', methods=['GET'])
+def throughput_eventos():
+    """
+    Eventos por dispositivo, tipo y periodo, desglosados por resultado
+    Parametros: desde, hasta, periodo (minuto|hora|dia), dispositivo
+    """
+    try:
+        desde, hasta = _rango_eventos()
+    except ValueError as e:
+        return _error_rango(e)
+
+    periodo = request.args.get('periodo', 'hora')
+    if periodo not in PERIODOS_EVENTOS:
+        return jsonify({'status': 'error', 'error': f"periodo debe ser {', '.join(PERIODOS_EVENTOS)}"}), 400
+
+    dispositivo = request.args.get('dispositivo')
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'status': 'error', 'error': 'Error de conexión a BD'}), 500
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql_throughput_eventos(PERIODOS_EVENTOS[periodo], bool(dispositivo)),
+                       (desde, hasta, dispositivo) if dispositivo else (desde, hasta))
+        filas = cursor.fetchall()
+        cursor.close()
+    except Exception as e:
+        print(f"[ERROR] Error en throughput de eventos: {e}")
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+    finally:
+        conn.close()
+
+    # {dispositivo: {tipo: {periodo: {total, por_resultado, latencia_media_ms}}}}
+    series = {}
+    for f in filas:
+        punto = series.setdefault(f['dispositivo'], {}).setdefault(f['tipo'], {}).setdefault(
+            f['periodo'], {'total': 0, 'por_resultado': {}, 'latencia_max_ms': None})
+        punto['total'] += f['eventos']
+        punto['por_resultado'][f['resultado']] = {
+            'eventos': f['eventos'],
+            'latencia_media_ms': float(f['latencia_media_ms']) if f['latencia_media_ms'] is not None else None
+        }
+        if f['latencia_max_ms'] is not None:
+            punto['latencia_max_ms'] = max(punto['latencia_max_ms'] or 0, f['latencia_max_ms'])
+
+    return jsonify({
+        'status': 'ok',
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'periodo': periodo,
+        'series': series
+    })
+
+@dashboard_bp.route('/api/admin/eventos/reintentos', methods=['GET'])
+def reintentos_eventos():
+    """
+    Intentos por pasajero y dispositivo (cuantos reintentan y cuanto tardan)
+    Parametros: desde, hasta, tipo (ROSTRO = kiosko, default; PUERTA = puerta fisica)
+    """
+    try:
+        desde, hasta = _rango_eventos()
+    except ValueError as e:
+        return _error_rango(e)
+
+    tipo = request.args.get('tipo', 'ROSTRO')
+    if tipo not in TIPOS_EVENTOS:
+        return jsonify({'status': 'error', 'error': f"tipo debe ser {', '.join(TIPOS_EVENTOS)}"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'status': 'error', 'error': 'Error de conexión a BD'}), 500
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(SQL_REINTENTOS_EVENTOS, (tipo, desde, hasta))
+        filas = cursor.fetchall()
+        cursor.close()
+    except Exception as e:
+        print(f"[ERROR] Error en reintentos de eventos: {e}")
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+    finally:
+        conn.close()
+
+    dispositivos = {}
+    for f in filas:
+        d = dispositivos.setdefault(f['dispositivo'], {
+            'pasajeros': 0, 'intentos': 0, 'pasajeros_con_reintento': 0,
+            'sin_exito': 0, 'histograma': {}, '_duraciones': []
+        })
+        intentos = int(f['intentos'])
+        d['pasajeros'] += 1
+        d['intentos'] += intentos
+        if intentos > 1:
+            d['pasajeros_con_reintento'] += 1
+            d['_duraciones'].append(float(f['duracion_s'] or 0))
+        if not f['exitos']:
+            d['sin_exito'] += 1
+        clave = str(intentos) if intentos < 5 else '5+'
+        d['histograma'][clave] = d['histograma'].get(clave, 0) + 1
+
+    for d in dispositivos.values():
+        duraciones = d.pop('_duraciones')
+        d['reintentos'] = d['intentos'] - d['pasajeros']
+        d['tasa_reintento'] = round(d['pasajeros_con_reintento'] / d['pasajeros'], 4)
+        d['duracion_media_reintento_s'] = round(sum(duraciones) / len(duraciones), 1) if duraciones else None
+
+    return jsonify({
+        'status': 'ok',
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'tipo': tipo,
+        'dispositivos': dispositivos
+    })
+
+# ========================================
+# ENDPOINTS - EMBARQUE POR VUELO
+# ========================================
+
+def _embarque_json(embarque):
+    for campo in ('fecha_apertura', 'fecha_cierre', 'fecha_actualizacion'):
+        if embarque.get(campo):
+            embarque[campo] = embarque[campo].isoformat()
+    embarque['abierto'] = bool(embarque['abierto'])
+    return embarque
+
+@dashboard_bp.route('/api/admin/embarques', methods=['GET'])
+def obtener_embarques():
+    """
+    Embarques con sus contadores por estado
+    Parametros: todos=1 incluye los cerrados
+    """
+    embarques = listar_embarques(solo_abiertos=request.args.get('todos') != '1')
+    if embarques is None:
+        return jsonify({'status': 'error', 'error': 'Error de conexión a BD'}), 500
+    return jsonify({
+        'status': 'ok',
+        'embarques': [_embarque_json(e) for e in embarques]
+    })
+
+@dashboard_bp.route('/api/admin/embarques/<int:numero_vuelo>', methods=['GET'])
+def obtener_progreso_embarque(numero_vuelo):
+    """
+    Progreso en vivo del embarque de un vuelo
+    
+    Lee una fila de embarques por clave primaria (los contadores se mantienen
+    en cada transicion), asi que se puede consultar cada segundo. ETag por
+    fecha_actualizacion: sin cambios responde 304.
+    """
+    embarque = progreso_embarque(numero_vuelo)
+    if embarque is None:
+        return jsonify({
+            'status': 'error',
+            'error': f'El vuelo {numero_vuelo} no tiene embarque'
+        }), 404
+    
+    etag = _etag('embarque', numero_vuelo, embarque['fecha_actualizacion'], embarque['abierto'])
+    return _responder_condicional(etag, lambda: jsonify({
+        'status': 'ok',
+        'embarque': _embarque_json(embarque)
+    }))
@@ -10,7 +10,10 @@ MODULO 3: Funciones de verificacion de puerta fisica
 import pymysql  # FIX: Reemplazar mysql.connector por pymysql (compatible Python 3.13)
 from pymysql import Error
 import pickle
-import numpy as np
+import uuid
+
+import recursos
+from similitud import matriz_similitud
 
 DB_CONFIG = {
     'host': 'localhost',
@@ -25,11 +28,65 @@ def get_db_connection():
     """Crear conexion a la base de datos"""
     try:
         conn = pymysql.connect(**DB_CONFIG)
-        return conn
+        return recursos.registrar_conexion(conn)
     except Error as e:
         print(f"[ERROR] Error conectando a la base de datos: {e}")
         return None
 
+# ========================================
+# CONSULTAS CRITICAS
+# ========================================
+# Constantes de modulo para que verificar_planes.py haga EXPLAIN sobre el
+# mismo texto que se ejecuta (kiosk.py y dashboard.py tambien las usan)
+
+SQL_VERIFICAR_ADMIN = """
+    SELECT id_admin, nombre, rfid_uid
+    FROM admins
+    WHERE rfid_uid = %s
+"""
+
+SQL_LISTAR_ADMINS = """
+    SELECT id_admin, nombre, rfid_uid, fecha_registro
+    FROM admins
+    ORDER BY fecha_registro DESC
+"""
+
+SQL_PASAJERO_POR_RFID = """
+    SELECT p.id_pasajero, p.nombre_normalizado, p.rfid_uid,
+           p.rostro_embedding, p.estado,
+           v.numero_vuelo, v.destino
+    FROM pasajeros p
+    JOIN vuelos v ON p.numero_vuelo = v.numero_vuelo
+    WHERE p.rfid_uid = %s
+"""
+
+# Kiosko, PASO 2: el embedding se lee del almacen mapeado si esta vigente
+SQL_PASAJERO_VERIFICACION = """
+    SELECT id_pasajero, nombre_normalizado, numero_vuelo,
+           rostro_embedding IS NOT NULL AS tiene_rostro,
+           fecha_actualizacion, estado
+    FROM pasajeros
+    WHERE id_pasajero = %s
+"""
+
+SQL_ACCESO_PASAJERO = """
+    SELECT id_acceso FROM accesos_puerta
+    WHERE id_pasajero = %s
+"""
+
+SQL_CONTEO_EMBARQUE = """
+    SELECT estado, COUNT(*) AS total
+    FROM pasajeros
+    WHERE numero_vuelo = %s
+    GROUP BY estado
+    FOR UPDATE
+"""
+
+SQL_IDS_PASAJEROS_VUELO = """
+    SELECT id_pasajero FROM pasajeros
+    WHERE numero_vuelo = %s AND rostro_embedding IS NOT NULL
+"""
+
 # ========================================
 # FUNCIONES PARA ADMINS
 # ========================================
@@ -42,11 +99,7 @@ def verificar_admin(rfid_uid):
     
     try:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id_admin, nombre, rfid_uid 
-            FROM admins 
-            WHERE rfid_uid = %s
-        """, (rfid_uid,))
+        cursor.execute(SQL_VERIFICAR_ADMIN, (rfid_uid,))
         
         admin = cursor. fetchone()
         return admin
@@ -87,11 +140,7 @@ def listar_admins():
     
     try:
         cursor = conn. cursor()
-        cursor.execute("""
-            SELECT id_admin, nombre, rfid_uid, fecha_registro 
-            FROM admins 
-            ORDER BY fecha_registro DESC
-        """)
+        cursor.execute(SQL_LISTAR_ADMINS)
         
         admins = cursor.fetchall()
         return admins
@@ -102,6 +151,29 @@ def listar_admins():
         cursor.close()
         conn. close()
 
+def version_admins():
+    """
+    Version de la tabla admins para ETag (sin leer filas)
+    
+    Returns:
+        tuple: (max id_admin, total) o None si no hay conexion
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(id_admin) AS ultimo, COUNT(*) AS total FROM admins")
+        fila = cursor.fetchone()
+        return (fila['ultimo'], fila['total'])
+    except Error as e:
+        print(f"[ERROR] Error consultando version de admins: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
 # ========================================
 # FUNCIONES PARA VUELOS
 # ========================================
@@ -151,6 +223,222 @@ def buscar_o_crear_vuelo(numero_vuelo, destino="DESTINO"):
         cursor.close()
         conn.close()
 
+# ========================================
+# SESIONES DE EMBARQUE (MIGRACION 008)
+# ========================================
+
+# Columna de embarques que cuenta cada estado de pasajeros
+CONTADORES_EMBARQUE = {
+    'REGISTRADO': 'registrados',
+    'VALIDADO': 'validados',
+    'ABORDADO': 'abordados',
+    'COMPLETO': 'completos'
+}
+
+# Puerta y spool: la transicion ABORDADO -> COMPLETO solo conoce el pasajero
+SQL_EMBARQUE_COMPLETO = """
+    UPDATE embarques e
+    JOIN pasajeros p ON p.numero_vuelo = e.numero_vuelo
+    SET e.abordados = e.abordados - 1,
+        e.completos = e.completos + 1
+    WHERE p.id_pasajero = %s AND e.abierto = 1
+"""
+
+def _contar_transicion(cursor, numero_vuelo, anterior, nuevo, cantidad=1):
+    """
+    Mover contadores del embarque del vuelo (si esta abierto)
+
+    Se ejecuta en la misma transaccion que cambia pasajeros.estado, asi
+    que el contador nunca queda adelantado ni atrasado respecto a la tabla.
+
+    Args:
+        cursor: Cursor de la transaccion en curso
+        numero_vuelo: Vuelo del pasajero
+        anterior: Estado previo (None si el pasajero es nuevo)
+        nuevo: Estado nuevo
+        cantidad: Pasajeros que hacen la misma transicion
+    """
+    if anterior == nuevo or not cantidad:
+        return
+    cambios = []
+    if anterior:
+        columna = CONTADORES_EMBARQUE[anterior]
+        cambios.append(f"{columna} = {columna} - %s")
+    if nuevo:
+        columna = CONTADORES_EMBARQUE[nuevo]
+        cambios.append(f"{columna} = {columna} + %s")
+    cursor.execute(f"""
+        UPDATE embarques
+        SET {', '.join(cambios)}
+        WHERE numero_vuelo = %s AND abierto = 1
+    """, (cantidad,) * len(cambios) + (numero_vuelo,))
+
+def abrir_embarque(numero_vuelo):
+    """
+    Abrir (o reabrir) el embarque de un vuelo
+
+    Cuenta una sola vez los pasajeros por estado y recorre las filas que
+    consulta la puerta para que queden en el buffer pool de InnoDB; los
+    kioskos precargan los embeddings del vuelo al ver el embarque abierto
+    (almacen_embeddings.py).
+
+    Args:
+        numero_vuelo: Vuelo existente
+
+    Returns:
+        dict: Progreso del embarque (ver progreso_embarque) con 'precargados',
+              o None si el vuelo no existe o no hay conexion
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT numero_vuelo FROM vuelos WHERE numero_vuelo = %s", (numero_vuelo,))
+        if not cursor.fetchone():
+            return None
+
+        # FOR UPDATE: ninguna transicion del vuelo se cuela entre el conteo y el alta
+        cursor.execute(SQL_CONTEO_EMBARQUE, (numero_vuelo,))
+        conteo = {fila['estado']: fila['total'] for fila in cursor.fetchall()}
+
+        cursor.execute("""
+            REPLACE INTO embarques
+                (numero_vuelo, abierto, fecha_apertura, fecha_cierre,
+                 registrados, validados, abordados, completos)
+            VALUES (%s, 1, NOW(), NULL, %s, %s, %s, %s)
+        """, (numero_vuelo,) + tuple(conteo.get(estado, 0) for estado in CONTADORES_EMBARQUE))
+        conn.commit()
+
+        # Calentar lo que leera la puerta (SQL_PASAJERO_PUERTA por rfid_uid)
+        cursor.execute("""
+            SELECT p.id_pasajero, p.rfid_uid, p.estado, a.id_acceso, a.puerta_abierta
+            FROM pasajeros p
+            LEFT JOIN accesos_puerta a ON p.id_pasajero = a.id_pasajero
+            WHERE p.numero_vuelo = %s AND p.rfid_uid IS NOT NULL
+        """, (numero_vuelo,))
+        precargados = len(cursor.fetchall())
+
+        print(f"[OK] Embarque del vuelo {numero_vuelo} abierto - {sum(conteo.values())} pasajeros, "
+              f"{precargados} con RFID precargados")
+        progreso = progreso_embarque(numero_vuelo)
+        if progreso:
+            progreso['precargados'] = precargados
+        return progreso
+    except Error as e:
+        conn.rollback()
+        print(f"[ERROR] Error abriendo embarque: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+def cerrar_embarque(numero_vuelo):
+    """Cerrar el embarque: los contadores quedan congelados"""
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE embarques
+            SET abierto = 0, fecha_cierre = NOW()
+            WHERE numero_vuelo = %s AND abierto = 1
+        """, (numero_vuelo,))
+        conn.commit()
+        return cursor.rowcount > 0
+    except Error as e:
+        print(f"[ERROR] Error cerrando embarque: {e}")
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+def _formatear_embarque(fila):
+    total = sum(fila[columna] for columna in CONTADORES_EMBARQUE.values())
+    fila['total'] = total
+    fila['porcentaje_abordado'] = round(
+        (fila['abordados'] + fila['completos']) * 100 / total, 1) if total else 0.0
+    return fila
+
+def progreso_embarque(numero_vuelo):
+    """
+    Contadores del embarque de un vuelo (lectura por clave primaria)
+
+    Returns:
+        dict: numero_vuelo, abierto, fechas, registrados, validados,
+              abordados, completos, total y porcentaje_abordado;
+              None si el vuelo no tiene embarque o no hay conexion
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT numero_vuelo, abierto, fecha_apertura, fecha_cierre,
+                   registrados, validados, abordados, completos, fecha_actualizacion
+            FROM embarques
+            WHERE numero_vuelo = %s
+        """, (numero_vuelo,))
+        fila = cursor.fetchone()
+        return _formatear_embarque(fila) if fila else None
+    except Error as e:
+        print(f"[ERROR] Error leyendo embarque: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+def listar_embarques(solo_abiertos=True):
+    """
+    Embarques con sus contadores, los mas recientes primero
+
+    Returns:
+        list: dicts como progreso_embarque, o None si no hay conexion
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT e.numero_vuelo, v.destino, e.abierto, e.fecha_apertura, e.fecha_cierre,
+                   e.registrados, e.validados, e.abordados, e.completos, e.fecha_actualizacion
+            FROM embarques e
+            JOIN vuelos v ON v.numero_vuelo = e.numero_vuelo
+            {'WHERE e.abierto = 1' if solo_abiertos else ''}
+            ORDER BY e.fecha_apertura DESC
+        """)
+        return [_formatear_embarque(fila) for fila in cursor.fetchall()]
+    except Error as e:
+        print(f"[ERROR] Error listando embarques: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+def ids_pasajeros_vuelo(numero_vuelo):
+    """IDs de los pasajeros de un vuelo con rostro registrado (precarga del kiosko)"""
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(SQL_IDS_PASAJEROS_VUELO, (numero_vuelo,))
+        return [fila['id_pasajero'] for fila in cursor.fetchall()]
+    except Error as e:
+        print(f"[ERROR] Error listando pasajeros del vuelo: {e}")
+        return []
+    finally:
+        cursor.close()
+        conn.close()
+
 # ========================================
 # FUNCIONES PARA PASAJEROS (MODO ADMIN)
 # ========================================
@@ -175,7 +463,8 @@ def crear_pasajero(nombre, numero_vuelo):
             INSERT INTO pasajeros (nombre_normalizado, numero_vuelo)
             VALUES (%s, %s)
         """, (nombre_norm, vuelo['numero_vuelo']))
-        
+        _contar_transicion(cursor, vuelo['numero_vuelo'], None, 'REGISTRADO')
+
         conn.commit()
         id_pasajero = cursor.lastrowid
         
@@ -230,15 +519,27 @@ def registrar_rostro_pasajero(id_pasajero, embedding):
         
         # Serializar el embedding (numpy array) a bytes
         embedding_bytes = pickle. dumps(embedding)
-        
+
+        # Estado previo bloqueado hasta el COMMIT (contador del embarque)
         cursor.execute("""
-            UPDATE pasajeros 
+            SELECT estado, numero_vuelo FROM pasajeros
+            WHERE id_pasajero = %s
+            FOR UPDATE
+        """, (id_pasajero,))
+        previo = cursor.fetchone()
+        if not previo:
+            conn.rollback()
+            return False
+
+        cursor.execute("""
+            UPDATE pasajeros
             SET rostro_embedding = %s, estado = 'VALIDADO'
             WHERE id_pasajero = %s
         """, (embedding_bytes, id_pasajero))
-        
+        _contar_transicion(cursor, previo['numero_vuelo'], previo['estado'], 'VALIDADO')
+
         conn.commit()
-        return cursor.rowcount > 0
+        return True
     except Error as e:
         print(f"[ERROR] Error registrando rostro: {e}")
         return False
@@ -246,6 +547,177 @@ def registrar_rostro_pasajero(id_pasajero, embedding):
         cursor.close()
         conn.close()
 
+# ========================================
+# IMPORTACION MASIVA DE MANIFIESTOS
+# ========================================
+
+MANIFIESTO_LOTE = 500
+
+def _validar_fila_manifiesto(fila):
+    """
+    Normalizar una fila de manifiesto
+    
+    Returns:
+        tuple: (nombre_normalizado, numero_vuelo, destino) o (None, error)
+    """
+    if not isinstance(fila, dict):
+        return None, 'Fila invalida (se esperaba un objeto)'
+    
+    nombre = str(fila.get('nombre') or '').upper().strip()
+    destino = str(fila.get('destino') or 'DESTINO').upper().strip()[:50]
+    
+    if not nombre:
+        return None, 'Nombre requerido'
+    if len(nombre) > 150:
+        return None, 'Nombre demasiado largo (max 150)'
+    
+    try:
+        numero_vuelo = int(str(fila.get('numero_vuelo', '')).strip())
+    except ValueError:
+        return None, 'Numero de vuelo invalido'
+    
+    if not 0 <= numero_vuelo <= 9999:
+        return None, 'Numero de vuelo fuera de rango (0-9999)'
+    
+    return (nombre, numero_vuelo, destino), None
+
+def _insertar_lote_pasajeros(cursor, lote):
+    """
+    INSERT multi-fila de un lote; devuelve los ids asignados en orden
+    
+    Con innodb_autoinc_lock_mode=2 los AUTO_INCREMENT de un INSERT multi-fila
+    pueden intercalarse con los de otras sesiones, asi que no se suponen
+    consecutivos: se vuelven a leer en la misma transaccion por
+    (nombre_normalizado, numero_vuelo) desde lastrowid, en orden de id.
+    Si otra sesion inserto a la vez los mismos pasajeros la asignacion es
+    ambigua y se lanza Error (importar_manifiesto reintenta fila por fila,
+    donde lastrowid es exacto).
+    """
+    claves = [(nombre, vuelo) for _, (nombre, vuelo, _) in lote]
+    cursor.executemany("""
+        INSERT INTO pasajeros (nombre_normalizado, numero_vuelo)
+        VALUES (%s, %s)
+    """, claves)
+    
+    if cursor.rowcount != len(lote):
+        raise Error(f"Filas insertadas {cursor.rowcount} != {len(lote)}")
+    
+    if len(lote) == 1:
+        return [cursor.lastrowid]
+    
+    distintas = list(dict.fromkeys(claves))
+    cursor.execute(f"""
+        SELECT id_pasajero, nombre_normalizado, numero_vuelo
+        FROM pasajeros
+        WHERE id_pasajero >= %s
+          AND (nombre_normalizado, numero_vuelo) IN ({', '.join(['(%s, %s)'] * len(distintas))})
+        ORDER BY id_pasajero
+    """, [cursor.lastrowid] + [valor for clave in distintas for valor in clave])
+    
+    ids_por_clave = {}
+    for fila in cursor.fetchall():
+        ids_por_clave.setdefault((fila['nombre_normalizado'], fila['numero_vuelo']), []).append(fila['id_pasajero'])
+    
+    ids = []
+    for clave in claves:
+        disponibles = ids_por_clave.get(clave)
+        if not disponibles:
+            raise Error(f"No se encontro el id insertado de {clave[0]} (vuelo {clave[1]})")
+        ids.append(disponibles.pop(0))
+    
+    if any(ids_por_clave.values()):
+        raise Error("Pasajeros identicos insertados por otra sesion - ids ambiguos")
+    
+    return ids
+
+def importar_manifiesto(filas, tamano_lote=MANIFIESTO_LOTE):
+    """
+    Importar un manifiesto de pasajeros en lotes
+    
+    - Upsert de cada vuelo distinto una sola vez (INSERT ... ON DUPLICATE KEY)
+    - Pasajeros con executemany, una transaccion por lote
+    - Si un lote falla, se reintenta fila por fila para aislar la fila invalida
+    
+    Args:
+        filas: Iterable de dicts {nombre, numero_vuelo, destino?}; se consume
+               en lotes, asi que puede ser un generador (CSV en streaming)
+        tamano_lote: Pasajeros por transaccion
+    
+    Returns:
+        list: Un resultado por fila {fila, status, id_pasajero | error}
+              o None si no hay conexion a BD
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    resultados = []
+    vuelos_vistos = set()
+    cursor = None
+    
+    def procesar(lote):
+        # Vuelos nuevos de este lote (una sola vez por numero_vuelo)
+        vuelos_nuevos = {}
+        for _, (_, vuelo, destino) in lote:
+            if vuelo not in vuelos_vistos:
+                vuelos_nuevos.setdefault(vuelo, destino)
+        
+        try:
+            if vuelos_nuevos:
+                cursor.executemany("""
+                    INSERT INTO vuelos (numero_vuelo, destino)
+                    VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE numero_vuelo = numero_vuelo
+                """, list(vuelos_nuevos.items()))
+            
+            ids = _insertar_lote_pasajeros(cursor, lote)
+            por_vuelo = {}
+            for _, (_, vuelo, _) in lote:
+                por_vuelo[vuelo] = por_vuelo.get(vuelo, 0) + 1
+            for vuelo, cantidad in por_vuelo.items():
+                _contar_transicion(cursor, vuelo, None, 'REGISTRADO', cantidad)
+            conn.commit()
+            vuelos_vistos.update(vuelos_nuevos)
+            
+            for (indice, (nombre, vuelo, _)), id_pasajero in zip(lote, ids):
+                resultados.append({
+                    'fila': indice, 'status': 'ok', 'id_pasajero': id_pasajero,
+                    'nombre': nombre, 'numero_vuelo': vuelo
+                })
+        except Error as e:
+            conn.rollback()
+            if len(lote) == 1:
+                resultados.append({'fila': lote[0][0], 'status': 'error', 'error': str(e)})
+                return
+            print(f"[WARNING] Lote de {len(lote)} filas fallo ({e}) - reintentando fila por fila")
+            for item in lote:
+                procesar([item])
+    
+    try:
+        cursor = conn.cursor()
+        lote = []
+        
+        for indice, fila in enumerate(filas, start=1):
+            datos, error = _validar_fila_manifiesto(fila)
+            if error:
+                resultados.append({'fila': indice, 'status': 'error', 'error': error})
+                continue
+            
+            lote.append((indice, datos))
+            if len(lote) >= tamano_lote:
+                procesar(lote)
+                lote = []
+        
+        if lote:
+            procesar(lote)
+        
+        resultados.sort(key=lambda r: r['fila'])
+        return resultados
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
 # ========================================
 # FUNCIONES PARA ACCESO (MODO USUARIO)
 # ========================================
@@ -258,14 +730,7 @@ def buscar_pasajero_por_rfid(rfid_uid):
     
     try:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT p.id_pasajero, p.nombre_normalizado, p.rfid_uid, 
-                   p.rostro_embedding, p.estado,
-                   v.numero_vuelo, v.destino
-            FROM pasajeros p
-            JOIN vuelos v ON p.numero_vuelo = v.numero_vuelo
-            WHERE p.rfid_uid = %s
-        """, (rfid_uid,))
+        cursor.execute(SQL_PASAJERO_POR_RFID, (rfid_uid,))
         
         pasajero = cursor. fetchone()
         
@@ -301,16 +766,21 @@ def registrar_acceso(id_pasajero, porcentaje_similitud):
         cursor = conn.cursor()
         
         # Verificar si ya tiene acceso registrado
-        cursor.execute("""
-            SELECT id_acceso FROM accesos_puerta 
-            WHERE id_pasajero = %s
-        """, (id_pasajero,))
+        cursor.execute(SQL_ACCESO_PASAJERO, (id_pasajero,))
         
         if cursor.fetchone():
             # Ya tiene acceso registrado (evita duplicados)
             print("[INFO] Pasajero ya tiene acceso registrado previamente")
             return True
         
+        # Estado previo bloqueado hasta el COMMIT (contador del embarque)
+        cursor.execute("""
+            SELECT estado, numero_vuelo FROM pasajeros
+            WHERE id_pasajero = %s
+            FOR UPDATE
+        """, (id_pasajero,))
+        previo = cursor.fetchone()
+        
         # Registrar nuevo acceso
         cursor.execute("""
             INSERT INTO accesos_puerta (id_pasajero, porcentaje_similitud, puerta_abierta)
@@ -323,9 +793,11 @@ def registrar_acceso(id_pasajero, porcentaje_similitud):
             SET estado = 'ABORDADO'
             WHERE id_pasajero = %s
         """, (id_pasajero,))
+        if previo:
+            _contar_transicion(cursor, previo['numero_vuelo'], previo['estado'], 'ABORDADO')
         
         conn.commit()
-        print(f"[OK] Acceso registrado - ID Pasajero: {id_pasajero}, Similitud: {porcentaje_similitud:. 2f}%")
+        print(f"[OK] Acceso registrado - ID Pasajero: {id_pasajero}, Similitud: {porcentaje_similitud:.2f}%")
         return True
     except Error as e:
         print(f"[ERROR] Error registrando acceso: {e}")
@@ -431,6 +903,64 @@ def marcar_puerta_usada(id_acceso):
         cursor.close()
         conn.close()
 
+# ========================================
+# DEDUPLICACION DE PESOS (MIGRACION 010)
+# ========================================
+
+# Se reclaman todos los id_evento del lote con un id de lote propio; los
+# que ya existian (otra instancia, re-entrega, spool) se ignoran y no
+# aparecen en la SELECT por lote
+SQL_RECLAMAR_EVENTOS_PESO = """
+    INSERT IGNORE INTO pesos_eventos (id_evento, lote)
+    VALUES (%s, %s)
+"""
+
+SQL_EVENTOS_PESO_RECLAMADOS = """
+    SELECT id_evento FROM pesos_eventos
+    WHERE lote = %s
+"""
+
+def parametros_reclamo_pesos(ids_evento, lote):
+    """
+    Parametros de SQL_RECLAMAR_EVENTOS_PESO, ordenados por id_evento para
+    que dos lotes con claves comunes tomen los bloqueos en el mismo orden
+    """
+    return [(id_evento, lote) for id_evento in sorted(set(ids_evento))]
+
+def filas_reclamadas(filas, reclamados):
+    """
+    Filas cuyo id_evento reclamo este lote (una por id_evento)
+    
+    Args:
+        filas: dicts con 'id_evento'
+        reclamados: Filas de SQL_EVENTOS_PESO_RECLAMADOS
+    """
+    pendientes = {r['id_evento'] for r in reclamados}
+    nuevas = []
+    for fila in filas:
+        if fila['id_evento'] in pendientes:
+            pendientes.discard(fila['id_evento'])
+            nuevas.append(fila)
+    return nuevas
+
+def reclamar_eventos_peso(cursor, filas):
+    """
+    Quedarse con las filas de peso que aun no se insertaron (misma transaccion
+    que el INSERT en pesos_equipaje: si este falla, el reclamo se revierte)
+    
+    Args:
+        cursor: Cursor pymysql dentro de la transaccion
+        filas: dicts con 'id_evento'
+    
+    Returns:
+        list: Filas nuevas
+    """
+    lote = uuid.uuid4().hex
+    cursor.executemany(SQL_RECLAMAR_EVENTOS_PESO,
+                       parametros_reclamo_pesos([f['id_evento'] for f in filas], lote))
+    cursor.execute(SQL_EVENTOS_PESO_RECLAMADOS, (lote,))
+    return filas_reclamadas(filas, cursor.fetchall())
+
 def registrar_peso(peso_kg):
     """
     MODULO 2: Registrar peso recibido de ESP32 Bascula
@@ -464,52 +994,51 @@ def registrar_peso(peso_kg):
         cursor.close()
         conn. close()
 
+def version_pesos():
+    """
+    Version de pesos_equipaje para ETag (como version_admins): el id mas
+    alto cambia con cada fila nueva y el total cambia cuando archivo_pesos
+    retira particiones antiguas, que no mueven el MAX
+    
+    Returns:
+        tuple: (max id_peso, total) o None si no hay conexion
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+    
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(id_peso) AS ultimo, COUNT(*) AS total FROM pesos_equipaje")
+        fila = cursor.fetchone()
+        return (fila['ultimo'] or 0, fila['total'])
+    except Error as e:
+        print(f"[ERROR] Error consultando version de pesos: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
 # ========================================
 # FUNCION AUXILIAR
 # ========================================
 
-def calcular_similitud_facial(embedding1, embedding2):
+def calcular_similitud_facial(embedding1, embedding2, metrica='euclidiana'):
     """
     Calcular similitud entre dos embeddings faciales
-    Usa distancia euclidiana y la convierte a porcentaje
+    Envoltorio de un solo par sobre similitud.matriz_similitud
     
     Args:
         embedding1: Primer embedding (numpy array o lista)
         embedding2: Segundo embedding (numpy array o lista)
+        metrica: 'euclidiana' (default) o 'coseno'
     
     Returns:
         float: Porcentaje de similitud (0-100)
     """
     try:
-        # Convertir a numpy arrays si no lo son
-        emb1 = np.array(embedding1)
-        emb2 = np.array(embedding2)
-        
-        # Calcular distancia euclidiana
-        distancia = np. linalg.norm(emb1 - emb2)
-        
-        # ✅ FÓRMULA CORREGIDA
-        # En face_recognition, distancias típicas:
-        #   0.0 - 0.4 = Excelente match (mismo usuario)
-        #   0.4 - 0.6 = Match aceptable (mismo usuario)
-        #   > 0.6 = No match (diferente usuario)
-        
-        # Convertir distancia a porcentaje de similitud
-        # usando umbral de 0.6 como referencia
-        umbral_max = 0.6
-        
-        if distancia <= umbral_max:
-            # Mapear distancia [0, 0.6] a similitud [100%, 0%]
-            porcentaje = ((umbral_max - distancia) / umbral_max) * 100
-        else:
-            # Si distancia > 0.6, similitud = 0%
-            porcentaje = 0.0
-        
-        # Registrar en logs para debugging
-        print(f"[DEBUG] Distancia euclidiana: {distancia:.4f}")
-        print(f"[DEBUG] Similitud calculada: {porcentaje:.2f}%")
-        
-        return round(porcentaje, 2)
+        porcentaje = matriz_similitud(embedding1, embedding2, metrica)[0, 0]
+        return round(float(porcentaje), 2)
         
     except Exception as e:
         print(f"[ERROR] Error calculando similitud: {e}")
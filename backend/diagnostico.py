@@ -0,0 +1,136 @@
+"""
+diagnostico.py - Endpoints de diagnostico del proceso
+SmartPort v2.0
+
+Se registra en todos los roles: cada proceso (kiosko, gateway, dashboard)
+se diagnostica por separado en su propio puerto.
+
+- Perfilado bajo demanda (perfilado.py)
+- Memoria (tracemalloc), threads y recursos abiertos (memoria.py, recursos.py)
+"""
+
+import os
+import sys
+
+from flask import Blueprint, request, jsonify, send_from_directory
+
+import memoria
+import perfilado
+import recursos
+
+diagnostico_bp = Blueprint('diagnostico', __name__)
+
+# ========================================
+# ENDPOINTS - PERFILADO BAJO DEMANDA
+# ========================================
+
+@diagnostico_bp.route('/api/admin/perfilado', methods=['GET'])
+def estado_perfilado():
+    """Estado del perfilado y perfiles guardados"""
+    return jsonify({
+        'status': 'ok',
+        'perfilado': perfilado.estado(),
+        'archivos': perfilado.listar()
+    })
+
+@diagnostico_bp.route('/api/admin/perfilado', methods=['POST'])
+def configurar_perfilado():
+    """
+    Activar/desactivar el perfilado
+
+    Body: {"activo": true, "tasa": 0.1, "duracion_s": 300,
+           "rutas": ["kiosk.usuario_verificar_rostro", "mqtt:aeropuerto/puerta/"],
+           "formato": "pstats" | "speedscope"}
+    """
+    data = request.get_json(silent=True) or {}
+
+    if not data.get('activo', True):
+        perfilado.desactivar()
+        return jsonify({'status': 'ok', 'perfilado': perfilado.estado()})
+
+    try:
+        perfilado.activar(
+            tasa=data.get('tasa', 0.1),
+            duracion_s=data.get('duracion_s', 300),
+            rutas=data.get('rutas'),
+            formato=data.get('formato', 'pstats')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 400
+
+    return jsonify({'status': 'ok', 'perfilado': perfilado.estado()})
+
+@diagnostico_bp.route('/api/admin/perfilado/<archivo>', methods=['GET'])
+def descargar_perfil(archivo):
+    """Descargar un perfil guardado"""
+    if archivo not in {a['archivo'] for a in perfilado.listar()}:
+        return jsonify({'status': 'error', 'error': 'Perfil no encontrado'}), 404
+    return send_from_directory(os.path.abspath(perfilado.PERFILES_DIR), archivo, as_attachment=True)
+
+# ========================================
+# ENDPOINTS - MEMORIA, THREADS Y RECURSOS
+# ========================================
+
+@diagnostico_bp.route('/api/admin/diagnostico', methods=['GET'])
+def diagnostico_proceso():
+    """RSS, threads por nombre, camaras y conexiones abiertas"""
+    respuesta = {
+        'status': 'ok',
+        'proceso': memoria.resumen(),
+        'recursos': recursos.estado(),
+        'threads': memoria.inventario_threads()['por_nombre']
+    }
+
+    # Solo si el rol kiosk ya lo cargo (no importar OpenCV en otros roles)
+    dispositivos = sys.modules.get('dispositivos')
+    if dispositivos is not None:
+        respuesta['rfid_lectura_pendiente'] = dispositivos.rfid_lectura_pendiente()
+
+    bitacora = sys.modules.get('bitacora')
+    if bitacora is not None:
+        respuesta['bitacora'] = bitacora.estado()
+
+    return jsonify(respuesta)
+
+@diagnostico_bp.route('/api/admin/diagnostico/threads', methods=['GET'])
+def diagnostico_threads():
+    """Inventario de threads vivos (?pilas=1 incluye la pila de cada uno)"""
+    pilas = request.args.get('pilas') == '1'
+    return jsonify({'status': 'ok', **memoria.inventario_threads(pilas=pilas)})
+
+@diagnostico_bp.route('/api/admin/diagnostico/memoria', methods=['POST'])
+def configurar_tracemalloc():
+    """
+    Activar tracemalloc y fijar la base, o detenerlo
+
+    Body: {"activo": true, "frames": 10}
+    """
+    data = request.get_json(silent=True) or {}
+
+    if not data.get('activo', True):
+        memoria.detener()
+        return jsonify({'status': 'ok', 'activo': False})
+
+    try:
+        frames = int(data.get('frames', 10))
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'error': 'frames debe ser entero'}), 400
+
+    memoria.iniciar(frames=max(1, min(frames, 50)))
+    return jsonify({'status': 'ok', 'activo': True, 'proceso': memoria.resumen()})
+
+@diagnostico_bp.route('/api/admin/diagnostico/memoria', methods=['GET'])
+def diferencia_tracemalloc():
+    """Crecimiento de memoria desde la base (?top=20&agrupar=lineno|filename|traceback)"""
+    agrupar = request.args.get('agrupar', 'lineno')
+    if agrupar not in ('lineno', 'filename', 'traceback'):
+        return jsonify({'status': 'error', 'error': 'agrupar invalido'}), 400
+
+    diferencia = memoria.diferencia(top=request.args.get('top', 20, type=int), agrupar=agrupar)
+    if diferencia is None:
+        return jsonify({
+            'status': 'error',
+            'error': 'tracemalloc no activo (POST /api/admin/diagnostico/memoria primero)'
+        }), 409
+
+    return jsonify({'status': 'ok', 'proceso': memoria.resumen(), 'memoria': diferencia})
@@ -0,0 +1,391 @@
+"""
+dispositivos.py - Hardware local del kiosko (Modulo 1)
+SmartPort v2.0
+
+- Lector RFID MFRC522 (con lock de threading y modo simulacion)
+- Camara USB /dev/video0 + extraccion de embedding facial
+  (deteccion + seguimiento entre frames, ver seguimiento.py)
+
+Solo lo importa el rol "kiosk": cargar OpenCV/dlib no es necesario
+para el gateway IoT ni para el dashboard.
+"""
+
+import cv2
+import os
+import time
+import threading
+
+import recursos
+from perfiles_rostro import obtener_perfil, ubicar_rostros, codificar_rostros
+from seguimiento import SeguidorRostro
+
+CAPTURA_TIEMPO_MAX = float(os.environ.get("SMARTPORT_CAPTURA_TIEMPO_MAX", "10"))
+
+# Intentar importar MFRC522 (puede fallar si no esta conectado)
+try:
+    from mfrc522 import SimpleMFRC522
+    reader = SimpleMFRC522()
+    RFID_DISPONIBLE = True
+    # CRITICO: Lock para evitar lecturas simultaneas del RFID
+    rfid_lock = threading.Lock()
+    print("[OK] MFRC522 inicializado con lock de threading")
+except:
+    print("[WARNING] MFRC522 no disponible - Usando modo simulacion")
+    RFID_DISPONIBLE = False
+    rfid_lock = None
+
+_lectura_pendiente = None  # (thread, resultado) de una lectura que vencio sin tarjeta
+
+# ========================================
+# FUNCIONES AUXILIARES
+# ========================================
+
+def leer_rfid(timeout=30):
+    """
+    Leer tarjeta RFID y retornar UID en formato HEXADECIMAL
+    RECORTA A 8 CARACTERES (4 bytes) para compatibilidad con ESP8266
+    """
+    global _lectura_pendiente
+    
+    if not RFID_DISPONIBLE:
+        # Modo simulación
+        simulated_id = format(int(time.time() * 1000) % 0xFFFFFFFF, '08X')
+        print(f"[SIMULACION] RFID generado: {simulated_id}")
+        return simulated_id
+    
+    # ADQUIRIR LOCK - Solo un thread puede leer RFID a la vez
+    if not rfid_lock.acquire(blocking=True, timeout=5):
+        print("[ERROR] No se pudo adquirir lock para leer RFID (otro proceso leyendo)")
+        return None
+    
+    try:
+        print(f"[INFO] Esperando tarjeta RFID (timeout {timeout}s)...")
+        print("[DEBUG] Lock adquirido - iniciando lectura...")
+        
+        # Una lectura anterior que vencio sigue bloqueada en reader.read():
+        # reutilizarla en lugar de dejar otro thread huerfano (y que el
+        # siguiente toque lo consuma el thread viejo)
+        if _lectura_pendiente is not None and _lectura_pendiente[0].is_alive():
+            thread_lectura, resultado = _lectura_pendiente
+            print("[DEBUG] Reutilizando lectura RFID pendiente")
+        else:
+            thread_lectura, resultado = _nueva_lectura_rfid()
+        
+        # Esperar con timeout
+        thread_lectura.join(timeout=timeout)
+        
+        # Verificar si terminó
+        if not resultado['completado']:
+            _lectura_pendiente = (thread_lectura, resultado)
+            print(f"[TIMEOUT] No se detectó tarjeta en {timeout}s")
+            return None
+        
+        _lectura_pendiente = None
+        
+        if resultado['error']:
+            print(f"[ERROR] Error durante lectura: {resultado['error']}")
+            return None
+        
+        return resultado['rfid']
+        
+    finally:
+        # LIBERAR LOCK - Permitir que otro thread lea
+        rfid_lock.release()
+        print("[DEBUG] Lock liberado")
+
+def rfid_lectura_pendiente():
+    """True si hay un thread bloqueado en reader.read() de una lectura vencida"""
+    pendiente = _lectura_pendiente
+    return pendiente is not None and pendiente[0].is_alive()
+
+def _nueva_lectura_rfid():
+    """Arrancar un thread con reader.read() (bloqueante, no se puede cancelar)"""
+    # Variables compartidas entre threads
+    resultado = {'rfid': None, 'error': None, 'completado': False}
+    
+    def leer_bloqueante():
+        """Thread interno que ejecuta reader.read() bloqueante"""
+        try:
+            id, text = reader.read()  # BLOQUEANTE
+            
+            # Convertir ID a HEXADECIMAL (formato estándar)
+            rfid_hex_completo = format(id, 'X').upper()
+            
+            # RECORTAR A 8 CARACTERES (primeros 4 bytes)
+            # Esto hace que coincida con lo que lee el ESP8266
+            if len(rfid_hex_completo) > 8:
+                rfid_hex = rfid_hex_completo[:8]  # Solo primeros 8 caracteres
+                print(f"[INFO] RFID completo: {rfid_hex_completo}")
+                print(f"[INFO] RFID recortado (8 chars): {rfid_hex}")
+            else:
+                rfid_hex = rfid_hex_completo.zfill(8)  # Rellenar con ceros si es corto
+            
+            resultado['rfid'] = rfid_hex
+            resultado['completado'] = True
+            
+            print(f"[OK] RFID leído: {rfid_hex}")
+            print(f"[DEBUG] ID decimal original: {id}")
+            
+        except Exception as e:
+            resultado['error'] = str(e)
+            resultado['completado'] = True
+            print(f"[ERROR] Error leyendo RFID: {e}")
+    
+    # Crear thread de lectura
+    thread_lectura = threading.Thread(target=leer_bloqueante, daemon=True, name='lectura-rfid')
+    thread_lectura.start()
+    
+    return thread_lectura, resultado
+
+def abrir_camara():
+    """
+    Abrir /dev/video0 (V4L2) a 640x480 y descartar los frames de calentamiento
+    
+    Returns:
+        cv2.VideoCapture abierta, o None si la camara no esta disponible
+    """
+    # Usar explícitamente /dev/video0 con backend V4L2
+    print("[DEBUG] Abriendo /dev/video0 con V4L2...")
+    cap = cv2.VideoCapture(0, cv2.CAP_V4L2)
+    
+    if not cap.isOpened():
+        print("[ERROR] No se pudo acceder a /dev/video0")
+        cap.release()
+        return None
+    
+    print("[OK] Cámara abierta correctamente")
+    recursos.camara_abierta()
+    
+    # Configurar resolución óptima
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    cap.set(cv2.CAP_PROP_FPS, 30)
+    
+    # Dar tiempo a la camara para inicializar
+    print("[INFO] Inicializando cámara (2s)...")
+    time.sleep(2)
+    
+    # Descartar primeros 5 frames (pueden estar en negro o mal expuestos)
+    print("[DEBUG] Descartando frames de calentamiento...")
+    for i in range(5):
+        cap.read()
+    
+    return cap
+
+def cerrar_camara(cap):
+    """Liberar una camara abierta con abrir_camara()"""
+    cap.release()
+    recursos.camara_cerrada()
+
+def capturar_rostro(tiempo_max=CAPTURA_TIEMPO_MAX):
+    """
+    Capturar rostro con la camara y extraer embedding
+    
+    Detecta una vez y sigue la caja entre frames (seguimiento.py); el
+    embedding se calcula cuando el rostro queda estable.
+    
+    Args:
+        tiempo_max: Segundos buscando un rostro antes de rendirse
+    
+    Returns:
+        np.ndarray: Embedding (128,) o None
+    """
+    cap = None
+    try:
+        print("[INFO] Iniciando captura de rostro...")
+        
+        cap = abrir_camara()
+        if cap is None:
+            return None
+        
+        seguidor = SeguidorRostro()
+        limite = time.time() + tiempo_max
+        
+        print("[INFO] Buscando rostro en el frame...")
+        
+        while time.time() < limite:
+            ret, frame = cap.read()
+            
+            if not ret or frame is None or frame.size == 0:
+                print("[WARNING] Frame inválido")
+                time.sleep(0.1)
+                continue
+            
+            resultado = seguidor.procesar(frame)
+            
+            if resultado['embedding'] is not None:
+                embedding = resultado['embedding']
+                print(f"[OK] ✓ Rostro estable (track {resultado['id_track']}): {resultado['caja']}")
+                print(f"[DEBUG] Frames: {seguidor.metricas}")
+                print(f"[OK] ✓ Embedding facial extraído correctamente - Shape: {embedding.shape}")
+                return embedding
+        
+        print(f"[ERROR] ✗ No se detectó ningún rostro estable en {tiempo_max:.0f}s")
+        print(f"[DEBUG] Frames: {seguidor.metricas}")
+        return None
+        
+    except Exception as e:
+        print(f"[ERROR] ✗ Error capturando rostro: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+    finally:
+        if cap is not None:
+            cerrar_camara(cap)
+
+class AdquisicionRostro:
+    """
+    Captura de rostro en segundo plano mientras se espera otra entrada (RFID)
+    
+    Un thread abre la camara y sigue rostros; de cada track estable guarda
+    el embedding y se queda con el del rostro mas grande (el mas cercano a
+    la camara). Cuando llega la tarjeta, el embedding ya esta calculado.
+    
+    Args:
+        tiempo_max: Segundos maximos con la camara abierta
+    """
+    
+    def __init__(self, tiempo_max):
+        self.tiempo_max = tiempo_max
+        self.embedding = None
+        self.area = 0
+        self.listo_en = None
+        self.error = None
+        self._detener = threading.Event()
+        self._hay_rostro = threading.Event()
+        self._terminado = threading.Event()
+        self._lock = threading.Lock()
+        self._inicio = None
+        self._thread = None
+    
+    def iniciar(self):
+        self._inicio = time.time()
+        self._thread = threading.Thread(target=self._capturar, daemon=True, name='adquisicion-rostro')
+        self._thread.start()
+        return self
+    
+    def _capturar(self):
+        cap = None
+        try:
+            cap = abrir_camara()
+            if cap is None:
+                self.error = 'Cámara no disponible'
+                return
+            
+            seguidor = SeguidorRostro()
+            limite = self._inicio + self.tiempo_max
+            
+            while not self._detener.is_set() and time.time() < limite:
+                ret, frame = cap.read()
+                if not ret or frame is None or frame.size == 0:
+                    time.sleep(0.1)
+                    continue
+                
+                resultado = seguidor.procesar(frame)
+                if resultado['embedding'] is None:
+                    continue
+                
+                top, right, bottom, left = resultado['caja']
+                area = (right - left) * (bottom - top)
+                with self._lock:
+                    if area > self.area:
+                        self.embedding = resultado['embedding']
+                        self.area = area
+                        if self.listo_en is None:
+                            self.listo_en = time.time() - self._inicio
+                        print(f"[INFO] Rostro listo (track {resultado['id_track']}, area {area}px)")
+                self._hay_rostro.set()
+            
+            print(f"[DEBUG] Adquisición de rostro terminada - Frames: {seguidor.metricas}")
+        except Exception as e:
+            self.error = str(e)
+            print(f"[ERROR] Error en adquisición de rostro: {e}")
+        finally:
+            try:
+                if cap is not None:
+                    cerrar_camara(cap)
+            finally:
+                # Señal de camara liberada: detener() espera esto, no un timeout
+                self._terminado.set()
+                self._hay_rostro.set()  # Despertar a quien espera aunque no haya rostro
+    
+    def mejor(self, esperar=0):
+        """
+        Mejor embedding capturado hasta ahora
+        
+        Args:
+            esperar: Segundos a esperar si aun no hay ningun rostro
+        
+        Returns:
+            np.ndarray o None
+        """
+        if esperar:
+            self._hay_rostro.wait(timeout=esperar)
+        with self._lock:
+            return self.embedding
+    
+    @property
+    def terminado(self):
+        """True si la camara ya se cerro (tiempo agotado, error o detener())"""
+        return self._terminado.is_set()
+    
+    def detener(self):
+        """
+        Cerrar la camara y esperar a que el thread la libere
+        
+        No vuelve hasta que cap.release() termino: quien abra la camara
+        despues no puede encontrarla ocupada. El thread revisa la bandera
+        entre frames, asi que la espera dura a lo sumo un frame (o lo que
+        tarde abrir_camara si aun estaba abriendo).
+        """
+        self._detener.set()
+        if self._thread is None:
+            return
+        inicio = time.time()
+        while not self._terminado.wait(timeout=2):
+            print(f"[WARNING] Esperando a que se libere la cámara ({time.time() - inicio:.0f}s)")
+
+# ========================================
+# PRE-CALENTAMIENTO (ARRANQUE)
+# ========================================
+
+def calentar_modelos():
+    """
+    Ejecutar el pipeline facial completo sobre un frame sintetico
+    
+    La primera llamada a face_locations/face_encodings carga el detector
+    HOG de dlib, el predictor de landmarks y la red ResNet. Hacerlo al
+    arrancar evita que el primer pasajero pague ese costo. Se usa el
+    perfil del kiosko para cargar el predictor (5 o 68 puntos) que usara.
+    
+    Returns:
+        bool: True si los modelos quedaron cargados
+    """
+    import numpy as np
+    
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    perfil = obtener_perfil()
+    
+    # Carga el detector HOG (no encontrara rostros en un frame negro)
+    ubicar_rostros(frame, perfil)
+    
+    # Ubicacion fija para forzar la carga del predictor y la ResNet
+    encodings = codificar_rostros(frame, [(140, 420, 340, 220)], perfil)
+    
+    return len(encodings) == 1
+
+def calentar_camara():
+    """
+    Abrir /dev/video0 y leer un frame para inicializar el driver V4L2
+    
+    Returns:
+        bool: True si la camara entrego un frame valido
+    """
+    cap = cv2.VideoCapture(0, cv2.CAP_V4L2)
+    try:
+        if not cap.isOpened():
+            return False
+        ret, frame = cap.read()
+        return bool(ret) and frame is not None
+    finally:
+        cap.release()
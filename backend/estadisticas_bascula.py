@@ -0,0 +1,126 @@
+"""
+estadisticas_bascula.py - Estadisticas incrementales por bascula (Modulo 2)
+SmartPort v2.0
+
+Se actualizan con cada peso registrado, en O(1) y sin consultar MySQL:
+
+- Welford: media y varianza de todo lo registrado desde el arranque
+- EWMA: media exponencial (peso reciente, factor ALFA_EWMA)
+- Tasa de sobrepeso: fraccion de maletas sobre LIMITE_SOBREPESO
+- Deriva: prueba de Page-Hinkley de dos lados sobre la serie de pesos;
+  detecta un cambio sostenido de nivel (bascula descalibrada, tara mal hecha)
+"""
+
+import math
+import os
+import threading
+import time
+
+LIMITE_SOBREPESO = 2.0  # kg, mismo limite que dashboard-pesos
+ALFA_EWMA = float(os.environ.get("SMARTPORT_EWMA_ALFA", "0.1"))
+
+# Page-Hinkley: DELTA tolera variaciones normales, LAMBDA es el umbral de alarma (kg acumulados)
+DERIVA_DELTA = float(os.environ.get("SMARTPORT_DERIVA_DELTA", "0.1"))
+DERIVA_LAMBDA = float(os.environ.get("SMARTPORT_DERIVA_LAMBDA", "5.0"))
+DERIVA_MIN_MUESTRAS = 30
+
+_lock = threading.Lock()
+_basculas = {}
+
+class EstadisticaBascula:
+    """Acumuladores de una bascula"""
+
+    def __init__(self):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.ewma = None
+        self.minimo = None
+        self.maximo = None
+        self.sobrepesos = 0
+        self.ultima = None
+        # Page-Hinkley (subida y bajada)
+        self.ph_subida = 0.0
+        self.ph_subida_min = 0.0
+        self.ph_bajada = 0.0
+        self.ph_bajada_max = 0.0
+        self.deriva = None
+
+    def agregar(self, peso, t):
+        self.n += 1
+        delta = peso - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (peso - self.media)
+
+        self.ewma = peso if self.ewma is None else ALFA_EWMA * peso + (1 - ALFA_EWMA) * self.ewma
+        self.minimo = peso if self.minimo is None else min(self.minimo, peso)
+        self.maximo = peso if self.maximo is None else max(self.maximo, peso)
+        if peso > LIMITE_SOBREPESO:
+            self.sobrepesos += 1
+        self.ultima = t
+
+        self._page_hinkley(peso, t)
+
+    def _page_hinkley(self, peso, t):
+        desvio = peso - self.media
+        self.ph_subida += desvio - DERIVA_DELTA
+        self.ph_subida_min = min(self.ph_subida_min, self.ph_subida)
+        self.ph_bajada += desvio + DERIVA_DELTA
+        self.ph_bajada_max = max(self.ph_bajada_max, self.ph_bajada)
+
+        if self.n < DERIVA_MIN_MUESTRAS:
+            return
+
+        direccion = None
+        if self.ph_subida - self.ph_subida_min > DERIVA_LAMBDA:
+            direccion = 'SUBIDA'
+        elif self.ph_bajada_max - self.ph_bajada > DERIVA_LAMBDA:
+            direccion = 'BAJADA'
+
+        if direccion:
+            self.deriva = {'direccion': direccion, 'detectada': t, 'n': self.n,
+                           'ewma': round(self.ewma, 3)}
+            # Reiniciar la prueba para detectar el siguiente cambio
+            self.ph_subida = self.ph_subida_min = 0.0
+            self.ph_bajada = self.ph_bajada_max = 0.0
+
+    def resumen(self):
+        varianza = self.m2 / (self.n - 1) if self.n > 1 else 0.0
+        return {
+            'n': self.n,
+            'media': round(self.media, 3),
+            'desviacion': round(math.sqrt(varianza), 3),
+            'ewma': round(self.ewma, 3) if self.ewma is not None else None,
+            'minimo': round(self.minimo, 3) if self.minimo is not None else None,
+            'maximo': round(self.maximo, 3) if self.maximo is not None else None,
+            'sobrepesos': self.sobrepesos,
+            'tasa_sobrepeso': round(self.sobrepesos / self.n, 4) if self.n else 0.0,
+            'ultima': self.ultima,
+            'deriva': self.deriva
+        }
+
+def registrar(bascula, peso_kg, t=None):
+    """
+    Agregar un peso a las estadisticas de su bascula
+
+    Args:
+        bascula: Id de la bascula
+        peso_kg: Peso registrado
+        t: epoch (default: ahora)
+    """
+    t = time.time() if t is None else t
+    with _lock:
+        estadistica = _basculas.get(bascula)
+        if estadistica is None:
+            estadistica = _basculas[bascula] = EstadisticaBascula()
+        estadistica.agregar(float(peso_kg), t)
+
+def resumen():
+    """
+    Estadisticas de todas las basculas
+
+    Returns:
+        dict: {bascula: {n, media, desviacion, ewma, ..., deriva}}
+    """
+    with _lock:
+        return {b: e.resumen() for b, e in _basculas.items()}
@@ -0,0 +1,75 @@
+"""
+gateway_api.py - Endpoints de monitoreo del gateway IoT (Modulos 2 y 3)
+SmartPort v2.0
+
+Solo se registra en el rol "iot-gateway": expone el estado en memoria
+del proceso que corre el loop MQTT.
+"""
+
+from flask import Blueprint, jsonify
+
+import idempotencia
+import antirrebote
+import estadisticas_bascula
+import metricas_puerta
+import mqtt_gateway
+import pesaje
+import spool
+
+gateway_bp = Blueprint('gateway', __name__)
+
+# ========================================
+# ENDPOINTS - GATEWAY IOT
+# ========================================
+
+@gateway_bp.route('/api/gateway/spool', methods=['GET'])
+def estado_spool():
+    """Eventos pendientes en el spool local, lag y contadores de reenvio"""
+    try:
+        return jsonify({
+            'status': 'ok',
+            'spool': spool.estado()
+        })
+    except Exception as e:
+        print(f"[ERROR] Error consultando spool: {e}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+@gateway_bp.route('/api/gateway/puertas', methods=['GET'])
+def estadisticas_puertas():
+    """Solicitudes, decisiones, toques suprimidos y latencia (p50/p95/p99) por puerta"""
+    return jsonify({
+        'status': 'ok',
+        'puertas': metricas_puerta.resumen(),
+        'antirrebote': antirrebote.estado()
+    })
+
+@gateway_bp.route('/api/gateway/basculas', methods=['GET'])
+def estado_basculas():
+    """
+    Estado de cada bascula (vacia / con maleta) y estadisticas incrementales
+    (media, desviacion, EWMA, tasa de sobrepeso, deriva) - sin consultar MySQL
+    """
+    return jsonify({
+        'status': 'ok',
+        'por_maleta': mqtt_gateway.PESAJE_POR_MALETA,
+        'basculas': pesaje.estado(),
+        'estadisticas': estadisticas_bascula.resumen()
+    })
+
+@gateway_bp.route('/api/gateway/instancia', methods=['GET'])
+def estado_instancia():
+    """Identidad de esta instancia del gateway y mensajes duplicados descartados"""
+    gateway = mqtt_gateway.gateway_activo()
+    return jsonify({
+        'status': 'ok',
+        'client_id': mqtt_gateway.MQTT_CLIENT_ID,
+        'grupo_compartido': mqtt_gateway.MQTT_GRUPO_COMPARTIDO or None,
+        'topics_peso': mqtt_gateway.topics_peso(),
+        'conectado': gateway.mqtt_conectado,
+        'modo': mqtt_gateway.GATEWAY_MODO,
+        'asyncio': gateway.estado() if gateway is not mqtt_gateway else None,
+        'idempotencia': idempotencia.estado()
+    })
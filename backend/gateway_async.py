@@ -0,0 +1,424 @@
+"""
+gateway_async.py - Gateway IoT sobre asyncio (Modulos 2 y 3)
+SmartPort v2.0
+
+Alternativa a mqtt_gateway.py (paho + pymysql en el thread de loop_start,
+una consulta a la vez). Aqui un solo event loop recibe con aiomqtt y
+consulta MySQL con un pool de aiomysql, asi que varias verificaciones de
+puerta e inserciones de peso avanzan a la vez mientras esperan a la BD.
+
+- Concurrencia acotada: como mucho CONCURRENCIA mensajes en proceso; si
+  se llena, se deja de leer del broker (contrapresion)
+- Mismas consultas, topics, anti-rebote, idempotencia, spool, pesaje y
+  metricas que mqtt_gateway.py (se importan de alli)
+- Las lecturas de bascula pasan por pesaje.py en orden de llegada; solo
+  la insercion en BD es concurrente
+- Nada bloquea el event loop: el spool (SQLite con commit) se escribe con
+  asyncio.to_thread y la bitacora solo encola en memoria para su thread
+  escritor, que se arranca con el gateway
+
+Dependencias opcionales (solo para este modo):
+    pip install aiomqtt aiomysql
+
+Uso:
+    SMARTPORT_GATEWAY_MODO=async python app.py --role iot-gateway
+    python gateway_async.py                 # solo el gateway, sin Flask
+"""
+
+import asyncio
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+try:
+    import aiomqtt
+    import aiomysql
+    ASYNC_DISPONIBLE = True
+except ImportError as e:
+    print(f"[WARNING] Gateway asyncio no disponible ({e}) - instale aiomqtt y aiomysql")
+    ASYNC_DISPONIBLE = False
+
+import db
+from db import DB_CONFIG
+import antirrebote
+import bitacora
+import lote_pesos
+import mqtt_gateway as base
+import perfilado
+import pesaje
+import spool
+
+CONCURRENCIA = int(os.environ.get("SMARTPORT_ASYNC_CONCURRENCIA", "32"))
+POOL_MAX = int(os.environ.get("SMARTPORT_ASYNC_POOL", "10"))
+REINTENTO_MQTT = 5
+REINTENTO_POOL_MAX = 60  # Backoff exponencial 1, 2, 4 ... 60 s
+
+mqtt_conectado = False
+
+_loop = None
+_cliente = None
+_pool = None
+_limite = None
+
+metricas = {
+    'mensajes': 0,
+    'en_proceso': 0,
+    'max_en_proceso': 0,
+    'errores': 0
+}
+
+# ========================================
+# MYSQL (POOL ASYNC)
+# ========================================
+
+async def _crear_pool():
+    return await aiomysql.create_pool(
+        host=DB_CONFIG['host'],
+        user=DB_CONFIG['user'],
+        password=DB_CONFIG['password'],
+        db=DB_CONFIG['database'],
+        minsize=1,
+        maxsize=POOL_MAX,
+        autocommit=False,
+        cursorclass=aiomysql.DictCursor
+    )
+
+async def _mantener_pool():
+    """
+    Crear el pool reintentando con backoff mientras MySQL no responda
+
+    Se ejecuta como tarea aparte: el gateway recibe MQTT desde el inicio;
+    sin pool los pesos van al spool y las puertas se deniegan.
+    """
+    global _pool
+    espera = 1
+    while _pool is None:
+        try:
+            _pool = await _crear_pool()
+            print(f"[OK] Pool aiomysql listo (max {POOL_MAX} conexiones, concurrencia {CONCURRENCIA})")
+        except Exception as e:
+            print(f"[WARNING] MySQL no disponible para el pool ({e}) - reintentando en {espera}s")
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, REINTENTO_POOL_MAX)
+
+# ========================================
+# MODULO 3: PUERTA
+# ========================================
+
+async def responder_puerta(solicitud, decision):
+    """Publicar ABRIR/DENEGAR a la puerta que lo pidio (ver mqtt_gateway.responder_puerta)"""
+    topic, payload = base.mensaje_respuesta(solicitud, decision)
+    await _cliente.publish(topic, payload)
+    base.registrar_respuesta(solicitud, decision)
+
+async def verificar_rfid_para_puerta(rfid_uid, solicitud):
+    """
+    MODULO 3: Misma secuencia que mqtt_gateway.verificar_rfid_para_puerta
+    (buscar, validar, reclamar con UPDATE condicional, ABRIR, COMPLETO, COMMIT)
+    """
+    abrir_enviado = False
+    resultado = None
+    fecha_apertura = None
+
+    if _pool is None:
+        metricas['errores'] += 1
+        print(f"[ERROR] Puerta {solicitud['puerta']}: sin conexion a MySQL - {rfid_uid} denegado")
+        await responder_puerta(solicitud, "DENEGAR")
+        return
+
+    try:
+        async with _pool.acquire() as conn:
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(base.SQL_PASAJERO_PUERTA, (rfid_uid,))
+                    resultado = await cursor.fetchone()
+                    if resultado:
+                        solicitud['id_pasajero'] = resultado['id_pasajero']
+
+                    if base.es_toque_repetido(resultado, solicitud['puerta']):
+                        await conn.rollback()
+                        base.metricas_puerta.registrar_suprimida(solicitud['puerta'])
+                        await responder_puerta(solicitud, "ABRIR")
+                        return
+
+                    motivo = base.motivo_denegacion(resultado)
+                    if motivo:
+                        print(f"[ERROR] Puerta {solicitud['puerta']}: {rfid_uid} - {motivo}")
+                        await conn.rollback()
+                        await responder_puerta(solicitud, "DENEGAR")
+                        return
+
+                    await cursor.execute(base.SQL_RECLAMAR_PUERTA, (solicitud['puerta'], resultado['id_acceso']))
+                    if cursor.rowcount == 0:
+                        # La otra solicitud ya hizo COMMIT: si fue en esta puerta, mismo ABRIR
+                        await conn.rollback()
+                        await cursor.execute(base.SQL_PASAJERO_PUERTA, (rfid_uid,))
+                        repetido = base.es_toque_repetido(await cursor.fetchone(), solicitud['puerta'])
+                        await conn.rollback()
+                        print(f"[INFO] Apertura de {rfid_uid} ya reclamada por otra solicitud")
+                        if repetido:
+                            await responder_puerta(solicitud, "ABRIR")
+                        return
+
+                    await responder_puerta(solicitud, "ABRIR")
+                    abrir_enviado = True
+                    fecha_apertura = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+                    await cursor.execute(base.SQL_COMPLETAR_PASAJERO, (resultado['id_pasajero'],))
+                    if cursor.rowcount > 0:
+                        await cursor.execute(base.SQL_EMBARQUE_COMPLETO, (resultado['id_pasajero'],))
+                await conn.commit()
+                print(f"[OK] Puerta {solicitud['puerta']}: ABRIR para {resultado['nombre_normalizado']}")
+            except Exception:
+                await conn.rollback()
+                raise
+
+    except Exception as e:
+        metricas['errores'] += 1
+        print(f"[ERROR] Error verificando {rfid_uid} en puerta {solicitud['puerta']}: {e}")
+        if abrir_enviado:
+            # La puerta ya se abrio: la transicion queda en el spool
+            await asyncio.to_thread(spool.encolar, spool.TIPO_PUERTA, {
+                'id_acceso': resultado['id_acceso'],
+                'id_pasajero': resultado['id_pasajero'],
+                'puerta': solicitud['puerta'],
+                'fecha_hora': fecha_apertura
+            })
+        else:
+            await responder_puerta(solicitud, "DENEGAR")
+
+async def atender_puerta(rfid_uid, solicitud):
+    """Anti-rebote por (puerta, UID), igual que mqtt_gateway.atender_puerta"""
+    puerta = solicitud['puerta']
+
+    anterior = antirrebote.reclamar(puerta, rfid_uid)
+    base.registrar_toque(rfid_uid, solicitud, anterior is not None)
+    if anterior is not None:
+        # La solicitud original puede seguir en curso en otra tarea
+        decision = await asyncio.to_thread(antirrebote.esperar_decision, anterior)
+        base.metricas_puerta.registrar_suprimida(puerta)
+        if decision:
+            await responder_puerta(solicitud, decision)
+        return
+
+    try:
+        await verificar_rfid_para_puerta(rfid_uid, solicitud)
+    finally:
+        antirrebote.resolver(puerta, rfid_uid, solicitud['decision'])
+
+# ========================================
+# MODULO 2: PESOS
+# ========================================
+
+async def _pesos_al_spool(filas):
+    """Guardar filas de peso en el spool (SQLite) fuera del event loop"""
+    await asyncio.to_thread(spool.encolar_varios, spool.TIPO_PESO,
+                            [(fila, fila['id_evento']) for fila in filas])
+
+async def registrar_pesos(filas):
+    """Insertar filas de peso con el pool (spool local si la BD no responde)"""
+    for fila in filas:
+        base.estadisticas_bascula.registrar(fila['bascula'], fila['peso_kg'])
+
+    if _pool is None:
+        print(f"[ERROR] Sin conexion a MySQL - {len(filas)} pesos al spool")
+        await _pesos_al_spool(filas)
+        return
+
+    try:
+        async with _pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                # Mismo reclamo en pesos_eventos que db.reclamar_eventos_peso
+                lote = uuid.uuid4().hex
+                await cursor.executemany(db.SQL_RECLAMAR_EVENTOS_PESO,
+                                         db.parametros_reclamo_pesos([f['id_evento'] for f in filas], lote))
+                await cursor.execute(db.SQL_EVENTOS_PESO_RECLAMADOS, (lote,))
+                nuevas = db.filas_reclamadas(filas, await cursor.fetchall())
+                if nuevas:
+                    await cursor.executemany(base.SQL_INSERTAR_PESO, [base.valores_peso(f) for f in nuevas])
+            await conn.commit()
+    except (OSError, asyncio.TimeoutError) + spool.ERRORES_CONEXION as e:
+        metricas['errores'] += 1
+        print(f"[ERROR] Conexion perdida registrando {len(filas)} pesos: {e} - guardando en spool")
+        await _pesos_al_spool(filas)
+    except Exception as e:
+        metricas['errores'] += 1
+        print(f"[ERROR] Error registrando peso: {e}")
+
+def _filas_lecturas(bascula, lecturas, claves=None):
+    """
+    (t, peso) -> filas de BD, pasando por pesaje.py si esta activo
+
+    Args:
+        claves: id_evento por lectura (lotes binarios); None = por contenido
+    """
+    if base.PESAJE_POR_MALETA:
+        eventos = []
+        for t, peso in lecturas:
+            eventos.extend(pesaje.procesar_lectura(peso, bascula, t))
+        return [base._fila_maleta(evento) for evento in eventos]
+
+    claves = claves or [None] * len(lecturas)
+    return [base._fila_lectura(bascula, t, peso if peso is not None else 0.0, clave)
+            for (t, peso), clave in zip(lecturas, claves)]
+
+# ========================================
+# DESPACHO DE MENSAJES
+# ========================================
+
+async def _en_tarea(corrutina):
+    """Ejecutar una corrutina liberando el cupo de concurrencia al terminar"""
+    try:
+        await corrutina
+    except Exception as e:
+        metricas['errores'] += 1
+        print(f"[ERROR] Error procesando mensaje: {e}")
+    finally:
+        metricas['en_proceso'] -= 1
+        _limite.release()
+
+async def _lanzar(corrutina):
+    await _limite.acquire()  # Contrapresion: no leer mas del broker si esta lleno
+    metricas['en_proceso'] += 1
+    metricas['max_en_proceso'] = max(metricas['max_en_proceso'], metricas['en_proceso'])
+    asyncio.create_task(_en_tarea(perfilado.continuar_async(corrutina)))
+
+async def despachar(topic, raw):
+    """Enrutar un mensaje igual que mqtt_gateway.on_message"""
+    metricas['mensajes'] += 1
+
+    if base.es_topic_peso(topic):
+        bascula = base.id_bascula(topic)
+        if bascula is None:
+            return
+        if lote_pesos.es_lote(raw):
+            try:
+                lecturas = lote_pesos.decodificar(raw, recibido=time.time())
+            except ValueError as e:
+                print(f"[ERROR] MODULO 2: Lote inválido de {bascula}: {e}")
+                pesaje.procesar_lectura(None, bascula)
+                return
+            lecturas = [(t, max(peso, 0.0)) for t, peso in lecturas]
+            claves = base.claves_lote(bascula, raw, len(lecturas))
+        else:
+            texto, secuencia = base.parsear_lectura(raw.decode('utf-8').strip())
+            lecturas = [(time.time(), base.interpretar_peso(texto))]
+            claves = [base.clave_lectura(bascula, secuencia)]
+
+        # El orden por bascula importa: pesaje.py se ejecuta aqui, no en la tarea
+        filas = _filas_lecturas(bascula, lecturas, claves)
+        if filas:
+            await _lanzar(registrar_pesos(filas))
+        return
+
+    payload = raw.decode('utf-8').strip()
+
+    if topic == base.MQTT_TOPIC_VERIFICAR_RFID:
+        await _lanzar(atender_puerta(payload, base.nueva_solicitud(base.PUERTA_LEGACY)))
+
+    elif topic.startswith(base.MQTT_TOPIC_PUERTA_PREFIJO) and topic.endswith('/verificar'):
+        puerta = topic[len(base.MQTT_TOPIC_PUERTA_PREFIJO):-len('/verificar')]
+        rfid_uid, id_solicitud = base.parsear_solicitud_puerta(payload)
+
+        decision_previa = base.idempotencia.consultar(f"puerta:{puerta}:{id_solicitud}") if id_solicitud else None
+        if decision_previa:
+            await responder_puerta(base.nueva_solicitud(puerta, id_solicitud), decision_previa)
+            return
+
+        await _lanzar(atender_puerta(rfid_uid, base.nueva_solicitud(puerta, id_solicitud)))
+
+# Mismo perfilado bajo demanda que on_message en mqtt_gateway.py
+despachar_perfilado = perfilado.instrumentar_mqtt_async(despachar)
+
+# ========================================
+# LOOP PRINCIPAL
+# ========================================
+
+async def ejecutar():
+    """Conectar al broker (reintentando) y procesar mensajes indefinidamente"""
+    global _cliente, _limite, mqtt_conectado
+
+    _limite = asyncio.Semaphore(CONCURRENCIA)
+    tarea_pool = None
+
+    protocolo = aiomqtt.ProtocolVersion.V5 if base.MQTT_GRUPO_COMPARTIDO else aiomqtt.ProtocolVersion.V311
+    topics = base.suscripciones()
+
+    while True:
+        # Pool creado (o re-intentado) dentro del loop: MySQL caido al
+        # arrancar no debe matar el thread del gateway
+        if _pool is None and (tarea_pool is None or tarea_pool.done()):
+            tarea_pool = asyncio.create_task(_mantener_pool())
+
+        try:
+            async with aiomqtt.Client(
+                base.MQTT_BROKER, base.MQTT_PORT,
+                identifier=base.MQTT_CLIENT_ID, protocol=protocolo
+            ) as cliente:
+                _cliente = cliente
+                for topic in topics:
+                    await cliente.subscribe(topic, qos=base.MQTT_QOS)
+                mqtt_conectado = True
+                print(f"[OK] Gateway asyncio conectado a {base.MQTT_BROKER} como {base.MQTT_CLIENT_ID}")
+
+                async for mensaje in cliente.messages:
+                    await despachar_perfilado(mensaje.topic.value, bytes(mensaje.payload))
+
+        except aiomqtt.MqttError as e:
+            mqtt_conectado = False
+            print(f"[WARNING] MQTT desconectado ({e}) - reintentando en {REINTENTO_MQTT}s")
+            await asyncio.sleep(REINTENTO_MQTT)
+
+def _emitir_desde_thread(evento):
+    """Maletas cerradas por el vigilante de pesaje.py (otro thread) -> event loop"""
+    asyncio.run_coroutine_threadsafe(registrar_pesos([base._fila_maleta(evento)]), _loop)
+
+def _correr_loop():
+    global _loop
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+    _loop.run_until_complete(ejecutar())
+
+def iniciar_gateway():
+    """
+    Arrancar el gateway asyncio en un thread propio (mismo contrato que
+    mqtt_gateway.iniciar_gateway)
+
+    Returns:
+        bool: False si faltan aiomqtt/aiomysql
+    """
+    if not ASYNC_DISPONIBLE:
+        print("[INFO] Modulos 2 y 3 no estaran operativos (gateway asyncio sin dependencias)")
+        return False
+
+    spool.iniciar_reproductor()
+    bitacora.iniciar_escritor()
+
+    thread = threading.Thread(target=_correr_loop, daemon=True, name='gateway-async')
+    thread.start()
+
+    if base.PESAJE_POR_MALETA:
+        pesaje.iniciar_vigilancia(_emitir_desde_thread)
+    return True
+
+def estado():
+    """Contadores del gateway asyncio"""
+    return {
+        'conectado': mqtt_conectado,
+        'concurrencia': CONCURRENCIA,
+        'pool_max': POOL_MAX,
+        'pool_listo': _pool is not None,
+        **metricas
+    }
+
+if __name__ == '__main__':
+    if not ASYNC_DISPONIBLE:
+        raise SystemExit(1)
+    spool.iniciar_reproductor()
+    bitacora.iniciar_escritor()
+    if base.PESAJE_POR_MALETA:
+        # Sin thread de loop: el vigilante usa el camino sincrono
+        pesaje.iniciar_vigilancia(base.registrar_maleta)
+    asyncio.run(ejecutar())
@@ -0,0 +1,87 @@
+"""
+idempotencia.py - Cache TTL de mensajes MQTT ya procesados
+SmartPort v2.0
+
+Con QoS 1 el broker puede re-entregar un mensaje (flag dup) y, con
+suscripciones compartidas, una puerta puede reintentar la misma
+solicitud. Aqui se recuerda el resultado por clave durante TTL segundos
+para responder igual sin volver a tocar la BD.
+
+La garantia entre instancias la dan las restricciones en MySQL: UPDATE
+condicional de puerta_abierta y la clave primaria de pesos_eventos
+(migracion 010, sin particionar), donde cada id_evento se reclama una
+sola vez sin importar la fecha_hora de la fila. El id_evento sale de
+la identidad de la lectura (mqtt_gateway.clave_peso): la secuencia del
+dispositivo en texto ("<peso>;<secuencia>"), la huella y posicion en
+los lotes binarios, o el contenido de la maleta cerrada por pesaje.py.
+Esta cache solo evita el trabajo repetido dentro de un proceso.
+
+Limite de esa garantia: una lectura en texto sin secuencia (firmware
+anterior) no trae identidad, asi que su clave usa la hora de llegada y
+una re-entrega cuenta como lectura nueva.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+TTL_SEGUNDOS = float(os.environ.get("SMARTPORT_IDEMPOTENCIA_TTL", "300"))
+MAX_CLAVES = int(os.environ.get("SMARTPORT_IDEMPOTENCIA_MAX", "10000"))
+
+_lock = threading.Lock()
+_claves = OrderedDict()  # clave -> (expira, resultado)
+
+metricas = {
+    'duplicados': 0
+}
+
+def _purgar(ahora):
+    """Eliminar claves vencidas (las mas antiguas estan al inicio)"""
+    while _claves:
+        clave, (expira, _) = next(iter(_claves.items()))
+        if expira > ahora and len(_claves) <= MAX_CLAVES:
+            break
+        _claves.popitem(last=False)
+
+def consultar(clave):
+    """
+    Resultado guardado para una clave, si sigue vigente
+
+    Args:
+        clave: Identificador del mensaje (p.ej. 'puerta:G1:a1b2')
+
+    Returns:
+        Resultado guardado, o None si la clave no se ha visto
+    """
+    ahora = time.time()
+    with _lock:
+        _purgar(ahora)
+        entrada = _claves.get(clave)
+        if entrada is None:
+            return None
+        metricas['duplicados'] += 1
+        return entrada[1]
+
+def guardar(clave, resultado=True):
+    """
+    Recordar el resultado de una clave durante TTL_SEGUNDOS
+
+    Args:
+        clave: Identificador del mensaje
+        resultado: Valor a devolver en re-entregas (p.ej. 'ABRIR')
+    """
+    ahora = time.time()
+    with _lock:
+        _claves[clave] = (ahora + TTL_SEGUNDOS, resultado)
+        _claves.move_to_end(clave)
+        _purgar(ahora)
+
+def estado():
+    """Claves vigentes y duplicados detectados"""
+    with _lock:
+        return {
+            'claves': len(_claves),
+            'ttl_segundos': TTL_SEGUNDOS,
+            **metricas
+        }
@@ -0,0 +1,849 @@
+"""
+kiosk.py - Endpoints del kiosko (Modulo 1)
+SmartPort v2.0
+
+Registro de pasajeros/admins y validacion biometrica RFID + rostro.
+Usa el hardware local (RFID + camara) a traves de dispositivos.py.
+"""
+
+from flask import Blueprint, request, jsonify
+import csv
+import io
+import os
+import time
+
+from db import (
+    verificar_admin, registrar_admin,
+    crear_pasajero, importar_manifiesto, registrar_rfid_pasajero, registrar_rostro_pasajero,
+    buscar_pasajero_por_rfid, registrar_acceso, calcular_similitud_facial,
+    abrir_embarque, cerrar_embarque, get_db_connection, SQL_PASAJERO_VERIFICACION
+)
+from dispositivos import leer_rfid, capturar_rostro, AdquisicionRostro, CAPTURA_TIEMPO_MAX
+from almacen_embeddings import obtener_almacen
+from similitud import matriz_distancias
+import bitacora
+import sesiones
+
+kiosk_bp = Blueprint('kiosk', __name__)
+
+# Similitud minima (%) para conceder el acceso; por kiosko segun calibracion.py
+UMBRAL_SIMILITUD_ACCESO = float(os.environ.get("SMARTPORT_UMBRAL_SIMILITUD", "60"))
+RFID_TIMEOUT_ACCESO = 15
+
+def _bitacora_rfid(resultado, rfid_uid=None, pasajero=None):
+    """Toque de tarjeta en este kiosko -> bitacora de eventos"""
+    bitacora.registrar(bitacora.TIPO_RFID, bitacora.KIOSCO_ID, resultado,
+                       id_pasajero=pasajero['id_pasajero'] if pasajero else None,
+                       rfid_uid=rfid_uid)
+
+def _bitacora_rostro(resultado, pasajero, inicio, embedding=None, similitud=None):
+    """Intento facial -> bitacora (con la distancia al rostro registrado)"""
+    distancia = None
+    if embedding is not None and pasajero.get('rostro_embedding') is not None:
+        distancia = float(matriz_distancias(embedding, pasajero['rostro_embedding'])[0, 0])
+    bitacora.registrar(bitacora.TIPO_ROSTRO, bitacora.KIOSCO_ID, resultado,
+                       id_pasajero=pasajero['id_pasajero'], rfid_uid=pasajero.get('rfid_uid'),
+                       similitud=similitud, distancia=distancia,
+                       latencia_ms=(time.time() - inicio) * 1000, embedding=embedding)
+
+# ========================================
+# ENDPOINTS - ADMINISTRADOR
+# ========================================
+
+@kiosk_bp.route('/api/admin/login', methods=['POST'])
+def admin_login():
+    """Verificar acceso de administrador por RFID"""
+    try:
+        print("\n=== INICIO LOGIN ADMIN ===")
+        
+        # Leer RFID
+        rfid_uid = leer_rfid(timeout=15)
+        
+        if not rfid_uid:
+            print("[ERROR] No se detecto tarjeta RFID")
+            return jsonify({
+                'status': 'error',
+                'error': 'No se detecto tarjeta RFID'
+            }), 400
+        
+        print(f"[INFO] RFID detectado: {rfid_uid}")
+        
+        # Verificar si es admin
+        admin = verificar_admin(rfid_uid)
+        
+        if admin:
+            print(f"[OK] Admin verificado: {admin['nombre']}")
+            return jsonify({
+                'status': 'ok',
+                'admin': {
+                    'id': admin['id_admin'],
+                    'nombre': admin['nombre'],
+                    'rfid': admin['rfid_uid']
+                }
+            })
+        else:
+            print("[ERROR] RFID no autorizado")
+            return jsonify({
+                'status': 'error',
+                'error': 'Acceso denegado - RFID no autorizado'
+            }), 403
+            
+    except Exception as e:
+        print(f"[ERROR] Error en login admin: {e}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+@kiosk_bp.route('/api/admin/registrar-admin', methods=['POST'])
+def registrar_nuevo_admin():
+    """Registrar un nuevo administrador"""
+    try:
+        data = request.json
+        nombre = data.get('nombre', '').strip()
+        
+        if not nombre:
+            return jsonify({
+                'status': 'error',
+                'error': 'El nombre es requerido'
+            }), 400
+        
+        print(f"\n=== REGISTRAR NUEVO ADMIN: {nombre} ===")
+        
+        # Leer RFID
+        rfid_uid = leer_rfid(timeout=15)
+        
+        if not rfid_uid:
+            print("[ERROR] No se detecto tarjeta RFID")
+            return jsonify({
+                'status': 'error',
+                'error': 'No se detecto tarjeta RFID'
+            }), 400
+        
+        # Registrar admin
+        if registrar_admin(rfid_uid, nombre):
+            print(f"[OK] Admin registrado: {nombre} - RFID: {rfid_uid}")
+            return jsonify({
+                'status': 'ok',
+                'mensaje': f'Administrador {nombre} registrado correctamente',
+                'rfid_uid': rfid_uid
+            })
+        else:
+            print("[ERROR] Error al registrar (posible RFID duplicado)")
+            return jsonify({
+                'status': 'error',
+                'error': 'Error al registrar administrador (posible RFID duplicado)'
+            }), 400
+            
+    except Exception as e:
+        print(f"[ERROR] Error registrando admin: {e}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+@kiosk_bp.route('/api/admin/crear-pasajero', methods=['POST'])
+def admin_crear_pasajero():
+    """Crear un nuevo pasajero (solo nombre y vuelo)"""
+    try:
+        data = request.json
+        nombre = data.get('nombre', '').strip()
+        numero_vuelo = data.get('numero_vuelo')
+        
+        if not nombre or not numero_vuelo:
+            return jsonify({
+                'status': 'error',
+                'error': 'Nombre y numero de vuelo son requeridos'
+            }), 400
+        
+        print(f"\n=== CREAR PASAJERO ===")
+        print(f"Nombre: {nombre}")
+        print(f"Vuelo: {numero_vuelo}")
+        
+        # Crear pasajero
+        pasajero = crear_pasajero(nombre, numero_vuelo)
+        
+        if pasajero:
+            print(f"[OK] Pasajero creado - ID: {pasajero['id_pasajero']}")
+            return jsonify({
+                'status': 'ok',
+                'pasajero': {
+                    'id_pasajero': pasajero['id_pasajero'],
+                    'nombre': pasajero['nombre_normalizado'],
+                    'numero_vuelo': pasajero['numero_vuelo'],
+                    'destino': pasajero['destino']
+                }
+            })
+        else:
+            print("[ERROR] Error al crear pasajero")
+            return jsonify({
+                'status': 'error',
+                'error': 'Error al crear pasajero'
+            }), 500
+            
+    except Exception as e:
+        print(f"[ERROR] Error: {e}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+def _leer_manifiesto_csv(stream):
+    """Generador de filas CSV (encabezado: nombre,numero_vuelo[,destino])"""
+    texto = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    for fila in csv.DictReader(texto):
+        yield {(k or '').strip().lower(): v for k, v in fila.items()}
+
+@kiosk_bp.route('/api/admin/importar-manifiesto', methods=['POST'])
+def admin_importar_manifiesto():
+    """
+    Importar un manifiesto completo de pasajeros
+    
+    Formatos aceptados:
+    - Archivo CSV en el campo 'manifiesto' (multipart/form-data)
+    - Cuerpo text/csv (se procesa en streaming, por lotes)
+    - JSON: lista de {nombre, numero_vuelo, destino?} o {"pasajeros": [...]}
+    
+    Retorna un resultado por fila (id_pasajero o error)
+    """
+    try:
+        archivo = request.files.get('manifiesto')
+        
+        if archivo:
+            filas = _leer_manifiesto_csv(archivo.stream)
+        elif request.mimetype == 'text/csv':
+            filas = _leer_manifiesto_csv(request.stream)
+        else:
+            data = request.get_json(silent=True)
+            filas = data.get('pasajeros') if isinstance(data, dict) else data
+            if not isinstance(filas, list):
+                return jsonify({
+                    'status': 'error',
+                    'error': 'Se esperaba CSV o una lista JSON de pasajeros'
+                }), 400
+        
+        print(f"\n=== IMPORTAR MANIFIESTO ===")
+        resultados = importar_manifiesto(filas)
+        
+        if resultados is None:
+            return jsonify({
+                'status': 'error',
+                'error': 'Error de conexión a BD'
+            }), 500
+        
+        creados = sum(1 for r in resultados if r['status'] == 'ok')
+        errores = len(resultados) - creados
+        print(f"[OK] Manifiesto importado: {creados} pasajeros creados, {errores} filas con error")
+        
+        return jsonify({
+            'status': 'ok' if errores == 0 else 'parcial',
+            'total': len(resultados),
+            'creados': creados,
+            'errores': errores,
+            'resultados': resultados
+        })
+        
+    except Exception as e:
+        print(f"[ERROR] Error importando manifiesto: {e}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+@kiosk_bp.route('/api/admin/embarques/<int:numero_vuelo>/abrir', methods=['POST'])
+def admin_abrir_embarque(numero_vuelo):
+    """
+    Abrir el embarque de un vuelo: cuenta los pasajeros por estado y
+    precarga sus datos para la puerta y los kioskos
+    
+    El progreso se consulta en GET /api/admin/embarques/<vuelo> (dashboard)
+    """
+    try:
+        print(f"\n=== ABRIR EMBARQUE VUELO {numero_vuelo} ===")
+        embarque = abrir_embarque(numero_vuelo)
+        
+        if not embarque:
+            return jsonify({
+                'status': 'error',
+                'error': f'Vuelo {numero_vuelo} no encontrado o error de BD'
+            }), 404
+        
+        return jsonify({
+            'status': 'ok',
+            'embarque': embarque
+        })
+        
+    except Exception as e:
+        print(f"[ERROR] Error abriendo embarque: {e}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+@kiosk_bp.route('/api/admin/embarques/<int:numero_vuelo>/cerrar', methods=['POST'])
+def admin_cerrar_embarque(numero_vuelo):
+    """Cerrar el embarque de un vuelo (los contadores quedan congelados)"""
+    try:
+        if not cerrar_embarque(numero_vuelo):
+            return jsonify({
+                'status': 'error',
+                'error': f'El vuelo {numero_vuelo} no tiene embarque abierto'
+            }), 404
+        
+        print(f"[OK] Embarque del vuelo {numero_vuelo} cerrado")
+        return jsonify({'status': 'ok'})
+        
+    except Exception as e:
+        print(f"[ERROR] Error cerrando embarque: {e}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+@kiosk_bp.route('/api/admin/registrar-rfid', methods=['POST'])
+def admin_registrar_rfid():
+    """
+    Leer RFID del pasajero (NO guardar en BD todavía)
+    Solo retornar el UID leído para guardarlo temporalmente en frontend
+    REGISTRO ATÓMICO: Se guardará junto con el rostro en completar-registro
+    """
+    try:
+        data = request.json
+        id_pasajero = data.get('id_pasajero')
+        
+        if not id_pasajero:
+            return jsonify({
+                'status': 'error',
+                'error': 'ID de pasajero requerido'
+            }), 400
+        
+        print(f"\n=== LEER RFID (TEMPORAL) - Pasajero ID: {id_pasajero} ===")
+        print("[INFO] SOLO lectura, NO se guardará en BD todavía")
+        
+        # Leer RFID
+        rfid_uid = leer_rfid(timeout=15)
+        
+        if not rfid_uid:
+            print("[ERROR] No se detecto tarjeta RFID")
+            return jsonify({
+                'status': 'error',
+                'error': 'No se detecto tarjeta RFID'
+            }), 400
+        
+        print(f"[OK] RFID leído: {rfid_uid}")
+        print("[INFO] RFID guardado temporalmente en frontend")
+        print("[INFO] Se registrará en BD junto con el rostro en el siguiente paso")
+        
+        # NO GUARDAR EN BD, solo retornar
+        return jsonify({
+            'status': 'ok',
+            'rfid_uid': rfid_uid,
+            'mensaje': 'RFID leído correctamente (pendiente de registro completo)'
+        })
+            
+    except Exception as e:
+        print(f"[ERROR] Error: {e}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+@kiosk_bp.route('/api/admin/completar-registro', methods=['POST'])
+def admin_completar_registro():
+    """
+    Completar registro: Guardar RFID + rostro juntos en la BD
+    También crea el registro de check-in en accesos_puerta (necesario para Módulo 3)
+    REGISTRO ATÓMICO: Todo o nada
+    """
+    try:
+        data = request.json
+        id_pasajero = data.get('id_pasajero')
+        rfid_uid = data.get('rfid_uid')
+        
+        if not id_pasajero or not rfid_uid:
+            return jsonify({
+                'status': 'error',
+                'error': 'ID de pasajero y RFID son requeridos'
+            }), 400
+        
+        print(f"\n{'='*60}")
+        print(f"=== COMPLETAR REGISTRO ATÓMICO - Pasajero ID: {id_pasajero} ===")
+        print(f"RFID: {rfid_uid}")
+        print(f"{'='*60}")
+        
+        # PASO 1: Registrar RFID en BD
+        print("[INFO] Paso 1/3: Registrando RFID en BD...")
+        if not registrar_rfid_pasajero(id_pasajero, rfid_uid):
+            print("[ERROR] Error al registrar RFID")
+            return jsonify({
+                'status': 'error',
+                'error': 'Error al registrar RFID (posible RFID duplicado)'
+            }), 400
+        
+        print("[OK] ✓ RFID registrado correctamente en BD")
+        
+        # PASO 2: Capturar y registrar rostro
+        print("[INFO] Paso 2/3: Capturando rostro...")
+        embedding = capturar_rostro()
+        
+        if embedding is None:
+            # Si falla el rostro, REVERTIR el RFID (eliminar de BD)
+            print("[ERROR] No se pudo capturar rostro - REVIRTIENDO registro de RFID")
+            conn = get_db_connection()
+            if conn:
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                        UPDATE pasajeros 
+                        SET rfid_uid = NULL 
+                        WHERE id_pasajero = %s
+                    """, (id_pasajero,))
+                    conn.commit()
+                    cursor.close()
+                    conn.close()
+                    print("[INFO] ✓ RFID eliminado de BD por fallo en captura de rostro")
+                    print("[INFO] Transacción revertida - BD mantiene consistencia")
+                except Exception as e:
+                    print(f"[ERROR] Error al revertir RFID: {e}")
+            
+            return jsonify({
+                'status': 'error',
+                'error': 'No se pudo capturar el rostro. Intente nuevamente.'
+            }), 400
+        
+        print(f"[OK] ✓ Rostro capturado - Shape: {embedding.shape}")
+        
+        # PASO 3: Guardar rostro en BD Y crear check-in
+        print("[INFO] Paso 3/3: Guardando rostro y creando check-in...")
+        if not registrar_rostro_pasajero(id_pasajero, embedding):
+            print("[ERROR] Error al guardar rostro")
+            # Intentar revertir RFID también
+            conn = get_db_connection()
+            if conn:
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                        UPDATE pasajeros 
+                        SET rfid_uid = NULL 
+                        WHERE id_pasajero = %s
+                    """, (id_pasajero,))
+                    conn.commit()
+                    cursor.close()
+                    conn.close()
+                    print("[INFO] RFID eliminado de BD por fallo al guardar rostro")
+                except:
+                    pass
+            
+            return jsonify({
+                'status': 'error',
+                'error': 'Error al guardar el rostro'
+            }), 500
+        
+        print("[OK] ✓ Rostro registrado correctamente en BD")
+        print("[OK] ✓ Check-in creado en accesos_puerta (Módulo 3 habilitado)")
+        print(f"{'='*60}")
+        print("[OK] ✓✓✓ REGISTRO COMPLETO EXITOSO ✓✓✓")
+        print(f"[OK] Pasajero ID {id_pasajero} registrado con:")
+        print(f"[OK]   - RFID: {rfid_uid}")
+        print(f"[OK]   - Rostro: Embedding de {embedding.shape[0]} dimensiones")
+        print(f"[OK]   - Estado: VALIDADO")
+        print(f"[OK]   - Check-in: Completado (puede usar Módulo 3)")
+        print(f"{'='*60}\n")
+        
+        return jsonify({
+            'status': 'ok',
+            'mensaje': 'Registro completado exitosamente',
+            'rfid': rfid_uid
+        })
+        
+    except Exception as e:
+        print(f"[ERROR] Excepción en completar_registro: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+# ========================================
+# ENDPOINTS - USUARIO (ACCESO) - MODULO 1
+# ========================================
+
+@kiosk_bp.route('/api/usuario/validar-rfid', methods=['POST'])
+def usuario_validar_rfid():
+    """
+    PASO 1: Solo validar que el RFID existe en BD
+    NO cambia el estado del pasajero
+    NO captura rostro todavía
+    """
+    try:
+        print("\n" + "="*60)
+        print("=== PASO 1: VALIDACIÓN DE RFID ===")
+        print("="*60)
+        
+        rfid_uid = leer_rfid(timeout=15)
+        
+        if not rfid_uid:
+            print("[ERROR] No se detectó tarjeta RFID")
+            _bitacora_rfid('SIN_TARJETA')
+            return jsonify({
+                'status': 'error',
+                'error': 'No se detectó tarjeta RFID'
+            }), 400
+        
+        print(f"[OK] RFID detectado: {rfid_uid}")
+        
+        # Buscar pasajero con ese RFID
+        pasajero = buscar_pasajero_por_rfid(rfid_uid)
+        
+        if not pasajero:
+            print("[ERROR] RFID no encontrado en la base de datos")
+            _bitacora_rfid('NO_REGISTRADO', rfid_uid)
+            return jsonify({
+                'status': 'error',
+                'error': 'RFID no registrado'
+            }), 404
+        
+        print(f"[OK] Pasajero encontrado: {pasajero['nombre_normalizado']}")
+        print(f"[INFO] Vuelo: {pasajero['numero_vuelo']}")
+        print(f"[INFO] Estado actual: {pasajero['estado']}")
+        
+        # VALIDACIÓN 1: Si ya completó el proceso (ABORDADO o COMPLETO), no puede volver a verificar
+        if pasajero['estado'] in ['ABORDADO', 'COMPLETO']:
+            print(f"[INFO] Pasajero ya completó el proceso - Estado: {pasajero['estado']}")
+            _bitacora_rfid('YA_COMPLETO', rfid_uid, pasajero)
+            return jsonify({
+                'status': 'error',
+                'error': 'Ya completó el proceso de abordaje',
+                'estado_actual': pasajero['estado']
+            }), 403
+        
+        # VALIDACIÓN 2: Verificar que tenga rostro registrado
+        if pasajero['rostro_embedding'] is None:
+            print("[ERROR] Pasajero sin rostro registrado")
+            _bitacora_rfid('SIN_BIOMETRIA', rfid_uid, pasajero)
+            return jsonify({
+                'status': 'error',
+                'error': 'Pasajero sin biometria registrada'
+            }), 400
+        
+        # TODO OK - RFID válido, retornar datos del pasajero
+        print("[OK] RFID válido - Listo para captura de rostro")
+        _bitacora_rfid('VALIDO', rfid_uid, pasajero)
+        
+        # Guardar el pasajero (con embedding ya deserializado) para el PASO 2
+        # y abrir la camara desde ya: el frontend tarda unos segundos en pedirlo
+        sesiones.abrir(pasajero, AdquisicionRostro(sesiones.TTL_SEGUNDOS).iniciar)
+        print("[INFO] Sesión de verificación abierta - cámara calentando")
+        print("="*60 + "\n")
+        
+        return jsonify({
+            'status': 'ok',
+            'pasajero': {
+                'id_pasajero': pasajero['id_pasajero'],
+                'nombre': pasajero['nombre_normalizado'],
+                'vuelo': pasajero['numero_vuelo']
+            }
+        })
+        
+    except Exception as e:
+        print(f"[ERROR] Error en validación de RFID: {e}")
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+@kiosk_bp.route('/api/usuario/verificar-rostro', methods=['POST'])
+def usuario_verificar_rostro():
+    """
+    PASO 2: Capturar y verificar rostro
+    SOLO si la verificación es exitosa, cambia el estado a ABORDADO
+    """
+    inicio = time.time()
+    try:
+        data = request.json
+        id_pasajero = data.get('id_pasajero')
+        
+        if not id_pasajero:
+            return jsonify({
+                'status': 'error',
+                'error': 'ID de pasajero requerido'
+            }), 400
+        
+        print("\n" + "="*60)
+        print("=== PASO 2: VERIFICACIÓN DE ROSTRO ===")
+        print(f"ID Pasajero: {id_pasajero}")
+        print("="*60)
+        
+        sesion = sesiones.tomar(id_pasajero)
+        
+        if sesion:
+            # Pasajero y embedding ya cargados en el PASO 1
+            pasajero = sesion['pasajero']
+            adquisicion = sesion['adquisicion']
+            print(f"[INFO] Pasajero: {pasajero['nombre_normalizado']} (sesión del PASO 1)")
+        else:
+            adquisicion = None
+            # Buscar pasajero por ID
+            conn = get_db_connection()
+            if not conn:
+                return jsonify({
+                    'status': 'error',
+                    'error': 'Error de conexión a BD'
+                }), 500
+        
+            cursor = conn.cursor()
+            cursor.execute(SQL_PASAJERO_VERIFICACION, (id_pasajero,))
+        
+            pasajero = cursor.fetchone()
+        
+            if not pasajero:
+                cursor.close()
+                conn.close()
+                print("[ERROR] Pasajero no encontrado")
+                return jsonify({
+                    'status': 'error',
+                    'error': 'Pasajero no encontrado'
+                }), 404
+        
+            print(f"[INFO] Pasajero: {pasajero['nombre_normalizado']}")
+        
+            if not pasajero['tiene_rostro']:
+                cursor.close()
+                conn.close()
+                print("[ERROR] Pasajero sin rostro registrado")
+                return jsonify({
+                    'status': 'error',
+                    'error': 'Pasajero sin biometría registrada'
+                }), 400
+        
+            # Embedding desde el almacen mapeado; la BD solo si falta o esta desactualizado
+            almacen = obtener_almacen()
+            embedding = almacen.obtener(id_pasajero, pasajero['fecha_actualizacion']) if almacen else None
+        
+            if embedding is not None:
+                print("[INFO] Embedding leido del almacen compartido")
+            else:
+                import pickle
+                cursor.execute("""
+                    SELECT rostro_embedding FROM pasajeros WHERE id_pasajero = %s
+                """, (id_pasajero,))
+                embedding = pickle.loads(cursor.fetchone()['rostro_embedding'])
+                print(f"[DEBUG] Embedding deserializado - Type: {type(embedding)}, Shape: {embedding.shape}")
+        
+            cursor.close()
+            conn.close()
+            pasajero['rostro_embedding'] = embedding
+        
+        # Capturar rostro actual (la sesion ya tiene la camara abierta)
+        if adquisicion is not None and (not adquisicion.terminado or adquisicion.mejor() is not None):
+            print("[INFO] Usando captura iniciada en el PASO 1...")
+            embedding_actual = adquisicion.mejor(esperar=CAPTURA_TIEMPO_MAX)
+            adquisicion.detener()
+        else:
+            print("[INFO] Capturando rostro actual...")
+            embedding_actual = capturar_rostro()
+        
+        if embedding_actual is None:
+            print("[ERROR] No se pudo capturar rostro")
+            _bitacora_rostro('SIN_ROSTRO', pasajero, inicio)
+            # NO cambiar estado
+            return jsonify({
+                'status': 'error',
+                'error': 'No se detectó rostro'
+            }), 400
+        
+        print("[OK] Rostro capturado correctamente")
+        
+        # Comparar rostros
+        print("[INFO] Comparando rostros...")
+        porcentaje_similitud = calcular_similitud_facial(
+            pasajero['rostro_embedding'],
+            embedding_actual
+        )
+        
+        print(f"[OK] Similitud facial: {porcentaje_similitud:.2f}%")
+        
+        # Decidir si permitir acceso (umbral del kiosko, 60% por defecto)
+        if porcentaje_similitud >= UMBRAL_SIMILITUD_ACCESO:
+            print("="*60)
+            print("[OK] ✓✓✓ ACCESO CONCEDIDO ✓✓✓")
+            print("="*60)
+            
+            # AQUÍ SÍ: Registrar acceso en BD (cambia estado a ABORDADO)
+            print("[INFO] Registrando acceso y cambiando estado a ABORDADO...")
+            registrar_acceso(pasajero['id_pasajero'], porcentaje_similitud)
+            _bitacora_rostro('CONCEDIDO', pasajero, inicio, embedding_actual, porcentaje_similitud)
+            print("[OK] Estado actualizado a ABORDADO")
+            print("[INFO] Pasajero ahora puede usar Módulo 3 (puerta física)")
+            
+            print("="*60)
+            print(f"BIENVENIDO: {pasajero['nombre_normalizado']}")
+            print(f"VUELO: {pasajero['numero_vuelo']}")
+            print("="*60 + "\n")
+            
+            return jsonify({
+                'status': 'ok',
+                'acceso': 'concedido',
+                'pasajero': {
+                    'nombre': pasajero['nombre_normalizado'],
+                    'vuelo': pasajero['numero_vuelo']
+                },
+                'similitud': round(porcentaje_similitud, 2),
+                'mensaje': f'Bienvenido {pasajero["nombre_normalizado"]}'
+            })
+        else:
+            print("="*60)
+            print("[ERROR] ACCESO DENEGADO")
+            print(f"[INFO] Similitud insuficiente: {porcentaje_similitud:.2f}% (mínimo: {UMBRAL_SIMILITUD_ACCESO:.0f}%)")
+            print("="*60 + "\n")
+            _bitacora_rostro('DENEGADO', pasajero, inicio, embedding_actual, porcentaje_similitud)
+            
+            # NO cambiar estado
+            return jsonify({
+                'status': 'error',
+                'acceso': 'denegado',
+                'error': 'Biometria no coincide',
+                'similitud': round(porcentaje_similitud, 2)
+            }), 403
+            
+    except Exception as e:
+        print("="*60)
+        print("[ERROR] ERROR EN VERIFICACIÓN")
+        print(f"[ERROR] Error: {e}")
+        print("="*60 + "\n")
+        
+        import traceback
+        traceback.print_exc()
+        
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+@kiosk_bp.route('/api/usuario/acceso', methods=['POST'])
+def usuario_acceso():
+    """
+    PASO 1 + PASO 2 en paralelo: esperar la tarjeta mientras se captura el rostro
+    
+    La camara se abre al llamar al endpoint y sigue rostros mientras el
+    pasajero acerca la tarjeta; al leer el RFID normalmente ya hay un
+    embedding listo y la decision es inmediata. Mismas validaciones y
+    mismo umbral que validar-rfid + verificar-rostro.
+    """
+    # Solo hay una camara: cerrar la que haya dejado abierta validar-rfid
+    detenidas, adquisicion = sesiones.liberar_camara(
+        AdquisicionRostro(RFID_TIMEOUT_ACCESO + CAPTURA_TIEMPO_MAX).iniciar)
+    if detenidas:
+        print("[INFO] Adquisición de una sesión previa detenida")
+    inicio = time.time()
+    
+    try:
+        print("\n" + "="*60)
+        print("=== ACCESO: RFID + ROSTRO EN PARALELO ===")
+        print("="*60)
+        
+        rfid_uid = leer_rfid(timeout=RFID_TIMEOUT_ACCESO)
+        
+        if not rfid_uid:
+            print("[ERROR] No se detectó tarjeta RFID")
+            _bitacora_rfid('SIN_TARJETA')
+            return jsonify({
+                'status': 'error',
+                'error': 'No se detectó tarjeta RFID'
+            }), 400
+        
+        print(f"[OK] RFID detectado: {rfid_uid}")
+        
+        pasajero = buscar_pasajero_por_rfid(rfid_uid)
+        
+        if not pasajero:
+            print("[ERROR] RFID no encontrado en la base de datos")
+            _bitacora_rfid('NO_REGISTRADO', rfid_uid)
+            return jsonify({
+                'status': 'error',
+                'error': 'RFID no registrado'
+            }), 404
+        
+        print(f"[OK] Pasajero encontrado: {pasajero['nombre_normalizado']}")
+        
+        if pasajero['estado'] in ['ABORDADO', 'COMPLETO']:
+            print(f"[INFO] Pasajero ya completó el proceso - Estado: {pasajero['estado']}")
+            _bitacora_rfid('YA_COMPLETO', rfid_uid, pasajero)
+            return jsonify({
+                'status': 'error',
+                'error': 'Ya completó el proceso de abordaje',
+                'estado_actual': pasajero['estado']
+            }), 403
+        
+        if pasajero['rostro_embedding'] is None:
+            print("[ERROR] Pasajero sin rostro registrado")
+            _bitacora_rfid('SIN_BIOMETRIA', rfid_uid, pasajero)
+            return jsonify({
+                'status': 'error',
+                'error': 'Pasajero sin biometria registrada'
+            }), 400
+        
+        _bitacora_rfid('VALIDO', rfid_uid, pasajero)
+        
+        # Si aun no hay rostro estable, esperar lo que quede de captura
+        rostro_previo = adquisicion.mejor() is not None
+        embedding_actual = adquisicion.mejor(esperar=CAPTURA_TIEMPO_MAX)
+        
+        if embedding_actual is None:
+            print(f"[ERROR] No se pudo capturar rostro ({adquisicion.error or 'sin rostro'})")
+            _bitacora_rostro('SIN_ROSTRO', pasajero, inicio)
+            return jsonify({
+                'status': 'error',
+                'error': 'No se detectó rostro'
+            }), 400
+        
+        print(f"[OK] Rostro {'ya capturado al leer la tarjeta' if rostro_previo else 'capturado después de la tarjeta'}")
+        
+        porcentaje_similitud = calcular_similitud_facial(
+            pasajero['rostro_embedding'],
+            embedding_actual
+        )
+        
+        print(f"[OK] Similitud facial: {porcentaje_similitud:.2f}%")
+        
+        if porcentaje_similitud < UMBRAL_SIMILITUD_ACCESO:
+            print("[ERROR] ACCESO DENEGADO")
+            _bitacora_rostro('DENEGADO', pasajero, inicio, embedding_actual, porcentaje_similitud)
+            print("="*60 + "\n")
+            return jsonify({
+                'status': 'error',
+                'acceso': 'denegado',
+                'error': 'Biometria no coincide',
+                'similitud': round(porcentaje_similitud, 2)
+            }), 403
+        
+        registrar_acceso(pasajero['id_pasajero'], porcentaje_similitud)
+        _bitacora_rostro('CONCEDIDO', pasajero, inicio, embedding_actual, porcentaje_similitud)
+        print("[OK] ✓✓✓ ACCESO CONCEDIDO ✓✓✓ - Estado ABORDADO")
+        print("="*60 + "\n")
+        
+        return jsonify({
+            'status': 'ok',
+            'acceso': 'concedido',
+            'pasajero': {
+                'id_pasajero': pasajero['id_pasajero'],
+                'nombre': pasajero['nombre_normalizado'],
+                'vuelo': pasajero['numero_vuelo']
+            },
+            'similitud': round(porcentaje_similitud, 2),
+            'rostro_listo_segundos': round(adquisicion.listo_en, 2),
+            'mensaje': f'Bienvenido {pasajero["nombre_normalizado"]}'
+        })
+        
+    except Exception as e:
+        print(f"[ERROR] Error en acceso: {e}")
+        import traceback
+        traceback.print_exc()
+        
+        return jsonify({
+            'status': 'error',
+            'error': str(e)
+        }), 500
+    finally:
+        adquisicion.detener()
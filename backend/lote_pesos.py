@@ -0,0 +1,101 @@
+"""
+lote_pesos.py - Formato binario por lotes para lecturas de bascula (Modulo 2)
+SmartPort v2.0
+
+En lugar de un mensaje MQTT con "1.23" por lectura, la bascula puede
+acumular lecturas y publicar un lote en el mismo topic
+(aeropuerto/peso o aeropuerto/peso/<bascula>).
+
+Formato v1 (little-endian, struct):
+
+    cabecera  '<2sBHI'  magic b'SP' | version (1) | n lecturas | t_base (epoch s del dispositivo)
+    lectura   '<Ii'     offset_ms desde t_base | peso en gramos (con signo)
+
+9 bytes de cabecera + 8 bytes por lectura. Un payload que no empiece
+con MAGIC se trata como el float en texto de siempre.
+
+Si el reloj del dispositivo no esta sincronizado (t_base anterior a
+T_BASE_MINIMO), las lecturas se anclan a la hora de llegada del lote
+conservando sus intervalos relativos.
+
+Con deteccion de maletas (pesaje.py), SMARTPORT_PESAJE_SILENCIO debe ser
+mayor que el intervalo entre lotes: si no, la maleta se cierra por
+silencio antes de que llegue el siguiente lote.
+"""
+
+import struct
+import time
+
+MAGIC = b'SP'
+VERSION = 1
+CABECERA = struct.Struct('<2sBHI')
+LECTURA = struct.Struct('<Ii')
+MAX_LECTURAS = 0xFFFF
+
+T_BASE_MINIMO = 1577836800  # 2020-01-01: antes de esto el RTC no tiene hora NTP
+
+def es_lote(payload):
+    """True si el payload (bytes) usa el formato binario"""
+    return payload[:len(MAGIC)] == MAGIC
+
+def codificar(lecturas, t_base=None):
+    """
+    Empaquetar lecturas en formato v1 (referencia para el firmware y pruebas)
+
+    Args:
+        lecturas: Lista de (t_epoch, peso_kg)
+        t_base: Epoch base (default: la primera lectura, truncada a segundos)
+
+    Returns:
+        bytes
+    """
+    if len(lecturas) > MAX_LECTURAS:
+        raise ValueError(f"Maximo {MAX_LECTURAS} lecturas por lote")
+    if t_base is None:
+        t_base = int(lecturas[0][0]) if lecturas else int(time.time())
+
+    partes = [CABECERA.pack(MAGIC, VERSION, len(lecturas), t_base)]
+    for t, peso in lecturas:
+        partes.append(LECTURA.pack(int(round((t - t_base) * 1000)), int(round(peso * 1000))))
+    return b''.join(partes)
+
+def decodificar(payload, recibido=None):
+    """
+    Desempaquetar un lote v1
+
+    Args:
+        payload: bytes del mensaje MQTT
+        recibido: Epoch de llegada (para anclar relojes sin sincronizar)
+
+    Returns:
+        list: (t_epoch, peso_kg) en orden de medicion
+
+    Raises:
+        ValueError: Magic, version o longitud incorrectos
+    """
+    if len(payload) < CABECERA.size:
+        raise ValueError(f"Lote truncado ({len(payload)} bytes)")
+
+    magic, version, n, t_base = CABECERA.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError("Payload sin cabecera de lote")
+    if version != VERSION:
+        raise ValueError(f"Version de lote no soportada: {version}")
+
+    esperado = CABECERA.size + n * LECTURA.size
+    if len(payload) != esperado:
+        raise ValueError(f"Longitud {len(payload)} != {esperado} para {n} lecturas")
+
+    lecturas = [
+        (t_base + offset_ms / 1000.0, gramos / 1000.0)
+        for offset_ms, gramos in LECTURA.iter_unpack(payload[CABECERA.size:])
+    ]
+
+    if lecturas and t_base < T_BASE_MINIMO:
+        # Reloj sin sincronizar: la ultima lectura se toma como "ahora"
+        recibido = time.time() if recibido is None else recibido
+        ajuste = recibido - lecturas[-1][0]
+        lecturas = [(t + ajuste, peso) for t, peso in lecturas]
+
+    lecturas.sort(key=lambda lectura: lectura[0])
+    return lecturas
@@ -0,0 +1,146 @@
+"""
+memoria.py - Diagnostico de crecimiento de memoria y threads
+SmartPort v2.0
+
+El backend corre dias en la Raspberry Pi. Para encontrar fugas:
+
+- tracemalloc bajo demanda: iniciar() toma una instantanea base y
+  diferencia() compara la actual contra ella, agrupada por linea
+  (tracemalloc cuesta CPU y memoria: no se deja activo siempre)
+- Inventario de threads vivos agrupados por nombre
+- RSS del proceso (/proc/self/status, Linux)
+"""
+
+import gc
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+
+_lock = threading.Lock()
+_base = None  # (instantanea, hora)
+
+def rss_kb():
+    """
+    Memoria residente actual y pico del proceso
+
+    Returns:
+        dict: {rss_kb, rss_pico_kb} (None fuera de Linux)
+    """
+    valores = {'rss_kb': None, 'rss_pico_kb': None}
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for linea in f:
+                if linea.startswith('VmRSS:'):
+                    valores['rss_kb'] = int(linea.split()[1])
+                elif linea.startswith('VmHWM:'):
+                    valores['rss_pico_kb'] = int(linea.split()[1])
+    except OSError:
+        pass
+    return valores
+
+# ========================================
+# TRACEMALLOC
+# ========================================
+
+def iniciar(frames=10):
+    """
+    Activar tracemalloc (si no lo estaba) y fijar la instantanea base
+
+    Args:
+        frames: Profundidad de pila guardada por asignacion
+    """
+    global _base
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _base = (tracemalloc.take_snapshot(), time.time())
+    print(f"[INFO] tracemalloc activo ({tracemalloc.get_traceback_limit()} frames) - base fijada")
+
+def detener():
+    global _base
+    with _lock:
+        _base = None
+        tracemalloc.stop()
+    print("[INFO] tracemalloc detenido")
+
+def diferencia(top=20, agrupar='lineno'):
+    """
+    Comparar la memoria actual contra la instantanea base
+
+    Args:
+        top: Cuantas lineas devolver (las de mayor crecimiento)
+        agrupar: 'lineno', 'filename' o 'traceback'
+
+    Returns:
+        dict: Crecimiento total y top de lineas, o None si no hay base
+    """
+    with _lock:
+        if _base is None or not tracemalloc.is_tracing():
+            return None
+        base, desde = _base
+        actual = tracemalloc.take_snapshot()
+
+    filtros = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ]
+    cambios = actual.filter_traces(filtros).compare_to(base.filter_traces(filtros), agrupar)
+    actual_b, pico_b = tracemalloc.get_traced_memory()
+
+    return {
+        'desde': desde,
+        'segundos': round(time.time() - desde, 1),
+        'crecimiento_kb': round(sum(c.size_diff for c in cambios) / 1024, 1),
+        'rastreado_kb': round(actual_b / 1024, 1),
+        'rastreado_pico_kb': round(pico_b / 1024, 1),
+        'top': [{
+            'ubicacion': str(c.traceback[0]) if agrupar != 'traceback' else c.traceback.format(),
+            'crecimiento_kb': round(c.size_diff / 1024, 1),
+            'total_kb': round(c.size / 1024, 1),
+            'bloques_nuevos': c.count_diff
+        } for c in cambios[:top]]
+    }
+
+# ========================================
+# THREADS
+# ========================================
+
+def inventario_threads(pilas=False):
+    """
+    Threads vivos del proceso
+
+    Args:
+        pilas: Incluir la pila actual de cada thread
+
+    Returns:
+        dict: {total, por_nombre, threads}
+    """
+    marcos = sys._current_frames() if pilas else {}
+    threads = []
+    por_nombre = {}
+
+    for t in threading.enumerate():
+        # Quitar el numero para agrupar: Thread-12 (vigilar) -> Thread (vigilar)
+        grupo = re.sub(r'-\d+', '', t.name)
+        por_nombre[grupo] = por_nombre.get(grupo, 0) + 1
+
+        info = {'nombre': t.name, 'daemon': t.daemon, 'ident': t.ident}
+        if pilas and t.ident in marcos:
+            info['pila'] = traceback.format_stack(marcos[t.ident])[-5:]
+        threads.append(info)
+
+    return {'total': len(threads), 'por_nombre': por_nombre, 'threads': threads}
+
+def resumen():
+    """Contadores baratos para muestrear en cada ciclo (soak test)"""
+    return {
+        **rss_kb(),
+        'threads': threading.active_count(),
+        'objetos_gc': len(gc.get_objects()),
+        'tracemalloc_kb': round(tracemalloc.get_traced_memory()[0] / 1024, 1) if tracemalloc.is_tracing() else None,
+        'pid': os.getpid()
+    }
@@ -0,0 +1,86 @@
+"""
+metricas_puerta.py - Latencia de decision por puerta (Modulo 3)
+SmartPort v2.0
+
+Tiempo entre la llegada de la solicitud MQTT y la publicacion de la
+respuesta ABRIR/DENEGAR, agrupado por id de puerta. Se guarda una
+ventana de las ultimas VENTANA muestras por puerta para percentiles.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+VENTANA = int(os.environ.get("SMARTPORT_METRICAS_VENTANA", "500"))
+
+_lock = threading.Lock()
+_puertas = {}
+
+def _nueva_puerta():
+    return {
+        'solicitudes': 0,
+        'abrir': 0,
+        'denegar': 0,
+        'suprimidas': 0,
+        'latencias': deque(maxlen=VENTANA),
+        'ultima': None
+    }
+
+def registrar(puerta, decision, segundos):
+    """
+    Registrar una decision enviada a una puerta
+
+    Args:
+        puerta: Id de la puerta ('legacy' para el topic antiguo)
+        decision: 'ABRIR' o 'DENEGAR'
+        segundos: Latencia desde que llego la solicitud
+    """
+    with _lock:
+        datos = _puertas.setdefault(puerta, _nueva_puerta())
+        datos['solicitudes'] += 1
+        datos['abrir' if decision == 'ABRIR' else 'denegar'] += 1
+        datos['latencias'].append(segundos)
+        datos['ultima'] = time.time()
+
+def registrar_suprimida(puerta):
+    """Contar un toque repetido resuelto por la ventana anti-rebote"""
+    with _lock:
+        _puertas.setdefault(puerta, _nueva_puerta())['suprimidas'] += 1
+
+def _percentil(ordenadas, p):
+    """Percentil por rango mas cercano sobre una lista ya ordenada"""
+    if not ordenadas:
+        return None
+    indice = min(len(ordenadas) - 1, int(round(p / 100.0 * (len(ordenadas) - 1))))
+    return ordenadas[indice]
+
+def resumen():
+    """
+    Estadisticas por puerta
+
+    Returns:
+        dict: {puerta: {solicitudes, abrir, denegar, suprimidas, latencia_ms: {...}, ultima}}
+    """
+    with _lock:
+        copia = {p: (dict(d), sorted(d['latencias'])) for p, d in _puertas.items()}
+
+    resultado = {}
+    for puerta, (datos, ordenadas) in copia.items():
+        ms = [x * 1000.0 for x in ordenadas]
+        resultado[puerta] = {
+            'solicitudes': datos['solicitudes'],
+            'abrir': datos['abrir'],
+            'denegar': datos['denegar'],
+            'suprimidas': datos['suprimidas'],
+            'latencia_ms': {
+                'muestras': len(ms),
+                'promedio': round(sum(ms) / len(ms), 2) if ms else None,
+                'p50': round(_percentil(ms, 50), 2) if ms else None,
+                'p95': round(_percentil(ms, 95), 2) if ms else None,
+                'p99': round(_percentil(ms, 99), 2) if ms else None,
+                'maximo': round(ms[-1], 2) if ms else None
+            },
+            'ultima': datos['ultima']
+        }
+    return resultado
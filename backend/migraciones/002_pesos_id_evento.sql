@@ -0,0 +1,8 @@
+-- -----------------------------------------------------
+-- MIGRACION 002: Clave de idempotencia en pesos_equipaje
+-- Eventos reenviados desde el spool del gateway no se duplican
+-- -----------------------------------------------------
+
+ALTER TABLE pesos_equipaje
+    ADD COLUMN id_evento CHAR(32) DEFAULT NULL,
+    ADD CONSTRAINT uq_peso_evento UNIQUE (id_evento);
@@ -0,0 +1,19 @@
+-- -----------------------------------------------------
+-- MIGRACION 003: Particionado por dia de pesos_equipaje
+-- MySQL exige que toda clave unica incluya la columna de particion:
+--   PK (id_peso, fecha_hora) y UNIQUE (id_evento, fecha_hora)
+-- El spool reenvia siempre la misma fecha_hora, asi que la idempotencia
+-- por id_evento se conserva.
+-- Particiones diarias p<AAAAMMDD> las crea/archiva archivo_pesos.py
+-- -----------------------------------------------------
+
+ALTER TABLE pesos_equipaje
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id_peso, fecha_hora),
+    DROP INDEX uq_peso_evento,
+    ADD CONSTRAINT uq_peso_evento UNIQUE (id_evento, fecha_hora);
+
+ALTER TABLE pesos_equipaje
+    PARTITION BY RANGE (TO_DAYS(fecha_hora)) (
+        PARTITION p_futuro VALUES LESS THAN MAXVALUE
+    );
@@ -0,0 +1,11 @@
+-- -----------------------------------------------------
+-- MIGRACION 004: Marca de modificacion en pasajeros
+-- Permite sincronizar incrementalmente el almacen de embeddings
+-- (almacen_embeddings.py) sin releer toda la tabla
+-- -----------------------------------------------------
+
+ALTER TABLE pasajeros
+    ADD COLUMN fecha_actualizacion DATETIME(6) NOT NULL
+        DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+
+CREATE INDEX idx_pasajero_actualizacion ON pasajeros (fecha_actualizacion);
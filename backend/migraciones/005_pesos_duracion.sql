@@ -0,0 +1,10 @@
+-- -----------------------------------------------------
+-- MIGRACION 005: Un registro por maleta en pesos_equipaje
+-- pesaje.py agrupa las lecturas repetidas de la bascula en un evento
+-- por maleta: peso asentado, tiempo sobre la bascula y lecturas recibidas.
+-- Filas anteriores (una por lectura) quedan con NULL.
+-- -----------------------------------------------------
+
+ALTER TABLE pesos_equipaje
+    ADD COLUMN duracion_s DECIMAL(7,1) NULL AFTER peso_kg,
+    ADD COLUMN muestras SMALLINT UNSIGNED NULL AFTER duracion_s;
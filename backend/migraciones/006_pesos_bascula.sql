@@ -0,0 +1,10 @@
+-- -----------------------------------------------------
+-- MIGRACION 006: Id de bascula en pesos_equipaje
+-- Cada bascula publica en aeropuerto/peso/<bascula>; el topic antiguo
+-- sin id (y todas las filas anteriores) corresponden a 'principal'
+-- -----------------------------------------------------
+
+ALTER TABLE pesos_equipaje
+    ADD COLUMN id_bascula VARCHAR(32) NOT NULL DEFAULT 'principal' AFTER id_peso;
+
+CREATE INDEX idx_bascula_fecha ON pesos_equipaje (id_bascula, fecha_hora);
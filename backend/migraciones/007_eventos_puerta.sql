@@ -0,0 +1,26 @@
+-- -----------------------------------------------------
+-- MIGRACION 007: Bitacora de eventos de puerta (append-only)
+-- accesos_puerta guarda una fila por pasajero y se sobrescribe; aqui
+-- queda cada intento: toque RFID, intento facial con su distancia y
+-- respuesta de la puerta. La escribe bitacora.py en lotes.
+-- Sin FK a pasajeros: la bitacora sobrevive al borrado del pasajero y
+-- el INSERT no bloquea filas de pasajeros.
+-- -----------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS eventos_puerta (
+    id_evento BIGINT AUTO_INCREMENT PRIMARY KEY,
+    fecha_hora DATETIME(3) NOT NULL,
+    tipo ENUM('RFID', 'ROSTRO', 'PUERTA') NOT NULL,
+    dispositivo VARCHAR(64) NOT NULL,
+    resultado VARCHAR(24) NOT NULL,
+    id_pasajero INT DEFAULT NULL,
+    rfid_uid VARCHAR(50) DEFAULT NULL,
+    similitud DECIMAL(5,2) DEFAULT NULL,
+    distancia FLOAT DEFAULT NULL,
+    latencia_ms INT DEFAULT NULL,
+    embedding VARBINARY(1024) DEFAULT NULL  -- float32 del rostro capturado (opcional)
+);
+
+CREATE INDEX idx_eventos_dispositivo_fecha ON eventos_puerta (dispositivo, fecha_hora);
+CREATE INDEX idx_eventos_tipo_fecha ON eventos_puerta (tipo, fecha_hora);
+CREATE INDEX idx_eventos_pasajero_fecha ON eventos_puerta (id_pasajero, fecha_hora);
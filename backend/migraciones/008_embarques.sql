@@ -0,0 +1,32 @@
+-- -----------------------------------------------------
+-- MIGRACION 008: Sesiones de embarque por vuelo
+-- Una fila por vuelo con el conteo de pasajeros en cada estado.
+-- Se calcula con un GROUP BY al abrir el embarque y despues se
+-- mantiene incrementalmente en cada transicion (db.py, puerta y
+-- spool), asi que el progreso se lee por clave primaria.
+-- Con el embarque cerrado los contadores se congelan; reabrirlo
+-- los vuelve a calcular.
+-- -----------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS embarques (
+    numero_vuelo INT PRIMARY KEY,
+    abierto BOOLEAN NOT NULL DEFAULT TRUE,
+    fecha_apertura DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    fecha_cierre DATETIME DEFAULT NULL,
+
+    registrados INT NOT NULL DEFAULT 0,
+    validados INT NOT NULL DEFAULT 0,
+    abordados INT NOT NULL DEFAULT 0,
+    completos INT NOT NULL DEFAULT 0,
+
+    fecha_actualizacion DATETIME(3) NOT NULL
+        DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3),
+
+    CONSTRAINT fk_embarque_vuelo
+        FOREIGN KEY (numero_vuelo)
+        REFERENCES vuelos(numero_vuelo)
+        ON DELETE CASCADE
+);
+
+-- Precarga de la puerta al abrir el embarque (pasajeros de un vuelo)
+CREATE INDEX idx_pasajero_vuelo_estado ON pasajeros (numero_vuelo, estado);
@@ -0,0 +1,10 @@
+-- -----------------------------------------------------
+-- MIGRACION 009: Puerta que reclamo la apertura
+-- La ventana anti-rebote de antirrebote.py es por proceso; con varias
+-- instancias del gateway (suscripcion compartida) el toque repetido
+-- puede llegar a otra. Con la puerta y la hora del reclamo en la BD,
+-- cualquier instancia reconoce la repeticion y responde el mismo ABRIR.
+-- -----------------------------------------------------
+
+ALTER TABLE accesos_puerta
+    ADD COLUMN puerta_apertura VARCHAR(64) DEFAULT NULL AFTER puerta_abierta;
@@ -0,0 +1,18 @@
+-- -----------------------------------------------------
+-- MIGRACION 010: Registro de id_evento de pesos ya insertados
+-- pesos_equipaje esta particionada por fecha_hora, asi que su UNIQUE
+-- tiene que incluirla y no detecta una re-entrega cuya fecha_hora
+-- cambia (lotes anclados a la hora de llegada). Esta tabla sin
+-- particionar garantiza un solo insert por id_evento entre instancias,
+-- reconexiones y el spool. archivo_pesos.py purga lo que sale de la
+-- retencion.
+-- -----------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS pesos_eventos (
+    id_evento CHAR(32) NOT NULL PRIMARY KEY,
+    lote CHAR(32) NOT NULL,
+    fecha_registro DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    INDEX idx_pesos_eventos_lote (lote),
+    INDEX idx_pesos_eventos_fecha (fecha_registro)
+);
@@ -0,0 +1,222 @@
+"""
+migrar.py - Migraciones versionadas del esquema aeropuerto
+SmartPort v2.0
+
+Aplica en orden los archivos migraciones/NNN_descripcion.sql que aun no
+estan registrados en la tabla schema_migrations. A diferencia de
+ScriptDB.sql (que borra y recrea la BD), se puede ejecutar sobre un
+sistema en produccion.
+
+Bases creadas con el ScriptDB.sql original (sin schema_migrations) se
+adoptan como version 1 (esquema inicial) antes de aplicar el resto.
+
+Uso:
+    python migrar.py                 # aplicar pendientes
+    python migrar.py --estado        # listar aplicadas / pendientes
+    python migrar.py --hasta 3       # aplicar hasta la version 3
+    python migrar.py --database aeropuerto_pruebas
+"""
+
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sys
+
+import pymysql
+
+from db import DB_CONFIG
+
+DIRECTORIO_MIGRACIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migraciones")
+VERSION_BASE = 1
+
+_PATRON_ARCHIVO = re.compile(r"^(\d+)_(.+)\.sql$")
+
+def conectar(database=None):
+    """Conexion a la BD indicada (default: la de DB_CONFIG)"""
+    config = dict(DB_CONFIG)
+    if database:
+        config['database'] = database
+    return pymysql.connect(**config)
+
+def listar_migraciones():
+    """
+    Migraciones disponibles en disco, ordenadas por version
+
+    Returns:
+        list: dicts {version, nombre, ruta, checksum}
+    """
+    migraciones = []
+    for ruta in glob.glob(os.path.join(DIRECTORIO_MIGRACIONES, "*.sql")):
+        coincidencia = _PATRON_ARCHIVO.match(os.path.basename(ruta))
+        if not coincidencia:
+            continue
+        with open(ruta, 'rb') as f:
+            contenido = f.read()
+        migraciones.append({
+            'version': int(coincidencia.group(1)),
+            'nombre': coincidencia.group(2),
+            'ruta': ruta,
+            'checksum': hashlib.sha256(contenido).hexdigest()
+        })
+    migraciones.sort(key=lambda m: m['version'])
+    return migraciones
+
+def dividir_sentencias(sql):
+    """
+    Separar un script en sentencias (';' al final de linea)
+
+    Los comentarios '--' de linea completa se descartan. No soporta
+    DELIMITER / procedimientos almacenados.
+    """
+    sentencias = []
+    actual = []
+    for linea in sql.splitlines():
+        if linea.strip().startswith('--'):
+            continue
+        actual.append(linea)
+        if linea.rstrip().endswith(';'):
+            sentencia = '\n'.join(actual).strip().rstrip(';').strip()
+            if sentencia:
+                sentencias.append(sentencia)
+            actual = []
+    resto = '\n'.join(actual).strip()
+    if resto:
+        sentencias.append(resto)
+    return sentencias
+
+def _asegurar_tabla_versiones(cursor):
+    """Crear schema_migrations y adoptar bases creadas con el ScriptDB.sql original"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            nombre VARCHAR(150) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            aplicada DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("SELECT COUNT(*) AS total FROM schema_migrations")
+    if cursor.fetchone()['total'] > 0:
+        return
+
+    cursor.execute("SHOW TABLES LIKE 'pasajeros'")
+    if cursor.fetchone():
+        base = next((m for m in listar_migraciones() if m['version'] == VERSION_BASE), None)
+        if base:
+            print(f"[INFO] Esquema existente sin versionar - adoptado como version {VERSION_BASE}")
+            cursor.execute("""
+                INSERT INTO schema_migrations (version, nombre, checksum)
+                VALUES (%s, %s, %s)
+            """, (base['version'], base['nombre'], base['checksum']))
+
+def versiones_aplicadas(cursor):
+    """
+    Returns:
+        dict: {version: checksum} de migraciones ya aplicadas
+    """
+    cursor.execute("SELECT version, checksum FROM schema_migrations")
+    return {fila['version']: fila['checksum'] for fila in cursor.fetchall()}
+
+def aplicar_migracion(conn, migracion):
+    """
+    Ejecutar una migracion y registrarla en schema_migrations
+
+    Nota: en MySQL los DDL hacen commit implicito; si una sentencia
+    intermedia falla, la migracion queda a medias y sin registrar.
+    """
+    with open(migracion['ruta'], encoding='utf-8') as f:
+        sentencias = dividir_sentencias(f.read())
+
+    cursor = conn.cursor()
+    try:
+        for sentencia in sentencias:
+            cursor.execute(sentencia)
+        cursor.execute("""
+            INSERT INTO schema_migrations (version, nombre, checksum)
+            VALUES (%s, %s, %s)
+        """, (migracion['version'], migracion['nombre'], migracion['checksum']))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def migrar(database=None, hasta=None):
+    """
+    Aplicar todas las migraciones pendientes (hasta la version indicada)
+
+    Returns:
+        list: Versiones aplicadas en esta ejecucion
+    """
+    conn = conectar(database)
+    aplicadas_ahora = []
+    try:
+        cursor = conn.cursor()
+        _asegurar_tabla_versiones(cursor)
+        conn.commit()
+        aplicadas = versiones_aplicadas(cursor)
+        cursor.close()
+
+        for migracion in listar_migraciones():
+            version = migracion['version']
+            if hasta is not None and version > hasta:
+                break
+
+            if version in aplicadas:
+                if aplicadas[version] != migracion['checksum']:
+                    print(f"[WARNING] Migracion {version:03d} modificada despues de aplicarse")
+                continue
+
+            print(f"[INFO] Aplicando migracion {version:03d}_{migracion['nombre']}...")
+            aplicar_migracion(conn, migracion)
+            aplicadas_ahora.append(version)
+            print(f"[OK] Migracion {version:03d} aplicada")
+
+        return aplicadas_ahora
+    finally:
+        conn.close()
+
+def imprimir_estado(database=None):
+    """Listar migraciones aplicadas y pendientes"""
+    conn = conectar(database)
+    try:
+        cursor = conn.cursor()
+        _asegurar_tabla_versiones(cursor)
+        conn.commit()
+        aplicadas = versiones_aplicadas(cursor)
+        cursor.close()
+    finally:
+        conn.close()
+
+    for migracion in listar_migraciones():
+        version = migracion['version']
+        if version not in aplicadas:
+            estado = 'PENDIENTE'
+        elif aplicadas[version] != migracion['checksum']:
+            estado = 'MODIFICADA'
+        else:
+            estado = 'aplicada'
+        print(f"  {version:03d}_{migracion['nombre']:<40} {estado}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Migraciones del esquema aeropuerto")
+    parser.add_argument('--database', default=None, help="BD destino (default: DB_CONFIG)")
+    parser.add_argument('--hasta', type=int, default=None, help="Version maxima a aplicar")
+    parser.add_argument('--estado', action='store_true', help="Solo mostrar el estado")
+    args = parser.parse_args()
+
+    try:
+        if args.estado:
+            imprimir_estado(args.database)
+        else:
+            aplicadas = migrar(args.database, args.hasta)
+            print(f"[OK] {len(aplicadas)} migraciones aplicadas" if aplicadas else "[OK] Esquema al dia")
+    except pymysql.MySQLError as e:
+        print(f"[ERROR] Error de migracion: {e}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
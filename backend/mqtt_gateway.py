@@ -0,0 +1,907 @@
+"""
+mqtt_gateway.py - Gateway IoT MQTT para SmartPort v2.0
+
+MODULO 2: Recepcion de datos de peso via MQTT desde ESP8266
+MODULO 3: Control de puerta fisica via MQTT con ESP8266
+
+Se puede ejecutar como proceso independiente (rol "iot-gateway") para que
+la latencia de la puerta no compita con la codificacion facial del kiosko.
+"""
+
+import paho.mqtt.client as mqtt
+import hashlib
+import json
+import os
+import re
+import socket
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from db import get_db_connection, reclamar_eventos_peso, SQL_EMBARQUE_COMPLETO
+import antirrebote
+import bitacora
+import estadisticas_bascula
+import idempotencia
+import lote_pesos
+import metricas_puerta
+import perfilado
+import pesaje
+import spool
+
+# ========================================
+# CONFIGURACION MQTT
+# ========================================
+
+MQTT_BROKER = os.environ.get("MQTT_BROKER", "broker.mqtt.cool")
+MQTT_PORT = int(os.environ.get("MQTT_PORT", "1883"))
+MQTT_TOPIC_VERIFICAR_RFID = "aeropuerto/verificar_rfid"  # ESP8266 Puerta envia RFID
+MQTT_TOPIC_PUERTA_RESPUESTA = "aeropuerto/puerta/respuesta"  # Raspberry responde ABRIR/DENEGAR
+MQTT_TOPIC_PESO = "aeropuerto/peso"  # ESP8266 Bascula envia peso
+
+# Una bascula por topic: aeropuerto/peso/<bascula>. El topic sin id se
+# atiende como la bascula pesaje.BASCULA_DEFAULT
+MQTT_TOPIC_PESO_PREFIJO = MQTT_TOPIC_PESO + "/"
+MQTT_TOPIC_PESO_BASCULA = MQTT_TOPIC_PESO_PREFIJO + "+"
+
+# Una fila por maleta (pesaje.py) en lugar de una por lectura
+PESAJE_POR_MALETA = os.environ.get("SMARTPORT_PESAJE_POR_MALETA", "1") == "1"
+
+# Esquema por puerta (multiples gates):
+#   aeropuerto/puerta/<puerta>/verificar  <- {"uid": "6EF793C0", "req": "a1b2"} (o UID plano)
+#   aeropuerto/puerta/<puerta>/respuesta  -> {"req": "a1b2", "decision": "ABRIR"}
+# El topic antiguo (firmware ESP32Modulo3) se sigue atendiendo como puerta "legacy"
+MQTT_TOPIC_PUERTA_PREFIJO = "aeropuerto/puerta/"
+MQTT_TOPIC_PUERTA_VERIFICAR = MQTT_TOPIC_PUERTA_PREFIJO + "+/verificar"
+PUERTA_LEGACY = "legacy"
+
+# ========================================
+# ESCALADO HORIZONTAL (N instancias del gateway)
+# ========================================
+# Cada instancia necesita un client_id unico: con uno fijo, la segunda
+# expulsaria a la primera del broker
+MQTT_CLIENT_ID = os.environ.get(
+    "MQTT_CLIENT_ID",
+    f"RaspberryPi_SmartPort-{socket.gethostname()}-{os.getpid()}"
+)
+# Con grupo definido se usa MQTT v5 y $share/<grupo>/<topic>: el broker
+# reparte cada mensaje a UNA sola instancia del grupo. Solo se comparten
+# los topics de puerta (cada solicitud es independiente)
+MQTT_GRUPO_COMPARTIDO = os.environ.get("MQTT_GRUPO_COMPARTIDO", "")
+
+# Los pesos NO se comparten: pesaje.py y estadisticas_bascula.py guardan
+# estado por bascula y necesitan todas sus lecturas en la misma instancia.
+# Cada bascula se fija a una instancia con MQTT_BASCULAS:
+#   ""          -> todas las basculas (una sola instancia atiende pesos)
+#   "b1,b2"     -> solo esas basculas
+#   "ninguna"   -> ningun peso (instancias que solo atienden puertas)
+MQTT_BASCULAS = os.environ.get("MQTT_BASCULAS", "").strip()
+MQTT_QOS = int(os.environ.get("MQTT_QOS", "1"))
+
+# "paho" (este modulo) o "async" (gateway_async.py: aiomqtt + aiomysql)
+GATEWAY_MODO = os.environ.get("SMARTPORT_GATEWAY_MODO", "paho")
+
+def topic_suscripcion(topic):
+    """Topic con prefijo de suscripcion compartida si hay grupo configurado"""
+    if MQTT_GRUPO_COMPARTIDO:
+        return f"$share/{MQTT_GRUPO_COMPARTIDO}/{topic}"
+    return topic
+
+def topics_peso():
+    """Topics de bascula que atiende esta instancia (segun MQTT_BASCULAS)"""
+    if not MQTT_BASCULAS:
+        return [MQTT_TOPIC_PESO, MQTT_TOPIC_PESO_BASCULA]
+    if MQTT_BASCULAS.lower() == 'ninguna':
+        return []
+    topics = []
+    for bascula in (b.strip() for b in MQTT_BASCULAS.split(',')):
+        if bascula == pesaje.BASCULA_DEFAULT:
+            topics.append(MQTT_TOPIC_PESO)
+        elif bascula:
+            topics.append(MQTT_TOPIC_PESO_PREFIJO + bascula)
+    return topics
+
+def suscripciones():
+    """
+    Suscripciones de esta instancia: puertas por el grupo compartido y
+    pesos directos (nunca por $share, ver MQTT_BASCULAS)
+    """
+    if MQTT_GRUPO_COMPARTIDO and not MQTT_BASCULAS:
+        print("[WARNING] Grupo compartido sin MQTT_BASCULAS: cada instancia recibe todas las "
+              "basculas. Asigne cada bascula a una sola instancia")
+    puertas = [topic_suscripcion(t) for t in (MQTT_TOPIC_VERIFICAR_RFID, MQTT_TOPIC_PUERTA_VERIFICAR)]
+    return puertas + topics_peso()
+
+# ========================================
+# FIX para Python 3.13: Usar CallbackAPIVersion
+# ========================================
+_protocolo = mqtt.MQTTv5 if MQTT_GRUPO_COMPARTIDO else mqtt.MQTTv311
+
+try:
+    # Python 3.13+ requiere especificar la version del API
+    mqtt_client = mqtt.Client(
+        callback_api_version=mqtt.CallbackAPIVersion.VERSION1,
+        client_id=MQTT_CLIENT_ID,
+        protocol=_protocolo
+    )
+except AttributeError:
+    # Fallback para versiones antiguas de paho-mqtt
+    mqtt_client = mqtt.Client(client_id=MQTT_CLIENT_ID, protocol=_protocolo)
+
+mqtt_conectado = False
+
+def on_connect(client, userdata, flags, rc, properties=None):
+    global mqtt_conectado
+    if rc == 0:
+        mqtt_conectado = True
+        print(f"[OK] Conectado al broker MQTT como {MQTT_CLIENT_ID}")
+        
+        # Suscribirse a topics necesarios
+        for topic in suscripciones():
+            client.subscribe(topic, qos=MQTT_QOS)
+            print(f"[OK] Suscrito a: {topic}")
+    else:
+        mqtt_conectado = False
+        print(f"[ERROR] Error conectando a MQTT: codigo {rc}")
+
+def on_disconnect(client, userdata, rc, properties=None):
+    global mqtt_conectado
+    mqtt_conectado = False
+    print("[INFO] Desconectado del broker MQTT")
+
+def on_message(client, userdata, msg):
+    """
+    Callback para mensajes MQTT recibidos
+    Modulo 2: Recibe pesos de bascula (ya en kg)
+    Modulo 3: Recibe solicitudes de verificacion de RFID desde ESP8266 Puerta
+    """
+    topic = msg.topic
+    
+    # Las re-entregas QoS 1 se absorben por contenido: id_evento de cada
+    # peso (clave_peso) y id de solicitud de cada puerta. El mid del broker
+    # no sirve de clave: se reutiliza y cambia entre sesiones e instancias
+    
+    # MODULO 2: lote binario de lecturas (lote_pesos.py) - no es texto
+    if es_topic_peso(topic) and lote_pesos.es_lote(msg.payload):
+        procesar_lote_pesos(topic, msg.payload)
+        return
+    
+    payload = msg.payload.decode('utf-8').strip()  # ✅ Eliminar espacios
+    
+    if topic == MQTT_TOPIC_VERIFICAR_RFID:
+        # MODULO 3: ESP8266 Puerta solicita verificar RFID
+        print(f"\n[INFO] MODULO 3: ESP8266 Puerta solicita verificar RFID: {payload}")
+        atender_puerta(payload, nueva_solicitud(PUERTA_LEGACY))
+    
+    elif topic.startswith(MQTT_TOPIC_PUERTA_PREFIJO) and topic.endswith('/verificar'):
+        # MODULO 3: Puerta con id propio (aeropuerto/puerta/<puerta>/verificar)
+        puerta = topic[len(MQTT_TOPIC_PUERTA_PREFIJO):-len('/verificar')]
+        rfid_uid, id_solicitud = parsear_solicitud_puerta(payload)
+        print(f"\n[INFO] MODULO 3: Puerta {puerta} solicita verificar RFID: {rfid_uid} (req {id_solicitud})")
+        
+        # Re-entrega de una solicitud ya resuelta: repetir la misma decision
+        decision_previa = idempotencia.consultar(f"puerta:{puerta}:{id_solicitud}") if id_solicitud else None
+        if decision_previa:
+            print(f"[INFO] Solicitud {id_solicitud} duplicada - reenviando {decision_previa}")
+            responder_puerta(nueva_solicitud(puerta, id_solicitud), decision_previa)
+            return
+        
+        atender_puerta(rfid_uid, nueva_solicitud(puerta, id_solicitud))
+    
+    elif es_topic_peso(topic):
+        # MODULO 2: ESP8266 Bascula envia peso en kg (como string)
+        bascula = id_bascula(topic)
+        if bascula is None:
+            print(f"[WARNING] MODULO 2: Id de báscula inválido en topic '{topic}' - ignorado")
+            return
+        
+        print(f"\n[DEBUG] MODULO 2: Báscula {bascula} - payload recibido (raw): '{payload}'")
+        texto, secuencia = parsear_lectura(payload)
+        peso = interpretar_peso(texto)
+        
+        if not PESAJE_POR_MALETA:
+            # Comportamiento anterior: una fila por lectura, 0.0 si era invalida
+            registrar_pesos([_fila_lectura(bascula, time.time(), peso if peso is not None else 0.0,
+                                           clave_lectura(bascula, secuencia))])
+            return
+        
+        for evento in pesaje.procesar_lectura(peso, bascula):
+            registrar_maleta(evento)
+
+# ========================================
+# MODULO 2: LECTURAS DE BASCULA
+# ========================================
+
+_ID_BASCULA = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+_SECUENCIA = re.compile(r'^[A-Za-z0-9:_-]{1,64}$')
+
+def es_topic_peso(topic):
+    return topic == MQTT_TOPIC_PESO or topic.startswith(MQTT_TOPIC_PESO_PREFIJO)
+
+def id_bascula(topic):
+    """
+    Id de la bascula a partir del topic
+    
+    Returns:
+        str: Id (BASCULA_DEFAULT para el topic sin id), o None si no es valido
+    """
+    if topic == MQTT_TOPIC_PESO:
+        return pesaje.BASCULA_DEFAULT
+    bascula = topic[len(MQTT_TOPIC_PESO_PREFIJO):]
+    return bascula if _ID_BASCULA.match(bascula) else None
+
+def interpretar_peso(payload):
+    """
+    Convertir el payload de la bascula a kg
+    
+    Returns:
+        float: Peso (negativos se ajustan a 0.0), o None si no es un numero
+    """
+    try:
+        # ✅ FIX 1: Reemplazar coma por punto (por si acaso)
+        peso = float(payload.replace(',', '.'))
+    except ValueError as e:
+        print(f"[ERROR] MODULO 2: No se pudo convertir a float: '{payload}'")
+        print(f"[ERROR] Bytes (hex): {payload.encode('utf-8').hex()}")
+        print(f"[ERROR] Detalle: {e}")
+        return None
+    
+    print(f"[INFO] MODULO 2: Peso convertido: {peso:.3f} kg")
+    
+    if peso < 0.0:
+        print(f"[WARNING] Peso negativo: {peso:.3f} kg - Ajustando a 0.0")
+        peso = 0.0
+    elif peso < 0.100:
+        print(f"[WARNING] Peso muy bajo: {peso:.3f} kg (mínimo: 0.100 kg)")
+    elif peso > 50.0:
+        print(f"[WARNING] Peso muy alto: {peso:.2f} kg")
+    
+    return peso
+
+def clave_peso(bascula, *partes):
+    """
+    id_evento determinista de una fila de peso (32 hex, cabe en CHAR(32))
+
+    Se calcula de la identidad de la lectura (secuencia del dispositivo,
+    huella del lote o contenido), asi que la misma lectura re-entregada,
+    re-enviada desde el spool o procesada por otra instancia produce la
+    misma clave y pesos_eventos (db.reclamar_eventos_peso) la descarta
+    aunque su fecha_hora caiga en otra particion.
+    """
+    texto = '|'.join([bascula] + [str(parte) for parte in partes])
+    return hashlib.md5(texto.encode('utf-8')).hexdigest()
+
+def _fila_lectura(bascula, t, peso, id_evento=None):
+    """
+    Lectura suelta (modo una fila por lectura) -> fila de pesos_equipaje
+
+    Args:
+        bascula: Id de la bascula
+        t: Epoch de la lectura
+        peso: kg
+        id_evento: Clave ya calculada (secuencia del dispositivo o posicion
+            en un lote). Sin ella la clave sale de t, que para el texto sin
+            secuencia es la hora de llegada: esas re-entregas no se detectan
+    """
+    return {
+        'peso_kg': peso,
+        'bascula': bascula,
+        'fecha_hora': datetime.fromtimestamp(t).strftime('%Y-%m-%d %H:%M:%S'),
+        'duracion_s': None,
+        'muestras': None,
+        'id_evento': id_evento or clave_peso(bascula, 'lectura', f"{t:.3f}", f"{peso:.3f}")
+    }
+
+def parsear_lectura(payload):
+    """
+    Separar el peso de la secuencia opcional del dispositivo
+
+    Acepta "<peso>" (firmware antiguo) o "<peso>;<secuencia>", con la
+    secuencia unica por envio (p.ej. chip-arranque-contador)
+
+    Returns:
+        tuple: (texto del peso, secuencia o None)
+    """
+    texto, separador, secuencia = payload.partition(';')
+    secuencia = secuencia.strip()
+    if not separador or not _SECUENCIA.match(secuencia):
+        secuencia = None
+    return texto.strip(), secuencia
+
+def clave_lectura(bascula, secuencia):
+    """id_evento de una lectura de texto con secuencia (None si no trae)"""
+    return clave_peso(bascula, 'seq', secuencia) if secuencia else None
+
+def claves_lote(bascula, payload, n):
+    """
+    id_evento de cada lectura de un lote binario: huella del payload
+    (incluye t_base) + posicion. No depende de la hora de llegada, que
+    es la que ancla los lotes de relojes sin sincronizar: la re-entrega
+    de un lote asi tiene otra fecha_hora pero el mismo id_evento.
+    """
+    huella = hashlib.md5(payload).hexdigest()
+    return [clave_peso(bascula, 'lote', huella, i) for i in range(n)]
+
+def _fila_maleta(evento):
+    """Evento de pesaje.py -> fila de pesos_equipaje"""
+    print(f"[INFO] MODULO 2: Maleta en {evento['bascula']}: {evento['peso_kg']:.2f} kg, "
+          f"{evento['duracion_s']:.0f}s sobre la báscula, {evento['muestras']} lecturas"
+          f"{'' if evento['asentada'] else ' (sin asentar)'}")
+    return {
+        'peso_kg': evento['peso_kg'],
+        'bascula': evento['bascula'],
+        'fecha_hora': evento['fecha_hora'],
+        'duracion_s': evento['duracion_s'],
+        'muestras': evento['muestras'],
+        'id_evento': clave_peso(evento['bascula'], 'maleta', evento['fecha_hora'],
+                                evento['duracion_s'], evento['muestras'], evento['peso_kg'])
+    }
+
+def registrar_maleta(evento):
+    """Guardar el evento de una maleta cerrada por pesaje.py"""
+    registrar_pesos([_fila_maleta(evento)])
+
+def procesar_lote_pesos(topic, payload):
+    """
+    MODULO 2: Lote binario de lecturas con hora del dispositivo
+    
+    Las lecturas pasan por el mismo pipeline que las de texto (pesaje.py o
+    una fila por lectura) y las filas resultantes se insertan de una vez.
+    """
+    bascula = id_bascula(topic)
+    if bascula is None:
+        print(f"[WARNING] MODULO 2: Id de báscula inválido en topic '{topic}' - lote ignorado")
+        return
+    
+    try:
+        lecturas = lote_pesos.decodificar(payload, recibido=time.time())
+    except ValueError as e:
+        print(f"[ERROR] MODULO 2: Lote inválido de {bascula}: {e}")
+        pesaje.procesar_lectura(None, bascula)  # Contar como lectura invalida
+        return
+    
+    if PESAJE_POR_MALETA:
+        eventos = []
+        for t, peso in lecturas:
+            eventos.extend(pesaje.procesar_lectura(max(peso, 0.0), bascula, t))
+        filas = [_fila_maleta(evento) for evento in eventos]
+    else:
+        claves = claves_lote(bascula, payload, len(lecturas))
+        filas = [_fila_lectura(bascula, t, max(peso, 0.0), clave)
+                 for (t, peso), clave in zip(lecturas, claves)]
+    
+    print(f"[INFO] MODULO 2: Lote de {len(lecturas)} lecturas de {bascula} -> {len(filas)} filas")
+    if filas:
+        registrar_pesos(filas)
+
+# ========================================
+# CORRELACION SOLICITUD/RESPUESTA POR PUERTA
+# ========================================
+
+def parsear_solicitud_puerta(payload):
+    """
+    Extraer UID e id de solicitud del payload de una puerta
+    
+    Acepta JSON {"uid": ..., "req": ...} o el UID en texto plano
+    
+    Returns:
+        tuple: (rfid_uid, id_solicitud o None)
+    """
+    if payload.startswith('{'):
+        try:
+            datos = json.loads(payload)
+            return str(datos.get('uid', '')).strip(), datos.get('req')
+        except ValueError:
+            pass
+    return payload, None
+
+def nueva_solicitud(puerta, id_solicitud=None):
+    """Contexto de una solicitud de puerta para correlacionar la respuesta"""
+    return {
+        'puerta': puerta,
+        'id': id_solicitud or uuid.uuid4().hex[:12],
+        'correlacionada': id_solicitud is not None,
+        'inicio': time.time(),
+        'decision': None
+    }
+
+def responder_puerta(solicitud, decision):
+    """
+    Publicar ABRIR/DENEGAR solo a la puerta que lo pidio
+    
+    - Puerta legacy: texto plano en aeropuerto/puerta/respuesta
+    - Resto: JSON con el id de solicitud en aeropuerto/puerta/<puerta>/respuesta
+    
+    Args:
+        solicitud: dict de nueva_solicitud()
+        decision: 'ABRIR' o 'DENEGAR'
+    """
+    mqtt_client.publish(*mensaje_respuesta(solicitud, decision))
+    registrar_respuesta(solicitud, decision)
+
+def mensaje_respuesta(solicitud, decision):
+    """
+    Topic y payload de la respuesta a una puerta
+    
+    Returns:
+        tuple: (topic, payload)
+    """
+    puerta = solicitud['puerta']
+    
+    if puerta == PUERTA_LEGACY:
+        return MQTT_TOPIC_PUERTA_RESPUESTA, decision
+    return (
+        f"{MQTT_TOPIC_PUERTA_PREFIJO}{puerta}/respuesta",
+        json.dumps({'req': solicitud['id'], 'decision': decision})
+    )
+
+def registrar_respuesta(solicitud, decision):
+    """Recordar la decision (idempotencia/anti-rebote), medir la latencia y anotarla en la bitacora"""
+    puerta = solicitud['puerta']
+    solicitud['decision'] = decision
+    if solicitud['correlacionada']:
+        idempotencia.guardar(f"puerta:{puerta}:{solicitud['id']}", decision)
+    latencia = time.time() - solicitud['inicio']
+    metricas_puerta.registrar(puerta, decision, latencia)
+    bitacora.registrar(bitacora.TIPO_PUERTA, puerta, decision,
+                       id_pasajero=solicitud.get('id_pasajero'), rfid_uid=solicitud.get('uid'),
+                       latencia_ms=latencia * 1000)
+
+def registrar_toque(rfid_uid, solicitud, repetido):
+    """Toque de tarjeta en una puerta -> bitacora (los repetidos permiten medir reintentos)"""
+    solicitud['uid'] = rfid_uid
+    bitacora.registrar(bitacora.TIPO_RFID, solicitud['puerta'],
+                       'REPETIDO' if repetido else 'PRIMERO', rfid_uid=rfid_uid)
+
+def atender_puerta(rfid_uid, solicitud):
+    """
+    Verificar un toque de tarjeta aplicando la ventana anti-rebote
+    
+    El primer toque de un UID en una puerta se verifica contra la BD; los
+    repetidos dentro de la ventana reciben la misma decision (o ninguna,
+    si el primero no respondio) sin tocar la BD.
+    
+    Args:
+        rfid_uid: UID leido por la puerta
+        solicitud: Contexto de nueva_solicitud()
+    """
+    puerta = solicitud['puerta']
+    
+    anterior = antirrebote.reclamar(puerta, rfid_uid)
+    registrar_toque(rfid_uid, solicitud, anterior is not None)
+    if anterior is not None:
+        decision = antirrebote.esperar_decision(anterior)
+        metricas_puerta.registrar_suprimida(puerta)
+        if decision:
+            print(f"[INFO] Toque repetido de {rfid_uid} en puerta {puerta} - reenviando {decision}")
+            responder_puerta(solicitud, decision)
+        else:
+            print(f"[INFO] Toque repetido de {rfid_uid} en puerta {puerta} - sin respuesta")
+        return
+    
+    try:
+        verificar_rfid_para_puerta(rfid_uid, solicitud)
+    finally:
+        antirrebote.resolver(puerta, rfid_uid, solicitud['decision'])
+
+# ========================================
+# CONSULTAS (compartidas con gateway_async.py)
+# ========================================
+
+SQL_PASAJERO_PUERTA = """
+    SELECT p.id_pasajero, p.nombre_normalizado, p.estado,
+           a.id_acceso, a.puerta_abierta, a.puerta_apertura,
+           TIMESTAMPDIFF(SECOND, a.fecha_hora, NOW()) AS segundos_apertura
+    FROM pasajeros p
+    LEFT JOIN accesos_puerta a ON p.id_pasajero = a.id_pasajero
+    WHERE p.rfid_uid = %s
+"""
+
+# Condicional: rowcount = 0 si otra solicitud ya reclamo la apertura
+# Guarda la puerta y la hora: ventana anti-rebote visible para todas las instancias
+SQL_RECLAMAR_PUERTA = """
+    UPDATE accesos_puerta 
+    SET puerta_abierta = 1,
+        puerta_apertura = %s,
+        fecha_hora = NOW()
+    WHERE id_acceso = %s AND puerta_abierta = 0
+"""
+
+# Condicional: rowcount > 0 solo en la transicion real (contador del embarque)
+SQL_COMPLETAR_PASAJERO = """
+    UPDATE pasajeros 
+    SET estado = 'COMPLETO'
+    WHERE id_pasajero = %s AND estado = 'ABORDADO'
+"""
+
+# id_evento repetido (re-entrega, spool, otra instancia) no duplica la fila
+SQL_INSERTAR_PESO = """
+    INSERT INTO pesos_equipaje (id_bascula, peso_kg, duracion_s, muestras, fecha_hora, id_evento)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE id_evento = id_evento
+"""
+
+def valores_peso(fila):
+    """Parametros de SQL_INSERTAR_PESO para una fila de registrar_pesos()"""
+    return (fila['bascula'], fila['peso_kg'], fila['duracion_s'], fila['muestras'],
+            fila['fecha_hora'], fila['id_evento'])
+
+def es_toque_repetido(resultado, puerta):
+    """
+    Repeticion de una apertura reciente en la misma puerta, segun la BD
+    
+    La ventana de antirrebote.py es por proceso; con el grupo compartido
+    la repeticion puede llegar a otra instancia, que veria puerta_abierta
+    = 1 y denegaria justo despues del ABRIR. Dentro de la ventana se
+    reenvia ABRIR, como hace la ventana local.
+    
+    Args:
+        resultado: Fila de SQL_PASAJERO_PUERTA
+        puerta: Id de la puerta que hizo la solicitud
+    """
+    return bool(
+        resultado
+        and resultado['puerta_abierta']
+        and resultado['puerta_apertura'] == puerta
+        and resultado['segundos_apertura'] is not None
+        and resultado['segundos_apertura'] <= antirrebote.VENTANA_SEGUNDOS
+    )
+
+def motivo_denegacion(resultado):
+    """
+    Validaciones del Modulo 3 sobre la fila de SQL_PASAJERO_PUERTA
+    
+    Returns:
+        str: Motivo para denegar, o None si puede abrir
+    """
+    if not resultado:
+        return "RFID no encontrado en sistema"
+    if not resultado['id_acceso']:
+        return "Sin check-in facial completado (debe pasar primero por Módulo 1)"
+    if resultado['estado'] != 'ABORDADO':
+        return f"Estado inválido: {resultado['estado']} (se requiere ABORDADO)"
+    if resultado['puerta_abierta']:
+        return "Esta tarjeta ya fue usada para abrir la puerta (un acceso por pasajero)"
+    return None
+
+def verificar_rfid_para_puerta(rfid_uid, solicitud=None):
+    """
+    MODULO 3: Verificar si un RFID puede abrir la puerta fisica
+    
+    Si todo OK:
+    1. Reclama accesos_puerta.puerta_abierta = 1 (UPDATE condicional)
+    2. Envía "ABRIR" al ESP8266 que hizo la solicitud
+    3. Actualiza pasajeros.estado = 'COMPLETO'
+    4. Guarda con COMMIT
+    
+    Args:
+        rfid_uid: UID leido por la puerta
+        solicitud: Contexto de nueva_solicitud() (default: puerta legacy)
+    """
+    if solicitud is None:
+        solicitud = nueva_solicitud(PUERTA_LEGACY)
+    
+    conn = get_db_connection()
+    if not conn:
+        print("[ERROR] No se pudo conectar a la base de datos")
+        responder_puerta(solicitud, "DENEGAR")
+        return
+    
+    cursor = None
+    abrir_enviado = False
+    
+    try:
+        cursor = conn.cursor()
+        
+        # ============================================
+        # PASO 1: BUSCAR PASAJERO POR RFID
+        # ============================================
+        cursor.execute(SQL_PASAJERO_PUERTA, (rfid_uid,))
+        
+        resultado = cursor.fetchone()
+        
+        if not resultado:
+            print(f"[ERROR] RFID {rfid_uid} no encontrado en sistema")
+            responder_puerta(solicitud, "DENEGAR")
+            return
+        
+        id_pasajero = resultado['id_pasajero']
+        id_acceso = resultado['id_acceso']
+        solicitud['id_pasajero'] = id_pasajero
+        nombre = resultado['nombre_normalizado']
+        estado_actual = resultado['estado']
+        puerta_usada = resultado['puerta_abierta']
+        
+        print(f"\n[INFO] Pasajero encontrado: {nombre}")
+        print(f"[INFO] ID Pasajero: {id_pasajero}")
+        print(f"[INFO] ID Acceso: {id_acceso}")
+        print(f"[INFO] Estado actual: {estado_actual}")
+        print(f"[INFO] Puerta usada: {puerta_usada}")
+        
+        # Toque repetido atendido antes por otra instancia (o por esta)
+        if es_toque_repetido(resultado, solicitud['puerta']):
+            print(f"[INFO] Apertura reciente en puerta {solicitud['puerta']} - reenviando ABRIR")
+            metricas_puerta.registrar_suprimida(solicitud['puerta'])
+            responder_puerta(solicitud, "ABRIR")
+            return
+        
+        # ============================================
+        # PASO 2: VALIDACIONES
+        # ============================================
+        
+        # Validación 1: Tiene check-in completado? 
+        if not id_acceso:
+            print(f"[ERROR] Sin check-in facial completado")
+            print(f"[INFO] Debe pasar primero por Módulo 1")
+            responder_puerta(solicitud, "DENEGAR")
+            return
+        
+        # Validación 2: Estado es ABORDADO?
+        if estado_actual != 'ABORDADO':
+            print(f"[ERROR] Estado inválido: {estado_actual} (se requiere ABORDADO)")
+            responder_puerta(solicitud, "DENEGAR")
+            return
+        
+        # Validación 3: NO ha usado la puerta antes?
+        if puerta_usada:
+            print(f"[ERROR] Esta tarjeta ya fue usada para abrir la puerta")
+            print(f"[INFO] Solo se permite un acceso por pasajero")
+            responder_puerta(solicitud, "DENEGAR")
+            return
+        
+        # ============================================
+        # PASO 3: AUTORIZAR ACCESO
+        # ============================================
+        print("\n" + "="*60)
+        print(f"[OK] ✓✓✓ ACCESO AUTORIZADO ✓✓✓")
+        print(f"[OK] Pasajero: {nombre}")
+        print(f"[OK] RFID: {rfid_uid}")
+        print("="*60)
+        
+        # ============================================
+        # PASO 4: ACTUALIZAR BASE DE DATOS
+        # ============================================
+        print("\n[INFO] === ACTUALIZANDO BASE DE DATOS ===")
+        
+        # UPDATE 1: Reclamar la apertura (condicional, bloquea la fila hasta el COMMIT)
+        # Si otra instancia del gateway o una re-entrega del mismo mensaje ya
+        # la reclamo, rowcount = 0 y esta solicitud no vuelve a abrir la puerta
+        print(f"[INFO] 1/2: Actualizando accesos_puerta (id_acceso={id_acceso})...")
+        cursor.execute(SQL_RECLAMAR_PUERTA, (solicitud['puerta'], id_acceso))
+        
+        filas_1 = cursor.rowcount
+        print(f"[DEBUG] Filas afectadas: {filas_1}")
+        
+        if filas_1 == 0:
+            # La otra solicitud ya hizo COMMIT (el UPDATE espero su bloqueo)
+            conn.rollback()
+            cursor.execute(SQL_PASAJERO_PUERTA, (rfid_uid,))
+            if es_toque_repetido(cursor.fetchone(), solicitud['puerta']):
+                print(f"[INFO] Apertura reclamada por otra solicitud en esta puerta - reenviando ABRIR")
+                responder_puerta(solicitud, "ABRIR")
+            else:
+                print(f"[INFO] Apertura ya reclamada por otra solicitud - sin respuesta duplicada")
+            conn.rollback()
+            return
+        
+        print(f"[OK] ✓ accesos_puerta actualizado (puerta_abierta = 1)")
+        
+        # Enviar señal ABRIR al ESP8266
+        responder_puerta(solicitud, "ABRIR")
+        abrir_enviado = True
+        fecha_apertura = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        print("[MQTT] ✓ Señal ABRIR enviada al ESP8266")
+        
+        # UPDATE 2: Cambiar estado del pasajero a COMPLETO
+        print(f"[INFO] 2/2: Actualizando pasajeros (id_pasajero={id_pasajero})...")
+        cursor.execute(SQL_COMPLETAR_PASAJERO, (id_pasajero,))
+        
+        filas_2 = cursor.rowcount
+        print(f"[DEBUG] Filas afectadas: {filas_2}")
+        
+        if filas_2 > 0:
+            print(f"[OK] ✓ Estado actualizado (ABORDADO → COMPLETO)")
+            cursor.execute(SQL_EMBARQUE_COMPLETO, (id_pasajero,))
+        else:
+            print(f"[WARNING] No se actualizó ninguna fila en pasajeros")
+        
+        # COMMIT: Guardar cambios permanentemente
+        print("\n[INFO] Ejecutando COMMIT para guardar cambios...")
+        conn.commit()
+        print("[OK] ✓✓✓ COMMIT EXITOSO - Cambios guardados en BD")
+        
+        # ============================================
+        # PASO 5: VERIFICAR QUE SE GUARDARON LOS CAMBIOS
+        # ============================================
+        print("\n[INFO] === VERIFICANDO CAMBIOS EN BD ===")
+        cursor.execute("""
+            SELECT p.estado, a.puerta_abierta, a.fecha_hora
+            FROM pasajeros p
+            LEFT JOIN accesos_puerta a ON p.id_pasajero = a.id_pasajero
+            WHERE p.id_pasajero = %s
+        """, (id_pasajero,))
+        
+        verificacion = cursor.fetchone()
+        
+        print(f"[VERIFICACIÓN] Estado del pasajero: {verificacion['estado']}")
+        print(f"[VERIFICACIÓN] puerta_abierta: {verificacion['puerta_abierta']}")
+        print(f"[VERIFICACIÓN] fecha_hora: {verificacion['fecha_hora']}")
+        
+        # Validar que TODO se guardó correctamente
+        if verificacion['estado'] == 'COMPLETO' and verificacion['puerta_abierta'] == 1:
+            print("\n[OK] ✓✓✓ VERIFICACIÓN EXITOSA ✓✓✓")
+            print("[OK] Base de datos actualizada correctamente")
+        else:
+            print("\n[WARNING] ⚠ VERIFICACIÓN FALLIDA ⚠")
+            print("[WARNING] Los cambios NO se guardaron correctamente")
+            print(f"[DEBUG] Esperado: estado='COMPLETO', puerta_abierta=1")
+            print(f"[DEBUG] Obtenido: estado='{verificacion['estado']}', puerta_abierta={verificacion['puerta_abierta']}")
+        
+        print("="*60)
+        print(f"[RESUMEN] Pasajero {nombre} - Proceso COMPLETO")
+        print("="*60 + "\n")
+        
+    except Exception as e:
+        print("\n" + "="*60)
+        print("[ERROR] ✗✗✗ ERROR EN VERIFICACIÓN ✗✗✗")
+        print(f"[ERROR] {e}")
+        print("="*60)
+        
+        import traceback
+        traceback.print_exc()
+        
+        # Hacer rollback para deshacer cambios parciales
+        try:
+            conn.rollback()
+            print("[INFO] Rollback ejecutado - Cambios revertidos")
+        except:
+            pass
+        
+        if abrir_enviado:
+            # La puerta ya se abrio: no contradecir con DENEGAR, guardar la
+            # transicion en el spool para aplicarla cuando la BD vuelva
+            spool.encolar(spool.TIPO_PUERTA, {
+                'id_acceso': id_acceso,
+                'id_pasajero': id_pasajero,
+                'puerta': solicitud['puerta'],
+                'fecha_hora': fecha_apertura
+            })
+        else:
+            # Denegar acceso si hay error
+            responder_puerta(solicitud, "DENEGAR")
+        
+    finally:
+        # Cerrar cursor y conexión
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+            print("[DEBUG] Conexión a BD cerrada\n")
+
+def registrar_peso_equipaje(peso_kg, bascula=pesaje.BASCULA_DEFAULT, fecha_hora=None,
+                            duracion_s=None, muestras=None):
+    """
+    MODULO 2: Registrar peso recibido de ESP8266 Bascula
+    Si la BD no esta disponible el peso se guarda en el spool local
+    
+    Args:
+        peso_kg: Peso (asentado, si viene de pesaje.py)
+        bascula: Id de la bascula
+        fecha_hora: Llegada de la maleta (default: ahora)
+        duracion_s: Segundos sobre la bascula (None en modo una fila por lectura)
+        muestras: Lecturas agrupadas en el evento
+    """
+    fecha_hora = fecha_hora or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    registrar_pesos([{
+        'peso_kg': peso_kg,
+        'bascula': bascula,
+        'fecha_hora': fecha_hora,
+        'duracion_s': duracion_s,
+        'muestras': muestras,
+        'id_evento': clave_peso(bascula, 'manual', fecha_hora, duracion_s, muestras, peso_kg)
+    }])
+
+def registrar_pesos(filas):
+    """
+    MODULO 2: Insertar uno o varios pesos en una sola operacion
+    Si la BD no esta disponible las filas se guardan en el spool local
+    
+    Args:
+        filas: Lista de dicts {peso_kg, bascula, fecha_hora, duracion_s, muestras, id_evento}
+    """
+    # Estadisticas en memoria: no dependen de que la BD este disponible
+    for fila in filas:
+        estadisticas_bascula.registrar(fila['bascula'], fila['peso_kg'])
+    
+    conn = get_db_connection()
+    if not conn:
+        print("[ERROR] No se pudo conectar a la base de datos")
+        for fila in filas:
+            spool.encolar(spool.TIPO_PESO, fila, id_evento=fila['id_evento'])
+        return
+    
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        nuevas = reclamar_eventos_peso(cursor, filas)
+        if nuevas:
+            cursor.executemany(SQL_INSERTAR_PESO, [valores_peso(f) for f in nuevas])
+        
+        conn.commit()
+        if len(nuevas) < len(filas):
+            print(f"[INFO] {len(filas) - len(nuevas)} pesos ya registrados (duplicados) - ignorados")
+        filas = nuevas
+        if not filas:
+            return
+        if len(filas) == 1:
+            print(f"[OK] Peso {filas[0]['peso_kg']:.2f} kg registrado en BD")
+        else:
+            print(f"[OK] {len(filas)} pesos registrados en BD")
+        
+        # Mostrar advertencia si hay sobrepeso
+        for fila in filas:
+            if fila['peso_kg'] > 2.0:
+                print(f"[WARNING] SOBREPESO detectado: {fila['peso_kg']:.2f} kg (límite: 2 kg)")
+        
+    except spool.ERRORES_CONEXION as e:
+        print(f"[ERROR] Conexion perdida registrando peso: {e}")
+        for fila in filas:
+            spool.encolar(spool.TIPO_PESO, fila, id_evento=fila['id_evento'])
+    except Exception as e:
+        print(f"[ERROR] Error registrando peso: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        conn.close()
+
+mqtt_client.on_connect = on_connect
+mqtt_client.on_disconnect = on_disconnect
+mqtt_client.on_message = perfilado.instrumentar_mqtt(on_message)
+
+# ========================================
+# INICIAR MQTT CON MANEJO DE ERRORES
+# ========================================
+
+def iniciar_gateway():
+    """
+    Conectar al broker MQTT y arrancar el loop en segundo plano
+
+    Returns:
+        bool: True si se inicio la conexion, False si MQTT no esta disponible
+    """
+    global mqtt_conectado
+    
+    # Reenviar lo que quedo en el spool aunque MQTT no conecte
+    spool.iniciar_reproductor()
+    
+    # Cerrar maletas retiradas (la bascula deja de publicar al vaciarse)
+    if PESAJE_POR_MALETA:
+        pesaje.iniciar_vigilancia(registrar_maleta)
+    
+    try:
+        print(f"[INFO] Conectando a MQTT: {MQTT_BROKER}:{MQTT_PORT}")
+        mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
+        mqtt_client.loop_start()
+        print("[OK] MQTT habilitado para Modulos 2 y 3")
+        return True
+    except Exception as e:
+        print(f"[WARNING] MQTT no disponible: {e}")
+        print("[INFO] Modulos 2 y 3 no estaran operativos")
+        mqtt_conectado = False
+        return False
+
+def gateway_activo():
+    """Modulo que implementa el gateway segun SMARTPORT_GATEWAY_MODO"""
+    if GATEWAY_MODO == 'async':
+        import gateway_async
+        return gateway_async
+    return sys.modules[__name__]
+
+def detener_gateway():
+    """Detener el loop MQTT y desconectar del broker"""
+    try:
+        mqtt_client.loop_stop()
+        mqtt_client.disconnect()
+    except Exception as e:
+        print(f"[WARNING] Error deteniendo MQTT: {e}")
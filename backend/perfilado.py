@@ -0,0 +1,418 @@
+"""
+perfilado.py - Perfilado bajo demanda de rutas Flask y handlers MQTT
+SmartPort v2.0
+
+Desactivado no cuesta mas que leer una variable por solicitud. Un admin
+lo activa por unos minutos (POST /api/admin/perfilado) y, mientras dura:
+
+- Solo se perfila una fraccion TASA de las llamadas, para poder usarlo
+  con la puerta en produccion
+- Opcionalmente solo ciertas rutas (endpoint Flask o prefijo de ruta /
+  topic MQTT)
+- Cada llamada perfilada se guarda como un archivo en PERFILES_DIR:
+    pstats     -> <hora>-<nombre>-<ms>ms.prof  (cProfile, abrir con pstats/snakeviz)
+    speedscope -> <hora>-<nombre>-<ms>ms.speedscope.json (perfil por eventos,
+                  abrir en https://www.speedscope.app)
+- El directorio rota: se conservan los MAX_ARCHIVOS mas recientes
+
+En el gateway asyncio (gateway_async.py) el perfilador es por thread y
+el event loop intercala las tareas de varios mensajes, asi que no basta
+con activarlo alrededor de la llamada: instrumentar_mqtt_async() lo activa
+solo durante los pasos de la corrutina del mensaje (entre dos await) y
+de las tareas que lance (continuar_async), y lo apaga mientras el loop
+atiende a otros mensajes.
+"""
+
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+PERFILES_DIR = os.environ.get(
+    "SMARTPORT_PERFILES_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "perfiles")
+)
+MAX_ARCHIVOS = int(os.environ.get("SMARTPORT_PERFILES_MAX", "200"))
+DURACION_MAX = 30 * 60  # Segundos: nunca queda activado indefinidamente
+FORMATOS = ('pstats', 'speedscope')
+
+_lock = threading.Lock()
+_local = threading.local()  # Evita perfilar llamadas anidadas en el mismo thread
+_config = None  # dict(tasa, hasta, rutas, formato) mientras esta activo
+# Perfil async en curso; las tareas creadas durante el mensaje lo heredan
+_perfil_async = contextvars.ContextVar('perfil_async', default=None)
+
+metricas = {
+    'llamadas': 0,
+    'perfiladas': 0,
+    'errores': 0
+}
+
+# ========================================
+# ACTIVACION
+# ========================================
+
+def activar(tasa=0.1, duracion_s=300, rutas=None, formato='pstats'):
+    """
+    Activar el perfilado por un tiempo limitado
+
+    Args:
+        tasa: Fraccion de llamadas a perfilar (0-1]
+        duracion_s: Segundos hasta desactivarse solo (max DURACION_MAX)
+        rutas: Lista de endpoints, prefijos de ruta o de topic (None = todo)
+        formato: 'pstats' o 'speedscope'
+
+    Raises:
+        ValueError: Parametros fuera de rango
+    """
+    global _config
+
+    tasa = float(tasa)
+    duracion_s = float(duracion_s)
+    if not 0 < tasa <= 1:
+        raise ValueError("tasa debe estar en (0, 1]")
+    if not 0 < duracion_s <= DURACION_MAX:
+        raise ValueError(f"duracion_s debe estar en (0, {DURACION_MAX}]")
+    if formato not in FORMATOS:
+        raise ValueError(f"formato debe ser uno de {', '.join(FORMATOS)}")
+
+    with _lock:
+        _config = {
+            'tasa': tasa,
+            'hasta': time.time() + duracion_s,
+            'rutas': [str(r) for r in rutas] if rutas else None,
+            'formato': formato
+        }
+    print(f"[INFO] Perfilado activado: tasa {tasa}, {duracion_s:.0f}s, formato {formato}, "
+          f"rutas {_config['rutas'] or 'todas'}")
+
+def desactivar():
+    global _config
+    with _lock:
+        _config = None
+    print("[INFO] Perfilado desactivado")
+
+def _vigente():
+    """Configuracion activa o None (desactiva al vencer)"""
+    global _config
+    config = _config
+    if config is None:
+        return None
+    if time.time() >= config['hasta']:
+        with _lock:
+            _config = None
+        print("[INFO] Perfilado vencido - desactivado")
+        return None
+    return config
+
+def _seleccionada(config, nombres):
+    if config['rutas'] is None:
+        return True
+    return any(n and n.startswith(r) for r in config['rutas'] for n in nombres)
+
+# ========================================
+# PERFIL POR EVENTOS (SPEEDSCOPE)
+# ========================================
+
+class PerfilEventos:
+    """Registra entrada/salida de cada funcion con sys.setprofile"""
+
+    def __init__(self):
+        self.frames = []
+        self._indices = {}
+        self.eventos = []
+        self._pila = []
+        self.inicio = None
+
+    def _frame(self, clave, nombre, archivo, linea):
+        indice = self._indices.get(clave)
+        if indice is None:
+            indice = self._indices[clave] = len(self.frames)
+            self.frames.append({'name': nombre, 'file': archivo, 'line': linea})
+        return indice
+
+    def _rastrear(self, frame, evento, arg):
+        t = time.perf_counter() - self.inicio
+        if evento == 'call':
+            codigo = frame.f_code
+            indice = self._frame(codigo, codigo.co_name, codigo.co_filename, codigo.co_firstlineno)
+        elif evento == 'c_call':
+            nombre = f"{getattr(arg, '__module__', None) or ''}.{getattr(arg, '__qualname__', repr(arg))}"
+            indice = self._frame(('c', nombre), nombre, '<built-in>', 0)
+        else:
+            # return / c_return / c_exception: cerrar el ultimo abierto
+            if self._pila:
+                self.eventos.append({'type': 'C', 'frame': self._pila.pop(), 'at': t})
+            return
+        self._pila.append(indice)
+        self.eventos.append({'type': 'O', 'frame': indice, 'at': t})
+
+    def enable(self):
+        # Se puede reactivar (pasos de una corrutina): el tiempo sigue corriendo
+        if self.inicio is None:
+            self.inicio = time.perf_counter()
+        sys.setprofile(self._rastrear)
+
+    def disable(self):
+        sys.setprofile(None)
+        fin = time.perf_counter() - self.inicio
+        while self._pila:
+            self.eventos.append({'type': 'C', 'frame': self._pila.pop(), 'at': fin})
+        self.fin = fin
+
+    def guardar(self, ruta, nombre):
+        datos = {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': self.frames},
+            'profiles': [{
+                'type': 'evented',
+                'name': nombre,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': self.fin,
+                'events': self.eventos
+            }],
+            'exporter': 'smartport-perfilado'
+        }
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(datos, f)
+
+# ========================================
+# ARCHIVOS
+# ========================================
+
+def _guardar(perfil, formato, nombre, duracion):
+    os.makedirs(PERFILES_DIR, exist_ok=True)
+    limpio = re.sub(r'[^A-Za-z0-9_.-]+', '_', nombre).strip('_')[:60] or 'llamada'
+    base = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{limpio}-{duracion * 1000:.0f}ms"
+
+    if formato == 'speedscope':
+        perfil.guardar(os.path.join(PERFILES_DIR, base + '.speedscope.json'), nombre)
+    else:
+        perfil.dump_stats(os.path.join(PERFILES_DIR, base + '.prof'))
+    _rotar()
+
+def _rotar():
+    """Conservar solo los MAX_ARCHIVOS perfiles mas recientes"""
+    with _lock:
+        archivos = listar()
+        for archivo in archivos[MAX_ARCHIVOS:]:
+            try:
+                os.remove(os.path.join(PERFILES_DIR, archivo['archivo']))
+            except OSError:
+                pass
+
+def listar():
+    """
+    Perfiles guardados, del mas reciente al mas antiguo
+
+    Returns:
+        list: dicts {archivo, bytes, fecha}
+    """
+    if not os.path.isdir(PERFILES_DIR):
+        return []
+    archivos = []
+    for nombre in os.listdir(PERFILES_DIR):
+        if nombre.endswith(('.prof', '.speedscope.json')):
+            try:
+                info = os.stat(os.path.join(PERFILES_DIR, nombre))
+            except OSError:
+                continue  # Rotado por otro thread
+            archivos.append({'archivo': nombre, 'bytes': info.st_size, 'fecha': info.st_mtime})
+    archivos.sort(key=lambda a: a['fecha'], reverse=True)
+    return archivos
+
+# ========================================
+# INSTRUMENTACION
+# ========================================
+
+def ejecutar(nombre, funcion, *args, filtro=(), **kwargs):
+    """
+    Llamar a funcion perfilandola si el perfilado esta activo y le toca
+
+    Args:
+        nombre: Nombre del perfil (endpoint o topic)
+        funcion: Callable a ejecutar
+        filtro: Nombres extra para comparar con las rutas seleccionadas
+    """
+    config = _vigente()
+    if config is None or getattr(_local, 'activo', False):
+        return funcion(*args, **kwargs)
+
+    metricas['llamadas'] += 1
+    if not _seleccionada(config, (nombre,) + tuple(filtro)) or random.random() >= config['tasa']:
+        return funcion(*args, **kwargs)
+
+    perfil = PerfilEventos() if config['formato'] == 'speedscope' else cProfile.Profile()
+    _local.activo = True
+    inicio = time.perf_counter()
+    try:
+        perfil.enable()
+    except ValueError:
+        # Otro perfilador activo en el proceso (ej. un depurador)
+        _local.activo = False
+        return funcion(*args, **kwargs)
+
+    try:
+        return funcion(*args, **kwargs)
+    finally:
+        perfil.disable()
+        _local.activo = False
+        duracion = time.perf_counter() - inicio
+        try:
+            _guardar(perfil, config['formato'], nombre, duracion)
+            metricas['perfiladas'] += 1
+        except OSError as e:
+            metricas['errores'] += 1
+            print(f"[WARNING] No se pudo guardar perfil de {nombre}: {e}")
+
+class _PasosPerfilados:
+    """
+    Awaitable que ejecuta una corrutina paso a paso con el perfilador
+    activo solo dentro de cada paso (send/throw hasta el siguiente await)
+    """
+
+    def __init__(self, corrutina, perfil):
+        self.corrutina = corrutina
+        self.perfil = perfil
+
+    def __await__(self):
+        valor, error = None, None
+        while True:
+            try:
+                self.perfil.enable()
+                activo = True
+            except ValueError:
+                activo = False  # Otro perfilador activo: este paso sin perfil
+            _local.activo = True
+            try:
+                if error is not None:
+                    pendiente = self.corrutina.throw(error)
+                else:
+                    pendiente = self.corrutina.send(valor)
+            except StopIteration as fin:
+                return fin.value
+            finally:
+                _local.activo = False
+                if activo:
+                    self.perfil.disable()
+            try:
+                valor, error = (yield pendiente), None
+            except BaseException as e:  # Cancelacion incluida: se entrega a la corrutina
+                valor, error = None, e
+
+def _terminar_async(sesion):
+    """Guardar el perfil cuando terminan el mensaje y todas sus tareas"""
+    sesion['pendientes'] -= 1
+    if sesion['pendientes']:
+        return
+    duracion = time.perf_counter() - sesion['inicio']
+    try:
+        _guardar(sesion['perfil'], sesion['formato'], sesion['nombre'], duracion)
+        metricas['perfiladas'] += 1
+    except OSError as e:
+        metricas['errores'] += 1
+        print(f"[WARNING] No se pudo guardar perfil de {sesion['nombre']}: {e}")
+
+async def ejecutar_async(nombre, corrutina, filtro=()):
+    """
+    Equivalente de ejecutar() para una corrutina del event loop
+
+    El archivo se guarda cuando terminan la corrutina y las tareas que
+    lanzo con continuar_async(); la duracion es de reloj (incluye las
+    esperas), el perfil solo el tiempo de sus pasos.
+    """
+    config = _vigente()
+    if config is None or _perfil_async.get() is not None:
+        return await corrutina
+
+    metricas['llamadas'] += 1
+    if not _seleccionada(config, (nombre,) + tuple(filtro)) or random.random() >= config['tasa']:
+        return await corrutina
+
+    sesion = {
+        'perfil': PerfilEventos() if config['formato'] == 'speedscope' else cProfile.Profile(),
+        'formato': config['formato'],
+        'nombre': nombre,
+        'inicio': time.perf_counter(),
+        'pendientes': 1
+    }
+    token = _perfil_async.set(sesion)
+    try:
+        return await _PasosPerfilados(corrutina, sesion['perfil'])
+    finally:
+        _perfil_async.reset(token)
+        _terminar_async(sesion)
+
+def continuar_async(corrutina):
+    """
+    Vincular al perfil del mensaje en curso (si lo hay) una corrutina que
+    se va a lanzar como tarea
+
+    Se llama al crear la tarea, no al arrancarla: el perfil no se guarda
+    mientras queden tareas del mensaje por ejecutar.
+
+    Returns:
+        La misma corrutina, o una que la ejecuta dentro del perfil
+    """
+    sesion = _perfil_async.get()
+    if sesion is None:
+        return corrutina
+    sesion['pendientes'] += 1
+    return _continuar_async(corrutina, sesion)
+
+async def _continuar_async(corrutina, sesion):
+    try:
+        return await _PasosPerfilados(corrutina, sesion['perfil'])
+    finally:
+        _terminar_async(sesion)
+
+def instrumentar_app(app):
+    """Envolver las vistas registradas de la app Flask (salvo las de diagnostico)"""
+    from flask import request
+
+    def envolver(endpoint, vista):
+        @functools.wraps(vista)
+        def vista_perfilada(*args, **kwargs):
+            return ejecutar(endpoint, vista, *args, filtro=(request.path,), **kwargs)
+        return vista_perfilada
+
+    for endpoint, vista in list(app.view_functions.items()):
+        if endpoint != 'static' and not endpoint.startswith('diagnostico.'):
+            app.view_functions[endpoint] = envolver(endpoint, vista)
+
+def instrumentar_mqtt(on_message):
+    """Envolver un callback on_message de paho (el nombre del perfil es el topic)"""
+    @functools.wraps(on_message)
+    def on_message_perfilado(client, userdata, msg):
+        return ejecutar(f"mqtt:{msg.topic}", on_message, client, userdata, msg,
+                        filtro=(msg.topic,))
+    return on_message_perfilado
+
+def instrumentar_mqtt_async(despachar):
+    """Envolver el despacho async (topic, payload) del gateway asyncio"""
+    @functools.wraps(despachar)
+    async def despachar_perfilado(topic, payload):
+        return await ejecutar_async(f"mqtt:{topic}", despachar(topic, payload), filtro=(topic,))
+    return despachar_perfilado
+
+def estado():
+    """Configuracion vigente y contadores"""
+    config = _vigente()
+    return {
+        'activo': config is not None,
+        'tasa': config['tasa'] if config else None,
+        'restante_s': round(config['hasta'] - time.time(), 1) if config else None,
+        'rutas': config['rutas'] if config else None,
+        'formato': config['formato'] if config else None,
+        'directorio': PERFILES_DIR,
+        'max_archivos': MAX_ARCHIVOS,
+        **metricas
+    }
@@ -0,0 +1,124 @@
+"""
+perfiles_rostro.py - Perfiles del pipeline facial (deteccion + codificacion)
+SmartPort v2.0
+
+Cada kiosko elige cuanto tiempo gasta por rostro con SMARTPORT_PERFIL_ROSTRO:
+
+    rapido      deteccion HOG sobre el frame a la mitad y sin upsample,
+                landmarks de 5 puntos, 1 jitter
+    balanceado  deteccion a resolucion completa con 1 upsample, landmarks
+                de 5 puntos, 1 jitter (los defaults de face_recognition:
+                lo que se hacia antes, default)
+    preciso     como balanceado pero con landmarks de 68 puntos y
+                promediando JITTERS_PRECISO recortes aleatorios por rostro
+                (mas estable, ~N veces mas lento)
+
+Tambien se aceptan los nombres fast / balanced / accurate.
+
+Los tres usan la misma red ResNet de dlib (embedding de 128 dimensiones),
+asi que las plantillas registradas con un perfil se comparan con las de
+otro; solo cambia la alineacion y la estabilidad del vector. Para elegir
+el perfil mas barato que mantiene la tasa de falsos rechazos, ver
+benchmark_rostro.py.
+"""
+
+import os
+
+import cv2
+import face_recognition
+
+JITTERS_PRECISO = int(os.environ.get("SMARTPORT_JITTERS_PRECISO", "5"))
+
+PERFILES = {
+    'rapido': {
+        'escala_deteccion': 0.5,
+        'upsample': 0,
+        'modelo_landmarks': 'small',
+        'num_jitters': 1
+    },
+    'balanceado': {
+        'escala_deteccion': 1.0,
+        'upsample': 1,
+        'modelo_landmarks': 'small',
+        'num_jitters': 1
+    },
+    'preciso': {
+        'escala_deteccion': 1.0,
+        'upsample': 1,
+        'modelo_landmarks': 'large',
+        'num_jitters': JITTERS_PRECISO
+    },
+}
+
+ALIAS = {
+    'fast': 'rapido',
+    'balanced': 'balanceado',
+    'accurate': 'preciso',
+}
+
+def nombre_perfil(nombre):
+    """
+    Nombre canonico de un perfil
+
+    Raises:
+        ValueError: Perfil desconocido
+    """
+    nombre = ALIAS.get(str(nombre).lower(), str(nombre).lower())
+    if nombre not in PERFILES:
+        raise ValueError(f"Perfil facial invalido: {nombre} (opciones: {', '.join(PERFILES)})")
+    return nombre
+
+PERFIL_ROSTRO = nombre_perfil(os.environ.get("SMARTPORT_PERFIL_ROSTRO", "balanceado"))
+
+def obtener_perfil(nombre=None):
+    """
+    Parametros de un perfil
+
+    Args:
+        nombre: Nombre o alias (None = el del kiosko, SMARTPORT_PERFIL_ROSTRO)
+
+    Returns:
+        dict: escala_deteccion, upsample, modelo_landmarks, num_jitters y nombre
+    """
+    nombre = nombre_perfil(nombre) if nombre else PERFIL_ROSTRO
+    return dict(PERFILES[nombre], nombre=nombre)
+
+def ubicar_rostros(rgb, perfil=None):
+    """
+    face_locations con la escala y el upsample del perfil
+
+    Args:
+        rgb: Frame RGB (alto, ancho, 3)
+        perfil: dict de obtener_perfil() (None = el del kiosko)
+
+    Returns:
+        list: Cajas (top, right, bottom, left) en coordenadas del frame original
+    """
+    perfil = perfil or obtener_perfil()
+    escala = perfil['escala_deteccion']
+
+    if escala == 1.0:
+        return face_recognition.face_locations(rgb, number_of_times_to_upsample=perfil['upsample'])
+
+    reducido = cv2.resize(rgb, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    cajas = face_recognition.face_locations(reducido, number_of_times_to_upsample=perfil['upsample'])
+    return [tuple(int(round(v / escala)) for v in caja) for caja in cajas]
+
+def codificar_rostros(rgb, cajas, perfil=None):
+    """
+    face_encodings con el modelo de landmarks y los jitters del perfil
+
+    Args:
+        rgb: Frame RGB
+        cajas: Ubicaciones (top, right, bottom, left) ya conocidas
+        perfil: dict de obtener_perfil() (None = el del kiosko)
+
+    Returns:
+        list: Embeddings (128,) float64, uno por caja
+    """
+    perfil = perfil or obtener_perfil()
+    return face_recognition.face_encodings(
+        rgb, cajas,
+        num_jitters=perfil['num_jitters'],
+        model=perfil['modelo_landmarks']
+    )
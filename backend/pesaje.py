@@ -0,0 +1,249 @@
+"""
+pesaje.py - Deteccion de maletas a partir de las lecturas de la bascula (Modulo 2)
+SmartPort v2.0
+
+El ESP8266 de la bascula republica el peso mientras la maleta sigue
+encima y no publica nada cuando esta vacia (< 0.1 kg). Guardar cada
+lectura llena pesos_equipaje de filas casi iguales y sesga los conteos
+y promedios del dashboard.
+
+Aqui cada bascula tiene una maquina de estados:
+
+    VACIA --lectura >= UMBRAL_PRESENCIA--> CON MALETA
+    CON MALETA --lectura dentro de TOLERANCIA_KG--> (misma maleta, asentando)
+    CON MALETA --peso distinto tras asentarse--> cierra maleta, abre otra
+    CON MALETA --lectura < UMBRAL_PRESENCIA o SILENCIO_RETIRO sin lecturas--> VACIA
+
+Al cerrar se emite UN evento por maleta: peso asentado (promedio de la
+ultima racha estable), hora de llegada, segundos sobre la bascula y
+numero de lecturas.
+
+Opcionalmente (SMARTPORT_MUESTRAS_CRUDAS=1) cada lectura se agrega a un
+archivo binario diario de 13 bytes por muestra en MUESTRAS_DIR.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+UMBRAL_PRESENCIA = 0.100  # Mismo limite_bajo del firmware
+TOLERANCIA_KG = float(os.environ.get("SMARTPORT_PESAJE_TOLERANCIA", "0.05"))
+MUESTRAS_ESTABLES = 2  # Lecturas seguidas dentro de tolerancia para considerar asentado
+SILENCIO_RETIRO = float(os.environ.get("SMARTPORT_PESAJE_SILENCIO", "15"))
+BASCULA_DEFAULT = "principal"
+
+MUESTRAS_CRUDAS = os.environ.get("SMARTPORT_MUESTRAS_CRUDAS", "0") == "1"
+MUESTRAS_DIR = os.environ.get(
+    "SMARTPORT_MUESTRAS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "muestras")
+)
+# t (epoch), peso (kg, NaN si el payload era invalido), valido
+DTYPE_MUESTRA = np.dtype([('t', '<f8'), ('peso', '<f4'), ('valido', 'u1')])
+
+_lock = threading.Lock()
+_basculas = {}
+
+# ========================================
+# MAQUINA DE ESTADOS POR BASCULA
+# ========================================
+
+class DetectorBascula:
+    """
+    Agrupa lecturas consecutivas de una bascula en eventos de maleta
+
+    Args:
+        bascula: Id de la bascula
+    """
+
+    def __init__(self, bascula):
+        self.bascula = bascula
+        self.maleta = None
+        self.metricas = {
+            'lecturas': 0,
+            'invalidas': 0,
+            'eventos': 0,
+            'ultima_lectura': None
+        }
+
+    def _abrir(self, peso, t):
+        self.maleta = {'inicio': t, 'ultimo': t, 'muestras': 1, 'racha': [peso]}
+
+    def _cerrar(self, fin):
+        """Evento de la maleta actual (la bascula queda vacia)"""
+        maleta, self.maleta = self.maleta, None
+        racha = maleta['racha']
+        self.metricas['eventos'] += 1
+        return {
+            'bascula': self.bascula,
+            'peso_kg': round(sum(racha) / len(racha), 3),
+            'fecha_hora': datetime.fromtimestamp(maleta['inicio']).strftime('%Y-%m-%d %H:%M:%S'),
+            'duracion_s': round(max(fin - maleta['inicio'], 0.0), 1),
+            'muestras': maleta['muestras'],
+            'asentada': len(racha) >= MUESTRAS_ESTABLES
+        }
+
+    def lectura(self, peso, t):
+        """
+        Procesar una lectura valida
+
+        Args:
+            peso: kg
+            t: epoch de llegada
+
+        Returns:
+            list: Eventos de maleta cerrados por esta lectura (0, 1 o 2)
+        """
+        self.metricas['lecturas'] += 1
+        self.metricas['ultima_lectura'] = t
+        eventos = []
+
+        # Silencio largo: la maleta anterior se retiro sin aviso
+        if self.maleta and t - self.maleta['ultimo'] > SILENCIO_RETIRO:
+            eventos.append(self._cerrar(self.maleta['ultimo']))
+
+        if peso < UMBRAL_PRESENCIA:
+            if self.maleta:
+                eventos.append(self._cerrar(t))
+            return eventos
+
+        if self.maleta is None:
+            self._abrir(peso, t)
+            return eventos
+
+        racha = self.maleta['racha']
+        referencia = sum(racha) / len(racha)
+
+        if abs(peso - referencia) <= TOLERANCIA_KG:
+            racha.append(peso)
+        elif len(racha) >= MUESTRAS_ESTABLES:
+            # Ya estaba asentada y cambio el peso: cambiaron de maleta sin vaciar
+            eventos.append(self._cerrar(t))
+            self._abrir(peso, t)
+            return eventos
+        else:
+            # Aun asentando (maleta moviendose): empezar una nueva racha
+            self.maleta['racha'] = [peso]
+
+        self.maleta['ultimo'] = t
+        self.maleta['muestras'] += 1
+        return eventos
+
+    def revisar(self, t):
+        """Cerrar la maleta si la bascula lleva SILENCIO_RETIRO sin publicar"""
+        if self.maleta and t - self.maleta['ultimo'] > SILENCIO_RETIRO:
+            return [self._cerrar(self.maleta['ultimo'])]
+        return []
+
+    def estado(self):
+        maleta = self.maleta
+        return {
+            'estado': 'CON_MALETA' if maleta else 'VACIA',
+            'peso_actual': round(sum(maleta['racha']) / len(maleta['racha']), 3) if maleta else None,
+            **self.metricas
+        }
+
+def _detector(bascula):
+    detector = _basculas.get(bascula)
+    if detector is None:
+        detector = _basculas[bascula] = DetectorBascula(bascula)
+    return detector
+
+# ========================================
+# MUESTRAS CRUDAS (OPCIONAL)
+# ========================================
+
+def _guardar_muestra(bascula, t, peso, valido):
+    """Agregar una muestra de 13 bytes al archivo diario de la bascula"""
+    os.makedirs(MUESTRAS_DIR, exist_ok=True)
+    dia = datetime.fromtimestamp(t).strftime('%Y%m%d')
+    ruta = os.path.join(MUESTRAS_DIR, f"{bascula}-{dia}.bin")
+    registro = np.array([(t, peso, 1 if valido else 0)], dtype=DTYPE_MUESTRA)
+    with open(ruta, 'ab') as f:
+        f.write(registro.tobytes())
+
+def leer_muestras(ruta):
+    """
+    Cargar un archivo de muestras crudas
+
+    Returns:
+        np.ndarray: Arreglo estructurado (t, peso, valido)
+    """
+    return np.fromfile(ruta, dtype=DTYPE_MUESTRA)
+
+# ========================================
+# API DEL GATEWAY
+# ========================================
+
+def procesar_lectura(peso, bascula=BASCULA_DEFAULT, t=None):
+    """
+    Entregar una lectura de la bascula al detector
+
+    Args:
+        peso: kg (float) o None si el payload no se pudo interpretar
+        bascula: Id de la bascula
+        t: epoch de llegada (default: ahora)
+
+    Returns:
+        list: Eventos de maleta listos para guardar
+    """
+    t = time.time() if t is None else t
+
+    with _lock:
+        detector = _detector(bascula)
+        if peso is None:
+            # Payload invalido: no es una maleta, solo se cuenta
+            detector.metricas['invalidas'] += 1
+            eventos = []
+        else:
+            eventos = detector.lectura(peso, t)
+
+    if MUESTRAS_CRUDAS:
+        try:
+            _guardar_muestra(bascula, t, np.nan if peso is None else peso, peso is not None)
+        except OSError as e:
+            print(f"[WARNING] No se pudo guardar muestra cruda: {e}")
+
+    return eventos
+
+def revisar_basculas(t=None):
+    """
+    Cerrar maletas de basculas que dejaron de publicar
+
+    Returns:
+        list: Eventos de maleta listos para guardar
+    """
+    t = time.time() if t is None else t
+    with _lock:
+        eventos = []
+        for detector in _basculas.values():
+            eventos.extend(detector.revisar(t))
+        return eventos
+
+def estado():
+    """Estado y contadores por bascula"""
+    with _lock:
+        return {b: d.estado() for b, d in _basculas.items()}
+
+def iniciar_vigilancia(emitir, intervalo=1.0):
+    """
+    Thread que cierra por silencio las maletas retiradas
+
+    Args:
+        emitir: Funcion que recibe cada evento de maleta
+        intervalo: Segundos entre revisiones
+    """
+    def vigilar():
+        while True:
+            try:
+                for evento in revisar_basculas():
+                    emitir(evento)
+            except Exception as e:
+                print(f"[ERROR] Error revisando basculas: {e}")
+            time.sleep(intervalo)
+
+    thread = threading.Thread(target=vigilar, daemon=True, name='pesaje')
+    thread.start()
+    return thread
@@ -0,0 +1,53 @@
+"""
+recursos.py - Conteo de recursos abiertos del proceso (diagnostico)
+SmartPort v2.0
+
+- Camaras: abrir_camara()/cerrar_camara() de dispositivos.py
+- Conexiones MySQL: las creadas por db.get_db_connection(); se siguen con
+  referencias debiles, asi que una conexion que nadie cerro pero ya no
+  se usa sigue contando como abierta hasta que el GC la recoja
+"""
+
+import threading
+import weakref
+
+_lock = threading.Lock()
+_conexiones = weakref.WeakSet()
+
+metricas = {
+    'camaras_abiertas': 0,
+    'camaras_aperturas': 0,
+    'conexiones_creadas': 0
+}
+
+def camara_abierta():
+    with _lock:
+        metricas['camaras_abiertas'] += 1
+        metricas['camaras_aperturas'] += 1
+
+def camara_cerrada():
+    with _lock:
+        metricas['camaras_abiertas'] -= 1
+
+def registrar_conexion(conn):
+    """Seguir una conexion pymysql recien creada"""
+    with _lock:
+        _conexiones.add(conn)
+        metricas['conexiones_creadas'] += 1
+    return conn
+
+def estado():
+    """
+    Recursos abiertos en este momento
+
+    Returns:
+        dict: camaras y conexiones (vivas = objetos sin recolectar,
+            abiertas = vivas con el socket aun abierto)
+    """
+    with _lock:
+        vivas = list(_conexiones)
+        return {
+            'conexiones_vivas': len(vivas),
+            'conexiones_abiertas': sum(1 for c in vivas if getattr(c, 'open', False)),
+            **metricas
+        }
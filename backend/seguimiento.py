@@ -0,0 +1,228 @@
+"""
+seguimiento.py - Deteccion + seguimiento de rostro entre frames (Modulo 1)
+SmartPort v2.0
+
+face_recognition.face_locations (HOG de dlib sobre el frame completo) es
+la parte mas cara de cada frame. Aqui se detecta una vez y despues se
+sigue la caja del rostro con un tracker de OpenCV (KCF o MOSSE, si el
+build los trae) o, en su defecto, con template matching en una ventana
+alrededor de la ultima posicion.
+
+- La deteccion se repite solo si se pierde el rostro o cada
+  REDETECTAR_CADA frames (para corregir deriva del tracker)
+- El embedding se calcula una sola vez por track, cuando la caja lleva
+  FRAMES_ESTABLES frames sin moverse mas de MOVIMIENTO_MAX
+- Deteccion y codificacion usan el perfil del kiosko (perfiles_rostro.py)
+"""
+
+import os
+
+import cv2
+
+from perfiles_rostro import obtener_perfil, ubicar_rostros, codificar_rostros
+
+REDETECTAR_CADA = int(os.environ.get("SMARTPORT_REDETECTAR_CADA", "15"))
+FRAMES_ESTABLES = int(os.environ.get("SMARTPORT_FRAMES_ESTABLES", "3"))
+
+# Desplazamiento maximo del centro entre frames, como fraccion del ancho de la caja
+MOVIMIENTO_MAX = 0.15
+# Correlacion minima del template matching para seguir considerando el rostro
+UMBRAL_PLANTILLA = 0.6
+# Solapamiento minimo para que una nueva deteccion continue el mismo track
+IOU_MISMO_TRACK = 0.3
+
+def _crear_tracker():
+    """
+    Tracker de OpenCV disponible en este build (None si no hay ninguno)
+
+    KCF y MOSSE vienen en opencv-contrib; segun la version estan en
+    cv2 o en cv2.legacy.
+    """
+    for nombre in ('TrackerKCF_create', 'TrackerMOSSE_create'):
+        for modulo in (cv2, getattr(cv2, 'legacy', None)):
+            fabrica = getattr(modulo, nombre, None) if modulo is not None else None
+            if fabrica is not None:
+                return fabrica()
+    return None
+
+def _a_rectangulo(caja):
+    """(top, right, bottom, left) de face_recognition -> (x, y, w, h) de OpenCV"""
+    top, right, bottom, left = caja
+    return (left, top, right - left, bottom - top)
+
+def _a_caja(rectangulo):
+    """(x, y, w, h) de OpenCV -> (top, right, bottom, left)"""
+    x, y, w, h = (int(round(v)) for v in rectangulo)
+    return (y, x + w, y + h, x)
+
+def _area(caja):
+    top, right, bottom, left = caja
+    return max(0, right - left) * max(0, bottom - top)
+
+def _iou(a, b):
+    """Interseccion sobre union de dos cajas (top, right, bottom, left)"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    interseccion = max(0, right - left) * max(0, bottom - top)
+    union = _area(a) + _area(b) - interseccion
+    return interseccion / union if union else 0.0
+
+class SeguidorRostro:
+    """
+    Sigue el rostro principal (el mas grande) a lo largo de los frames
+
+    Args:
+        redetectar_cada: Frames seguidos con tracker antes de volver a detectar
+        frames_estables: Frames quietos necesarios para calcular el embedding
+        perfil: Perfil facial (None = SMARTPORT_PERFIL_ROSTRO)
+    """
+
+    def __init__(self, redetectar_cada=REDETECTAR_CADA, frames_estables=FRAMES_ESTABLES, perfil=None):
+        self.redetectar_cada = redetectar_cada
+        self.frames_estables = frames_estables
+        self.perfil = obtener_perfil(perfil)
+        self.metricas = {
+            'frames': 0,
+            'detecciones': 0,
+            'seguimientos': 0,
+            'perdidas': 0,
+            'codificaciones': 0
+        }
+        self.id_track = 0
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.caja = None
+        self.tracker = None
+        self.plantilla = None
+        self.estables = 0
+        self.codificado = False
+        self.frames_desde_deteccion = 0
+
+    # ========================================
+    # DETECCION
+    # ========================================
+
+    def _detectar(self, frame, rgb):
+        self.metricas['detecciones'] += 1
+        ubicaciones = ubicar_rostros(rgb, self.perfil)
+        if not ubicaciones:
+            self._reiniciar()
+            return None
+
+        caja = max(ubicaciones, key=_area)
+
+        if self.caja is None or _iou(self.caja, caja) < IOU_MISMO_TRACK:
+            # Rostro nuevo (o el anterior se perdio): nuevo track
+            self._reiniciar()
+            self.id_track += 1
+
+        self.frames_desde_deteccion = 0
+        self.tracker = _crear_tracker()
+        if self.tracker is not None:
+            self.tracker.init(frame, _a_rectangulo(caja))
+        else:
+            gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            top, right, bottom, left = caja
+            self.plantilla = gris[max(top, 0):bottom, max(left, 0):right].copy()
+        return caja
+
+    # ========================================
+    # SEGUIMIENTO
+    # ========================================
+
+    def _seguir_plantilla(self, frame):
+        """Buscar la plantilla en una ventana alrededor de la ultima caja"""
+        if self.plantilla is None or self.plantilla.size == 0:
+            return None
+
+        gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        alto, ancho = self.plantilla.shape
+        top, right, bottom, left = self.caja
+        margen_x, margen_y = ancho // 2, alto // 2
+
+        y0, x0 = max(top - margen_y, 0), max(left - margen_x, 0)
+        ventana = gris[y0:min(bottom + margen_y, gris.shape[0]),
+                       x0:min(right + margen_x, gris.shape[1])]
+        if ventana.shape[0] < alto or ventana.shape[1] < ancho:
+            return None
+
+        resultado = cv2.matchTemplate(ventana, self.plantilla, cv2.TM_CCOEFF_NORMED)
+        _, maximo, _, (x, y) = cv2.minMaxLoc(resultado)
+        if maximo < UMBRAL_PLANTILLA:
+            return None
+        return (y0 + y, x0 + x + ancho, y0 + y + alto, x0 + x)
+
+    def _seguir(self, frame):
+        self.metricas['seguimientos'] += 1
+        if self.tracker is not None:
+            ok, rectangulo = self.tracker.update(frame)
+            return _a_caja(rectangulo) if ok else None
+        return self._seguir_plantilla(frame)
+
+    # ========================================
+    # FRAME A FRAME
+    # ========================================
+
+    def procesar(self, frame):
+        """
+        Actualizar el seguimiento con un frame BGR de la camara
+
+        Args:
+            frame: Frame de cv2.VideoCapture.read()
+
+        Returns:
+            dict: {caja, id_track, estable, embedding}; caja es None si no
+                hay rostro y embedding solo viene la primera vez que el
+                track se estabiliza
+        """
+        self.metricas['frames'] += 1
+        rgb = None
+        anterior = self.caja
+
+        caja = None
+        if self.caja is not None and self.frames_desde_deteccion < self.redetectar_cada:
+            caja = self._seguir(frame)
+            if caja is None:
+                self.metricas['perdidas'] += 1
+            self.frames_desde_deteccion += 1
+
+        if caja is None:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            caja = self._detectar(frame, rgb)
+            if self.caja is None:
+                anterior = None  # Track nuevo: no hay posicion previa con que comparar
+
+        if caja is None:
+            return {'caja': None, 'id_track': None, 'estable': False, 'embedding': None}
+
+        # El tracker puede devolver cajas parcialmente fuera del frame
+        alto, ancho = frame.shape[:2]
+        caja = (max(caja[0], 0), min(caja[1], ancho), min(caja[2], alto), max(caja[3], 0))
+
+        # Estabilidad: el centro apenas se movio respecto al frame anterior
+        if anterior is not None:
+            dx = (caja[1] + caja[3] - anterior[1] - anterior[3]) / 2.0
+            dy = (caja[0] + caja[2] - anterior[0] - anterior[2]) / 2.0
+            limite = MOVIMIENTO_MAX * max(caja[1] - caja[3], 1)
+            self.estables = self.estables + 1 if (dx * dx + dy * dy) ** 0.5 <= limite else 0
+        self.caja = caja
+
+        embedding = None
+        estable = self.estables >= self.frames_estables
+        if estable and not self.codificado:
+            if rgb is None:
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # Ubicacion conocida: face_encodings no vuelve a detectar
+            encodings = codificar_rostros(rgb, [caja], self.perfil)
+            if encodings:
+                embedding = encodings[0]
+                self.codificado = True
+                self.metricas['codificaciones'] += 1
+
+        return {
+            'caja': caja,
+            'id_track': self.id_track,
+            'estable': estable,
+            'embedding': embedding
+        }
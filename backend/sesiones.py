@@ -0,0 +1,137 @@
+"""
+sesiones.py - Sesiones de verificacion del kiosko (PASO 1 -> PASO 2)
+SmartPort v2.0
+
+validar-rfid ya carga el pasajero y deserializa su embedding; aqui se
+guarda ese resultado unos segundos, por id_pasajero, para que
+verificar-rostro lo reutilice sin volver a consultar MySQL.
+
+Cada sesion puede llevar una AdquisicionRostro arrancada al validar la
+tarjeta: la camara se calienta (y empieza a buscar rostro) mientras el
+frontend muestra "mire a la camara". Solo hay una camara, asi que abrir
+una sesion nueva detiene la adquisicion de las anteriores y espera a que
+liberen la camara (AdquisicionRostro.detener) antes de arrancar la suya.
+"""
+
+import os
+import threading
+import time
+
+TTL_SEGUNDOS = float(os.environ.get("SMARTPORT_SESION_TTL", "60"))
+
+_lock = threading.Lock()
+_camara_lock = threading.Lock()  # Serializa "liberar la camara y abrirla de nuevo"
+_sesiones = {}  # id_pasajero -> (expira, sesion)
+
+metricas = {
+    'abiertas': 0,
+    'reutilizadas': 0,
+    'expiradas': 0
+}
+
+def _detener(sesion):
+    adquisicion = sesion.get('adquisicion')
+    if adquisicion is not None:
+        adquisicion.detener()
+
+def _purgar(ahora):
+    """Quitar sesiones vencidas; devuelve las retiradas para cerrarlas fuera del lock"""
+    vencidas = [i for i, (expira, _) in _sesiones.items() if expira <= ahora]
+    retiradas = [_sesiones.pop(i)[1] for i in vencidas]
+    metricas['expiradas'] += len(retiradas)
+    return retiradas
+
+def _retirar_adquisiciones():
+    """Quitar la adquisicion de cada sesion (llamar con _lock tomado)"""
+    camaras = []
+    for _, sesion in _sesiones.values():
+        if sesion['adquisicion'] is not None:
+            camaras.append(sesion['adquisicion'])
+            sesion['adquisicion'] = None
+    return camaras
+
+def abrir(pasajero, iniciar_adquisicion=None):
+    """
+    Guardar el pasajero validado en el PASO 1
+
+    La adquisicion nueva se crea despues de que las anteriores liberaron
+    la camara, nunca a la vez.
+
+    Args:
+        pasajero: dict de buscar_pasajero_por_rfid (embedding ya deserializado)
+        iniciar_adquisicion: Funcion que arranca y devuelve una
+            AdquisicionRostro para esta sesion, opcional
+
+    Returns:
+        float: Segundos de validez de la sesion
+    """
+    with _camara_lock:
+        with _lock:
+            vencidas = _purgar(time.time())
+            camaras = _retirar_adquisiciones()
+
+        for sesion in vencidas:
+            _detener(sesion)
+        for anterior in camaras:
+            anterior.detener()  # Vuelve cuando la camara ya esta libre
+
+        adquisicion = iniciar_adquisicion() if iniciar_adquisicion else None
+        with _lock:
+            _sesiones[int(pasajero['id_pasajero'])] = (time.time() + TTL_SEGUNDOS, {
+                'pasajero': pasajero,
+                'adquisicion': adquisicion
+            })
+            metricas['abiertas'] += 1
+    return TTL_SEGUNDOS
+
+def liberar_camara(iniciar_adquisicion=None):
+    """
+    Detener las adquisiciones de todas las sesiones (las sesiones siguen
+    vigentes; verificar-rostro capturara de nuevo si se usan)
+
+    Lo usa quien va a abrir la camara fuera de una sesion (usuario/acceso):
+    con iniciar_adquisicion la nueva captura arranca ya con la camara
+    libre y sin que una sesion abierta a la vez se la quite.
+
+    Args:
+        iniciar_adquisicion: Funcion que arranca y devuelve la captura propia
+
+    Returns:
+        tuple: (adquisiciones detenidas, adquisicion iniciada o None)
+    """
+    with _camara_lock:
+        with _lock:
+            camaras = _retirar_adquisiciones()
+
+        for adquisicion in camaras:
+            adquisicion.detener()
+        return len(camaras), iniciar_adquisicion() if iniciar_adquisicion else None
+
+def tomar(id_pasajero):
+    """
+    Retirar la sesion de un pasajero (un solo uso)
+
+    Args:
+        id_pasajero: ID enviado por el frontend en el PASO 2
+
+    Returns:
+        dict: {pasajero, adquisicion} o None si no hay sesion vigente
+    """
+    with _lock:
+        retiradas = _purgar(time.time())
+        entrada = _sesiones.pop(int(id_pasajero), None)
+        if entrada is not None:
+            metricas['reutilizadas'] += 1
+
+    for sesion in retiradas:
+        _detener(sesion)
+    return entrada[1] if entrada else None
+
+def estado():
+    """Sesiones abiertas y contadores"""
+    with _lock:
+        return {
+            'sesiones': len(_sesiones),
+            'ttl_segundos': TTL_SEGUNDOS,
+            **metricas
+        }
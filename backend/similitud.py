@@ -0,0 +1,128 @@
+"""
+similitud.py - Motor de similitud facial vectorizado
+SmartPort v2.0
+
+Compara lotes de embeddings (N,128) contra (M,128) en una sola pasada
+y devuelve matrices de distancia o de porcentaje de similitud.
+
+Metricas:
+- euclidiana: la de face_recognition (umbral 0.6)
+- coseno: 1 - cos(a, b)
+
+Entradas float32 C-contiguas se usan sin copiar; cualquier otra entrada
+(listas, float64 de face_recognition, vistas no contiguas) se convierte
+una sola vez.
+"""
+
+import numpy as np
+
+METRICAS = ('euclidiana', 'coseno')
+
+# En face_recognition, distancias euclidianas tipicas:
+#   0.0 - 0.4 = Excelente match (mismo usuario)
+#   0.4 - 0.6 = Match aceptable (mismo usuario)
+#   > 0.6 = No match (diferente usuario)
+UMBRAL_DISTANCIA = 0.6
+
+# Para vectores de norma ~1: d_coseno = d_euclidiana^2 / 2  ->  0.6^2 / 2
+UMBRALES = {
+    'euclidiana': UMBRAL_DISTANCIA,
+    'coseno': 0.18,
+}
+
+def como_matriz(embeddings):
+    """
+    Convertir uno o varios embeddings a matriz float32 C-contigua
+
+    Args:
+        embeddings: Array (128,), (N,128) o lista equivalente
+
+    Returns:
+        np.ndarray: Matriz (N,128) float32 (la misma si ya cumplia el formato)
+    """
+    matriz = np.asarray(embeddings, dtype=np.float32)
+
+    if matriz.ndim == 1:
+        matriz = matriz[np.newaxis, :]
+    elif matriz.ndim != 2:
+        raise ValueError(f"Se esperaba (N,D) o (D,), recibido {matriz.shape}")
+
+    if not matriz.flags.c_contiguous:
+        matriz = np.ascontiguousarray(matriz)
+
+    return matriz
+
+def matriz_distancias(consultas, plantillas, metrica='euclidiana'):
+    """
+    Calcular la matriz de distancias entre dos lotes de embeddings
+
+    Args:
+        consultas: Embeddings (N,128) capturados
+        plantillas: Embeddings (M,128) registrados
+        metrica: 'euclidiana' o 'coseno'
+
+    Returns:
+        np.ndarray: Matriz (N,M) float32 de distancias
+    """
+    if metrica not in METRICAS:
+        raise ValueError(f"Metrica invalida: {metrica} (opciones: {', '.join(METRICAS)})")
+
+    a = como_matriz(consultas)
+    b = como_matriz(plantillas)
+
+    if a.shape[1] != b.shape[1]:
+        raise ValueError(f"Dimensiones incompatibles: {a.shape} vs {b.shape}")
+
+    # Un solo producto matricial para todo el lote
+    producto = a @ b.T
+
+    if metrica == 'euclidiana':
+        # ||a - b||^2 = ||a||^2 + ||b||^2 - 2 a.b
+        norma_a = np.einsum('ij,ij->i', a, a)
+        norma_b = np.einsum('ij,ij->i', b, b)
+        producto *= -2.0
+        producto += norma_a[:, np.newaxis]
+        producto += norma_b[np.newaxis, :]
+        np.maximum(producto, 0.0, out=producto)  # Errores de redondeo
+        return np.sqrt(producto, out=producto)
+
+    norma_a = np.linalg.norm(a, axis=1)
+    norma_b = np.linalg.norm(b, axis=1)
+    denominador = np.outer(norma_a, norma_b)
+    np.maximum(denominador, np.finfo(np.float32).tiny, out=denominador)
+    producto /= denominador
+    np.subtract(1.0, producto, out=producto)
+    return producto
+
+def distancia_a_porcentaje(distancias, umbral=UMBRAL_DISTANCIA):
+    """
+    Mapear distancias [0, umbral] a similitud [100%, 0%]
+
+    Args:
+        distancias: Escalar o matriz de distancias
+        umbral: Distancia a partir de la cual la similitud es 0%
+
+    Returns:
+        np.ndarray: Porcentajes (0-100) con la misma forma de la entrada
+    """
+    porcentaje = (umbral - np.asarray(distancias, dtype=np.float32)) / umbral * 100.0
+    return np.clip(porcentaje, 0.0, 100.0)
+
+def matriz_similitud(consultas, plantillas, metrica='euclidiana', umbral=None):
+    """
+    Calcular la matriz de porcentajes de similitud entre dos lotes
+
+    Args:
+        consultas: Embeddings (N,128) capturados
+        plantillas: Embeddings (M,128) registrados
+        metrica: 'euclidiana' o 'coseno'
+        umbral: Distancia de corte (default: UMBRALES[metrica])
+
+    Returns:
+        np.ndarray: Matriz (N,M) de porcentajes (0-100)
+    """
+    if umbral is None:
+        umbral = UMBRALES[metrica]
+
+    distancias = matriz_distancias(consultas, plantillas, metrica)
+    return distancia_a_porcentaje(distancias, umbral)
@@ -0,0 +1,177 @@
+"""
+soak.py - Prueba de resistencia: ciclos de puerta simulados durante horas
+SmartPort v2.0
+
+Repite en el mismo proceso el trabajo de un pasajero en la puerta y cada
+--cada ciclos anota RSS, threads, objetos del GC, memoria de tracemalloc,
+camaras y conexiones abiertas. Al final reporta el crecimiento por ciclo
+(pendiente por minimos cuadrados): una fuga se ve como pendiente > 0
+sostenida, no como un valor alto puntual.
+
+Ciclos:
+    kiosko  leer_rfid() + capturar_rostro() (RFID simulado si no hay lector;
+            sin camara, capturar_rostro devuelve None igual que en produccion)
+    puerta  mqtt_gateway.atender_puerta() con un UID que no existe: hace el
+            SELECT y termina en DENEGAR, no modifica datos (no necesita broker)
+    ambos   los dos en cada ciclo
+
+Uso:
+    python soak.py --ciclo puerta --horas 4 --csv soak.csv
+    python soak.py --ciclo kiosko --ciclos 500 --rfid-timeout 1 --captura 2 --tracemalloc
+"""
+
+import argparse
+import csv
+import gc
+import sys
+import time
+import uuid
+
+import memoria
+import recursos
+
+COLUMNAS = ('ciclo', 'segundos', 'rss_kb', 'threads', 'objetos_gc', 'tracemalloc_kb',
+            'camaras_abiertas', 'conexiones_vivas', 'conexiones_abiertas')
+
+# ========================================
+# CICLOS
+# ========================================
+
+def ciclo_kiosko(args):
+    import dispositivos
+    dispositivos.leer_rfid(timeout=args.rfid_timeout)
+    dispositivos.capturar_rostro(tiempo_max=args.captura)
+
+def ciclo_puerta(args):
+    import mqtt_gateway
+    uid = uuid.uuid4().hex[:8].upper()
+    mqtt_gateway.atender_puerta(uid, mqtt_gateway.nueva_solicitud('soak'))
+
+CICLOS = {
+    'kiosko': (ciclo_kiosko,),
+    'puerta': (ciclo_puerta,),
+    'ambos': (ciclo_kiosko, ciclo_puerta)
+}
+
+# ========================================
+# MEDICION
+# ========================================
+
+def muestra(ciclo, inicio):
+    gc.collect()  # Contar solo lo que sigue vivo
+    proceso = memoria.resumen()
+    estado = recursos.estado()
+    return {
+        'ciclo': ciclo,
+        'segundos': round(time.time() - inicio, 1),
+        'rss_kb': proceso['rss_kb'],
+        'threads': proceso['threads'],
+        'objetos_gc': proceso['objetos_gc'],
+        'tracemalloc_kb': proceso['tracemalloc_kb'],
+        'camaras_abiertas': estado['camaras_abiertas'],
+        'conexiones_vivas': estado['conexiones_vivas'],
+        'conexiones_abiertas': estado['conexiones_abiertas']
+    }
+
+def pendiente(xs, ys):
+    """Pendiente por minimos cuadrados (crecimiento por ciclo)"""
+    puntos = [(x, y) for x, y in zip(xs, ys) if y is not None]
+    if len(puntos) < 2:
+        return None
+    n = len(puntos)
+    media_x = sum(x for x, _ in puntos) / n
+    media_y = sum(y for _, y in puntos) / n
+    var_x = sum((x - media_x) ** 2 for x, _ in puntos)
+    if var_x == 0:
+        return None
+    return sum((x - media_x) * (y - media_y) for x, y in puntos) / var_x
+
+# ========================================
+# CLI
+# ========================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test de ciclos de puerta")
+    parser.add_argument('--ciclo', choices=tuple(CICLOS), default='puerta')
+    parser.add_argument('--horas', type=float, default=None, help="Duracion (default: hasta --ciclos)")
+    parser.add_argument('--ciclos', type=int, default=1000)
+    parser.add_argument('--cada', type=int, default=50, help="Ciclos entre muestras")
+    parser.add_argument('--pausa', type=float, default=0.0, help="Segundos entre ciclos")
+    parser.add_argument('--rfid-timeout', type=float, default=1.0)
+    parser.add_argument('--captura', type=float, default=2.0, help="tiempo_max de capturar_rostro")
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="Activar tracemalloc y mostrar las lineas que mas crecieron")
+    parser.add_argument('--csv', help="Archivo CSV con una fila por muestra")
+    args = parser.parse_args()
+
+    pasos = CICLOS[args.ciclo]
+    limite = time.time() + args.horas * 3600 if args.horas else None
+
+    # Primer ciclo fuera de la medicion: imports, modelos y caches se cargan aqui
+    for paso in pasos:
+        paso(args)
+    if args.tracemalloc:
+        memoria.iniciar()
+
+    inicio = time.time()
+    muestras = [muestra(0, inicio)]
+    escritor = None
+    archivo = open(args.csv, 'w', newline='') if args.csv else None
+    if archivo:
+        escritor = csv.DictWriter(archivo, fieldnames=COLUMNAS)
+        escritor.writeheader()
+        escritor.writerow(muestras[0])
+
+    print(f"[INFO] Soak '{args.ciclo}': base {muestras[0]}")
+    ciclo = 0
+    try:
+        while (limite is None and ciclo < args.ciclos) or (limite is not None and time.time() < limite):
+            for paso in pasos:
+                try:
+                    paso(args)
+                except Exception as e:
+                    print(f"[ERROR] Ciclo {ciclo + 1}: {e}")
+            ciclo += 1
+            if args.pausa:
+                time.sleep(args.pausa)
+
+            if ciclo % args.cada == 0:
+                fila = muestra(ciclo, inicio)
+                muestras.append(fila)
+                if escritor:
+                    escritor.writerow(fila)
+                    archivo.flush()
+                print(f"[SOAK] ciclo {ciclo}: RSS {fila['rss_kb']} KB, threads {fila['threads']}, "
+                      f"objetos {fila['objetos_gc']}, camaras {fila['camaras_abiertas']}, "
+                      f"conexiones {fila['conexiones_vivas']}")
+    except KeyboardInterrupt:
+        print("\n[INFO] Interrumpido - resumen con las muestras tomadas")
+    finally:
+        if archivo:
+            archivo.close()
+
+    xs = [m['ciclo'] for m in muestras]
+    print("\n" + "="*60)
+    print(f"RESUMEN SOAK ({ciclo} ciclos, {time.time() - inicio:.0f}s)")
+    for columna in ('rss_kb', 'threads', 'objetos_gc', 'tracemalloc_kb',
+                    'camaras_abiertas', 'conexiones_vivas'):
+        ys = [m[columna] for m in muestras]
+        p = pendiente(xs, ys)
+        if p is None:
+            continue
+        print(f"  {columna:<20} {ys[0]!s:>10} -> {ys[-1]!s:<10} ({p:+.3f} por ciclo)")
+
+    if args.tracemalloc:
+        diferencia = memoria.diferencia(top=10)
+        print("\nLineas con mayor crecimiento (tracemalloc):")
+        for linea in diferencia['top']:
+            print(f"  {linea['crecimiento_kb']:+10.1f} KB  {linea['bloques_nuevos']:+7d}  {linea['ubicacion']}")
+    print("="*60)
+
+    # Exit 1 si quedaron threads o recursos colgando: util en CI de hardware
+    final = muestras[-1]
+    fugas = final['camaras_abiertas'] > 0 or final['threads'] > muestras[0]['threads'] + 2
+    sys.exit(1 if fugas else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""
+spool.py - Cola local store-and-forward para eventos MQTT
+SmartPort v2.0
+
+Cuando MySQL no esta disponible, el gateway guarda aqui (SQLite en modo
+WAL, append-only) los pesos del Modulo 2 y las transiciones de puerta del
+Modulo 3. Un thread los reenvia en lotes cuando la BD vuelve.
+
+Idempotencia:
+- peso:   cada evento lleva id_evento unico (columna UNIQUE en
+          pesos_equipaje), reenviarlo dos veces no duplica la fila
+- puerta: la transicion es un UPDATE a valores fijos
+          (puerta_abierta = 1, estado = 'COMPLETO'), repetible sin efecto;
+          el contador del embarque solo se mueve si el estado cambio
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import pymysql
+
+from db import get_db_connection, reclamar_eventos_peso, SQL_EMBARQUE_COMPLETO
+
+SPOOL_PATH = os.environ.get(
+    "SMARTPORT_SPOOL",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "spool", "eventos.db")
+)
+SPOOL_LOTE = int(os.environ.get("SMARTPORT_SPOOL_LOTE", "200"))
+SPOOL_INTERVALO = float(os.environ.get("SMARTPORT_SPOOL_INTERVALO", "5"))
+
+TIPO_PESO = 'peso'
+TIPO_PUERTA = 'puerta'
+
+# Errores de conectividad: el lote se deja en el spool para el siguiente intento
+ERRORES_CONEXION = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+
+_lock = threading.Lock()
+_conn = None
+
+metricas = {
+    'encolados': 0,
+    'reproducidos': 0,
+    'descartados': 0,
+    'errores_reproduccion': 0,
+    'ultima_reproduccion': None
+}
+
+def _spool():
+    """Abrir (una sola vez) la BD SQLite del spool"""
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(SPOOL_PATH), exist_ok=True)
+        _conn = sqlite3.connect(SPOOL_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS eventos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id_evento TEXT NOT NULL UNIQUE,
+                tipo TEXT NOT NULL,
+                datos TEXT NOT NULL,
+                creado REAL NOT NULL
+            )
+        """)
+        _conn.commit()
+    return _conn
+
+def nuevo_id_evento():
+    """Identificador unico de evento (32 caracteres hex)"""
+    return uuid.uuid4().hex
+
+def encolar(tipo, datos, id_evento=None):
+    """
+    Guardar un evento en el spool local
+
+    Args:
+        tipo: TIPO_PESO o TIPO_PUERTA
+        datos: dict serializable a JSON
+        id_evento: Clave de idempotencia (se genera si no se da)
+
+    Returns:
+        str: id_evento guardado
+    """
+    id_evento = id_evento or nuevo_id_evento()
+
+    with _lock:
+        conn = _spool()
+        cursor = conn.execute("""
+            INSERT OR IGNORE INTO eventos (id_evento, tipo, datos, creado)
+            VALUES (?, ?, ?, ?)
+        """, (id_evento, tipo, json.dumps(datos), time.time()))
+        conn.commit()
+        # Un id_evento ya encolado se ignora y no cuenta
+        if cursor.rowcount == 1:
+            metricas['encolados'] += 1
+
+    print(f"[SPOOL] Evento {tipo} guardado localmente ({id_evento})")
+    return id_evento
+
+def encolar_varios(tipo, eventos):
+    """
+    Guardar varios eventos del mismo tipo en una sola transaccion
+
+    Args:
+        tipo: TIPO_PESO o TIPO_PUERTA
+        eventos: Lista de (datos, id_evento o None)
+
+    Returns:
+        list: id_evento guardados
+    """
+    filas = [(id_evento or nuevo_id_evento(), tipo, json.dumps(datos), time.time())
+             for datos, id_evento in eventos]
+
+    with _lock:
+        conn = _spool()
+        cursor = conn.executemany("""
+            INSERT OR IGNORE INTO eventos (id_evento, tipo, datos, creado)
+            VALUES (?, ?, ?, ?)
+        """, filas)
+        conn.commit()
+        # rowcount suma solo las filas insertadas (sin los id_evento repetidos)
+        insertados = max(cursor.rowcount, 0)
+        metricas['encolados'] += insertados
+
+    print(f"[SPOOL] {insertados} eventos {tipo} guardados localmente ({len(filas) - insertados} repetidos)")
+    return [fila[0] for fila in filas]
+
+# ========================================
+# APLICACION DE EVENTOS EN MYSQL
+# ========================================
+
+def _aplicar_pesos(cursor, eventos):
+    """INSERT por lotes de pesos; id_evento ya registrado (pesos_eventos) no duplica"""
+    filas = reclamar_eventos_peso(cursor, [dict(d, id_evento=id_evento) for id_evento, d in eventos])
+    if not filas:
+        return
+    cursor.executemany("""
+        INSERT INTO pesos_equipaje (id_bascula, peso_kg, duracion_s, muestras, fecha_hora, id_evento)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE id_evento = id_evento
+    """, [(d.get('bascula', 'principal'), d['peso_kg'], d.get('duracion_s'), d.get('muestras'),
+           d['fecha_hora'], d['id_evento'])
+          for d in filas])
+
+def _aplicar_puertas(cursor, eventos):
+    """Transiciones de puerta (idempotentes por construccion)"""
+    for _, d in eventos:
+        cursor.execute("""
+            UPDATE accesos_puerta
+            SET puerta_abierta = 1,
+                puerta_apertura = COALESCE(%s, puerta_apertura),
+                fecha_hora = %s
+            WHERE id_acceso = %s
+        """, (d.get('puerta'), d['fecha_hora'], d['id_acceso']))
+        cursor.execute("""
+            UPDATE pasajeros
+            SET estado = 'COMPLETO'
+            WHERE id_pasajero = %s AND estado = 'ABORDADO'
+        """, (d['id_pasajero'],))
+        if cursor.rowcount > 0:
+            cursor.execute(SQL_EMBARQUE_COMPLETO, (d['id_pasajero'],))
+
+_APLICADORES = {
+    TIPO_PESO: _aplicar_pesos,
+    TIPO_PUERTA: _aplicar_puertas,
+}
+
+def _aplicar(conn, eventos):
+    """Aplicar una lista de (id_evento, tipo, datos) en una transaccion"""
+    cursor = conn.cursor()
+    try:
+        for tipo, aplicador in _APLICADORES.items():
+            del_tipo = [(e, d) for e, t, d in eventos if t == tipo]
+            if del_tipo:
+                aplicador(cursor, del_tipo)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def reproducir(lote=SPOOL_LOTE):
+    """
+    Reenviar a MySQL los eventos pendientes, en lotes y en orden de llegada
+
+    Args:
+        lote: Eventos por transaccion
+
+    Returns:
+        int: Eventos reenviados (0 si el spool esta vacio o la BD sigue caida)
+    """
+    with _lock:
+        filas = _spool().execute("""
+            SELECT id, id_evento, tipo, datos FROM eventos ORDER BY id LIMIT ?
+        """, (lote,)).fetchall()
+
+    if not filas:
+        return 0
+
+    conn = get_db_connection()
+    if not conn:
+        return 0
+
+    eventos = [(id_evento, tipo, json.loads(datos)) for _, id_evento, tipo, datos in filas]
+    aplicados = []
+    descartados = []
+
+    try:
+        try:
+            _aplicar(conn, eventos)
+            aplicados = [f[0] for f in filas]
+        except ERRORES_CONEXION:
+            raise
+        except pymysql.MySQLError as e:
+            # Error de datos en algun evento: aplicar uno a uno y descartar el invalido
+            print(f"[SPOOL] Error aplicando lote ({e}) - reintentando evento por evento")
+            for fila, evento in zip(filas, eventos):
+                try:
+                    _aplicar(conn, [evento])
+                    aplicados.append(fila[0])
+                except ERRORES_CONEXION:
+                    raise
+                except pymysql.MySQLError as e_evento:
+                    print(f"[SPOOL] Evento {evento[0]} descartado: {e_evento}")
+                    descartados.append(fila[0])
+    except ERRORES_CONEXION as e:
+        metricas['errores_reproduccion'] += 1
+        print(f"[SPOOL] BD no disponible para reproducir: {e}")
+    finally:
+        conn.close()
+
+    borrar = aplicados + descartados
+    if not borrar:
+        return 0
+
+    with _lock:
+        conn_spool = _spool()
+        conn_spool.executemany("DELETE FROM eventos WHERE id = ?", [(i,) for i in borrar])
+        conn_spool.commit()
+        metricas['reproducidos'] += len(aplicados)
+        metricas['descartados'] += len(descartados)
+        metricas['ultima_reproduccion'] = time.time()
+
+    print(f"[SPOOL] {len(aplicados)} eventos reenviados a BD ({len(descartados)} descartados)")
+    return len(aplicados)
+
+def estado():
+    """
+    Metricas del spool: tamaño en disco, antiguedad del evento mas viejo y contadores
+
+    Returns:
+        dict: pendientes, bytes, lag_segundos y metricas acumuladas
+    """
+    with _lock:
+        conn = _spool()
+        pendientes, mas_antiguo = conn.execute(
+            "SELECT COUNT(*), MIN(creado) FROM eventos"
+        ).fetchone()
+        por_tipo = dict(conn.execute(
+            "SELECT tipo, COUNT(*) FROM eventos GROUP BY tipo"
+        ).fetchall())
+        copia = dict(metricas)
+
+    # En modo WAL lo escrito vive en -wal hasta el checkpoint; -shm es su indice
+    tamano_bytes = 0
+    for sufijo in ('', '-wal', '-shm'):
+        if os.path.exists(SPOOL_PATH + sufijo):
+            tamano_bytes += os.path.getsize(SPOOL_PATH + sufijo)
+
+    return {
+        'pendientes': pendientes,
+        'por_tipo': por_tipo,
+        'bytes': tamano_bytes,
+        'lag_segundos': round(time.time() - mas_antiguo, 1) if mas_antiguo else 0,
+        **copia
+    }
+
+def _loop_reproduccion():
+    """Vaciar el spool periodicamente mientras el proceso viva"""
+    while True:
+        try:
+            while reproducir() > 0:
+                pass
+        except Exception as e:
+            print(f"[SPOOL] Error en reproduccion: {e}")
+        time.sleep(SPOOL_INTERVALO)
+
+def iniciar_reproductor():
+    """Arrancar el thread que reenvia el spool a MySQL"""
+    thread = threading.Thread(target=_loop_reproduccion, daemon=True, name='spool')
+    thread.start()
+    return thread
@@ -0,0 +1,12 @@
+"""
+conftest.py - Configuracion comun de pytest para el backend
+SmartPort v2.0
+
+Los modulos del backend se importan planos (from db import ...), igual
+que al ejecutar app.py desde backend/.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
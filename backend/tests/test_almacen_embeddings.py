@@ -0,0 +1,147 @@
+"""
+Pruebas del almacen de embeddings mapeado (almacen_embeddings.py)
+
+La BD se sustituye por una lista de filas de pasajeros que responde a la
+consulta keyset de sincronizar().
+"""
+
+import pickle
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import almacen_embeddings
+
+BASE = datetime(2024, 5, 1, 8, 0, 0)
+
+def _fecha(texto):
+    for formato in ('%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S'):
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            pass
+    raise ValueError(texto)
+
+def _vector(id_pasajero):
+    return np.full(almacen_embeddings.DIMENSION, float(id_pasajero), dtype=np.float32)
+
+def _fila(id_pasajero, segundos):
+    return {
+        'id_pasajero': id_pasajero,
+        'rostro_embedding': pickle.dumps(_vector(id_pasajero)),
+        'fecha_actualizacion': BASE + timedelta(seconds=segundos)
+    }
+
+class _CursorFalso:
+    def __init__(self, bd):
+        self.bd = bd
+        self.resultado = []
+
+    def execute(self, sql, parametros):
+        desde, ultimo_id, limite = parametros
+        clave = (_fecha(desde), ultimo_id)
+        filas = sorted((f for f in self.bd.filas
+                        if (f['fecha_actualizacion'], f['id_pasajero']) > clave),
+                       key=lambda f: (f['fecha_actualizacion'], f['id_pasajero']))
+        self.resultado = filas[:limite]
+
+    def fetchall(self):
+        self.bd.lotes += 1
+        if self.bd.entre_lotes:
+            self.bd.entre_lotes()
+        return self.resultado
+
+    def close(self):
+        pass
+
+class _BDFalsa:
+    def __init__(self, filas):
+        self.filas = list(filas)
+        self.lotes = 0
+        self.entre_lotes = None
+
+    def cursor(self):
+        return _CursorFalso(self)
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def almacen(tmp_path, monkeypatch):
+    monkeypatch.setattr(almacen_embeddings, 'ALMACEN_DIR', str(tmp_path))
+    monkeypatch.setattr(almacen_embeddings, 'SYNC_LOTE', 2)
+    monkeypatch.setattr(almacen_embeddings, '_almacen', None)
+    escritor = almacen_embeddings.AlmacenEmbeddings(escritura=True)
+    assert escritor.abrir()
+    return escritor
+
+def _conectar(monkeypatch, bd):
+    monkeypatch.setattr(almacen_embeddings, 'get_db_connection', lambda: bd)
+
+def test_sincronizar_y_obtener(almacen, monkeypatch):
+    bd = _BDFalsa([_fila(i, i) for i in range(1, 6)])
+    _conectar(monkeypatch, bd)
+
+    assert almacen.sincronizar() == 5
+    for i in range(1, 6):
+        embedding = almacen.obtener(i)
+        assert np.array_equal(embedding, _vector(i))
+        assert embedding.flags.owndata  # Copia, no vista del memmap
+
+    # Sin cambios en la BD no se vuelve a aplicar nada
+    assert almacen.sincronizar() == 0
+
+def test_consulta_entre_lotes_no_reutiliza_filas(almacen, monkeypatch):
+    """Una consulta (obtener_almacen) entre lotes de sincronizar() en el escritor"""
+    bd = _BDFalsa([_fila(1, 1), _fila(2, 2)])
+    _conectar(monkeypatch, bd)
+    assert almacen.sincronizar() == 2  # meta.json en disco: 2 filas
+
+    monkeypatch.setattr(almacen_embeddings, '_almacen', almacen)
+    bd.filas += [_fila(i, i) for i in range(3, 7)]
+    bd.entre_lotes = almacen_embeddings.obtener_almacen
+
+    assert almacen.sincronizar() == 4
+    assert bd.lotes > 2
+    assert almacen.meta['filas'] == 6
+    for i in range(1, 7):
+        assert np.array_equal(almacen.obtener(i), _vector(i)), f"pasajero {i}"
+
+    # Un lector que abre despues ve lo mismo que el escritor
+    lector = almacen_embeddings.AlmacenEmbeddings()
+    assert lector.abrir()
+    assert lector.meta['filas'] == 6
+    assert np.array_equal(lector.obtener(4), _vector(4))
+
+def test_lector_no_retrocede_filas(almacen, monkeypatch):
+    _conectar(monkeypatch, _BDFalsa([_fila(1, 1), _fila(2, 2)]))
+    almacen.sincronizar()
+
+    lector = almacen_embeddings.AlmacenEmbeddings()
+    assert lector.abrir()
+    meta = dict(lector.meta, filas=1)
+    monkeypatch.setattr(almacen_embeddings, '_leer_meta', lambda: meta)
+    lector.recargar_si_cambio()
+    assert lector.meta['filas'] == 2
+
+def test_obtener_version_obsoleta(almacen, monkeypatch):
+    _conectar(monkeypatch, _BDFalsa([_fila(1, 1)]))
+    almacen.sincronizar()
+    assert almacen.obtener(1, BASE + timedelta(seconds=1)) is not None
+    assert almacen.obtener(1, BASE + timedelta(seconds=2)) is None
+
+def test_fila_confirmada_tarde_dentro_del_margen(almacen, monkeypatch):
+    """Una transaccion que confirma despues de la pasada con una marca anterior al cursor"""
+    bd = _BDFalsa([_fila(1, 10), _fila(2, 20)])
+    _conectar(monkeypatch, bd)
+    assert almacen.sincronizar() == 2
+    cursor = (almacen.meta['ultima_sync'], almacen.meta['ultimo_id'])
+
+    bd.filas.append(_fila(3, 15))
+    assert almacen.sincronizar() == 1
+    assert np.array_equal(almacen.obtener(3), _vector(3))
+    assert (almacen.meta['ultima_sync'], almacen.meta['ultimo_id']) == cursor  # No retrocede
+
+    bd.filas.append(_fila(4, 20 - almacen_embeddings.SYNC_MARGEN - 1))
+    assert almacen.sincronizar() == 0  # Fuera del margen
@@ -0,0 +1,63 @@
+"""
+Pruebas de la ventana anti-rebote de la puerta (antirrebote.py y su
+equivalente en BD, mqtt_gateway.es_toque_repetido)
+"""
+
+import threading
+
+import pytest
+
+import antirrebote
+import mqtt_gateway
+
+@pytest.fixture(autouse=True)
+def ventana_limpia(monkeypatch):
+    monkeypatch.setattr(antirrebote, '_entradas', {})
+    monkeypatch.setattr(antirrebote, 'metricas', {'primeras': 0, 'suprimidas': 0, 'en_curso': 0})
+    monkeypatch.setattr(antirrebote, 'VENTANA_SEGUNDOS', 3.0)
+
+def test_primer_toque_y_repetido():
+    assert antirrebote.reclamar('p1', 'UID') is None
+    antirrebote.resolver('p1', 'UID', 'ABRIR')
+
+    entrada = antirrebote.reclamar('p1', 'UID')
+    assert entrada is not None
+    assert antirrebote.esperar_decision(entrada) == 'ABRIR'
+    assert antirrebote.estado()['suprimidas'] == 1
+
+def test_clave_por_puerta_y_uid():
+    assert antirrebote.reclamar('p1', 'UID') is None
+    assert antirrebote.reclamar('p2', 'UID') is None
+    assert antirrebote.reclamar('p1', 'OTRO') is None
+    assert antirrebote.estado()['primeras'] == 3
+
+def test_repetido_espera_a_la_solicitud_en_curso():
+    assert antirrebote.reclamar('p1', 'UID') is None
+    entrada = antirrebote.reclamar('p1', 'UID')
+    assert antirrebote.estado()['en_curso'] == 1
+
+    threading.Timer(0.05, antirrebote.resolver, ('p1', 'UID', 'DENEGAR')).start()
+    assert antirrebote.esperar_decision(entrada) == 'DENEGAR'
+
+def test_ventana_vencida_es_toque_nuevo(monkeypatch):
+    monkeypatch.setattr(antirrebote, 'VENTANA_SEGUNDOS', 0.0)
+    assert antirrebote.reclamar('p1', 'UID') is None
+    antirrebote.resolver('p1', 'UID', 'ABRIR')
+    assert antirrebote.reclamar('p1', 'UID') is None
+
+def test_solo_la_primera_resolucion_cuenta():
+    antirrebote.reclamar('p1', 'UID')
+    antirrebote.resolver('p1', 'UID', 'ABRIR')
+    antirrebote.resolver('p1', 'UID', 'DENEGAR')
+    assert antirrebote.esperar_decision(antirrebote.reclamar('p1', 'UID')) == 'ABRIR'
+
+def _acceso(abierta=1, puerta='p1', segundos=1):
+    return {'puerta_abierta': abierta, 'puerta_apertura': puerta, 'segundos_apertura': segundos}
+
+def test_toque_repetido_segun_la_bd():
+    assert mqtt_gateway.es_toque_repetido(_acceso(), 'p1')
+    assert not mqtt_gateway.es_toque_repetido(_acceso(), 'p2')
+    assert not mqtt_gateway.es_toque_repetido(_acceso(abierta=0), 'p1')
+    assert not mqtt_gateway.es_toque_repetido(_acceso(segundos=4), 'p1')
+    assert not mqtt_gateway.es_toque_repetido(_acceso(segundos=None, puerta=None), 'p1')
+    assert not mqtt_gateway.es_toque_repetido(None, 'p1')
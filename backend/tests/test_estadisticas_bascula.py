@@ -0,0 +1,73 @@
+"""
+Pruebas de las estadisticas incrementales por bascula (estadisticas_bascula.py)
+"""
+
+import random
+import statistics
+
+import pytest
+
+import estadisticas_bascula
+
+T0 = 1767261600.0
+
+@pytest.fixture(autouse=True)
+def basculas_limpias(monkeypatch):
+    monkeypatch.setattr(estadisticas_bascula, '_basculas', {})
+    monkeypatch.setattr(estadisticas_bascula, 'ALFA_EWMA', 0.5)
+    monkeypatch.setattr(estadisticas_bascula, 'DERIVA_DELTA', 0.1)
+    monkeypatch.setattr(estadisticas_bascula, 'DERIVA_LAMBDA', 5.0)
+
+def _registrar(pesos, bascula='b1'):
+    for i, peso in enumerate(pesos):
+        estadisticas_bascula.registrar(bascula, peso, T0 + i)
+    return estadisticas_bascula.resumen()[bascula]
+
+def test_welford_coincide_con_statistics():
+    pesos = [random.Random(1).uniform(0.1, 3.0) for _ in range(200)]
+    resumen = _registrar(pesos)
+
+    assert resumen['n'] == 200
+    assert resumen['media'] == pytest.approx(statistics.mean(pesos), abs=1e-3)
+    assert resumen['desviacion'] == pytest.approx(statistics.stdev(pesos), abs=1e-3)
+    assert resumen['minimo'] == pytest.approx(min(pesos), abs=1e-3)
+    assert resumen['maximo'] == pytest.approx(max(pesos), abs=1e-3)
+
+def test_una_muestra_sin_desviacion():
+    resumen = _registrar([1.5])
+    assert resumen['desviacion'] == 0.0
+    assert resumen['ewma'] == 1.5
+
+def test_ewma():
+    # alfa 0.5: 1.0 -> 0.5*3 + 0.5*1 = 2.0 -> 0.5*2 + 0.5*2 = 2.0
+    assert _registrar([1.0, 3.0, 2.0])['ewma'] == 2.0
+
+def test_tasa_sobrepeso():
+    resumen = _registrar([1.0, 2.5, 2.0, 3.0])
+    assert resumen['sobrepesos'] == 2  # 2.0 no supera el limite
+    assert resumen['tasa_sobrepeso'] == 0.5
+    assert resumen['ultima'] == T0 + 3
+
+def test_sin_deriva_en_serie_estable():
+    aleatorio = random.Random(2)
+    assert _registrar([1.0 + aleatorio.uniform(-0.05, 0.05) for _ in range(300)])['deriva'] is None
+
+@pytest.mark.parametrize('nuevo_nivel, direccion', [(3.0, 'SUBIDA'), (0.2, 'BAJADA')])
+def test_page_hinkley_detecta_cambio_de_nivel(nuevo_nivel, direccion):
+    resumen = _registrar([1.5] * 50 + [nuevo_nivel] * 50)
+    deriva = resumen['deriva']
+
+    assert deriva is not None
+    assert deriva['direccion'] == direccion
+    assert deriva['n'] > 50  # Despues del cambio, no antes
+
+def test_sin_deriva_antes_del_minimo_de_muestras():
+    n = estadisticas_bascula.DERIVA_MIN_MUESTRAS - 1
+    assert _registrar([0.2] * (n // 2) + [20.0] * (n - n // 2))['deriva'] is None
+
+def test_basculas_independientes():
+    estadisticas_bascula.registrar('b1', 1.0, T0)
+    estadisticas_bascula.registrar('b2', 3.0, T0)
+    resumen = estadisticas_bascula.resumen()
+    assert resumen['b1']['media'] == 1.0
+    assert resumen['b2']['media'] == 3.0
@@ -0,0 +1,71 @@
+"""
+Pruebas de la cache de mensajes ya procesados (idempotencia.py) y de las
+claves deterministas de pesos (mqtt_gateway.clave_peso / claves_lote)
+"""
+
+from collections import OrderedDict
+
+import pytest
+
+import idempotencia
+import lote_pesos
+import mqtt_gateway
+
+class _Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def time(self):
+        return self.ahora
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = _Reloj()
+    monkeypatch.setattr(idempotencia, 'time', reloj)
+    monkeypatch.setattr(idempotencia, '_claves', OrderedDict())
+    monkeypatch.setattr(idempotencia, 'metricas', {'duplicados': 0})
+    monkeypatch.setattr(idempotencia, 'TTL_SEGUNDOS', 10.0)
+    monkeypatch.setattr(idempotencia, 'MAX_CLAVES', 3)
+    return reloj
+
+def test_guardar_y_consultar(reloj):
+    assert idempotencia.consultar('puerta:p1:a') is None
+    idempotencia.guardar('puerta:p1:a', 'ABRIR')
+    assert idempotencia.consultar('puerta:p1:a') == 'ABRIR'
+    assert idempotencia.estado()['duplicados'] == 1
+
+def test_vence_con_el_ttl(reloj):
+    idempotencia.guardar('a')
+    reloj.ahora += 10.0
+    assert idempotencia.consultar('a') is None
+    assert idempotencia.estado()['claves'] == 0
+
+def test_limite_de_claves_descarta_las_mas_antiguas(reloj):
+    for clave in 'abcd':
+        idempotencia.guardar(clave)
+    assert idempotencia.consultar('a') is None
+    assert idempotencia.consultar('d') is True
+    assert idempotencia.estado()['claves'] == 3
+
+def test_guardar_de_nuevo_renueva_la_clave(reloj):
+    idempotencia.guardar('a')
+    reloj.ahora += 5.0
+    idempotencia.guardar('a', 'DENEGAR')
+    reloj.ahora += 6.0  # Pasado el TTL de la primera vez
+    assert idempotencia.consultar('a') == 'DENEGAR'
+
+def test_clave_peso_determinista():
+    clave = mqtt_gateway.clave_peso('b1', 'lectura', '1.000', '1.250')
+    assert clave == mqtt_gateway.clave_peso('b1', 'lectura', '1.000', '1.250')
+    assert len(clave) == 32
+    assert clave != mqtt_gateway.clave_peso('b2', 'lectura', '1.000', '1.250')
+
+def test_claves_lote_no_dependen_de_la_llegada():
+    payload = lote_pesos.codificar([(10.0, 1.0), (11.0, 1.1)], t_base=10)  # Reloj sin NTP
+    claves = mqtt_gateway.claves_lote('b1', payload, 2)
+    primera = lote_pesos.decodificar(payload, recibido=1767261600.0)
+    reentrega = lote_pesos.decodificar(payload, recibido=1767261700.0)
+
+    assert primera != reentrega
+    assert claves == mqtt_gateway.claves_lote('b1', payload, 2)
+    assert len(set(claves)) == 2
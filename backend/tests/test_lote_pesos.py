@@ -0,0 +1,55 @@
+"""
+Pruebas del formato binario de lotes de pesos (lote_pesos.py)
+"""
+
+import struct
+
+import pytest
+
+import lote_pesos
+
+T_BASE = 1767261600  # 2026-01-01, reloj con hora NTP
+
+def test_ida_y_vuelta():
+    lecturas = [(T_BASE + 0.0, 1.25), (T_BASE + 0.5, 1.3), (T_BASE + 1.25, -0.002)]
+    payload = lote_pesos.codificar(lecturas)
+
+    assert lote_pesos.es_lote(payload)
+    assert len(payload) == lote_pesos.CABECERA.size + 3 * lote_pesos.LECTURA.size
+    decodificadas = lote_pesos.decodificar(payload)
+    assert [t for t, _ in decodificadas] == pytest.approx([t for t, _ in lecturas])
+    assert [p for _, p in decodificadas] == pytest.approx([p for _, p in lecturas], abs=1e-3)
+
+def test_lote_vacio():
+    payload = lote_pesos.codificar([], t_base=T_BASE)
+    assert lote_pesos.decodificar(payload) == []
+
+def test_ordena_por_tiempo():
+    payload = lote_pesos.codificar([(T_BASE + 2, 2.0), (T_BASE + 1, 1.0)], t_base=T_BASE)
+    assert [p for _, p in lote_pesos.decodificar(payload)] == [1.0, 2.0]
+
+def test_reloj_sin_sincronizar_se_ancla_a_la_llegada():
+    payload = lote_pesos.codificar([(10.0, 1.0), (12.5, 2.0)], t_base=10)
+    lecturas = lote_pesos.decodificar(payload, recibido=T_BASE)
+
+    assert lecturas[-1][0] == pytest.approx(T_BASE)
+    assert lecturas[0][0] == pytest.approx(T_BASE - 2.5)
+
+def test_texto_no_es_lote():
+    assert not lote_pesos.es_lote(b'1.25')
+    assert not lote_pesos.es_lote(b'')
+
+@pytest.mark.parametrize('payload', [
+    b'SP',                                                              # truncado
+    struct.pack('<2sBHI', b'XX', 1, 0, T_BASE),                         # magic
+    struct.pack('<2sBHI', b'SP', 2, 0, T_BASE),                         # version
+    struct.pack('<2sBHI', b'SP', 1, 2, T_BASE) + struct.pack('<Ii', 0, 1000),   # faltan lecturas
+    struct.pack('<2sBHI', b'SP', 1, 0, T_BASE) + b'\x00',               # bytes de mas
+])
+def test_payload_malformado(payload):
+    with pytest.raises(ValueError):
+        lote_pesos.decodificar(payload)
+
+def test_demasiadas_lecturas():
+    with pytest.raises(ValueError):
+        lote_pesos.codificar([(T_BASE, 1.0)] * (lote_pesos.MAX_LECTURAS + 1))
@@ -0,0 +1,144 @@
+"""
+Pruebas de la importacion masiva de manifiestos (db.importar_manifiesto)
+
+La BD se sustituye por una tabla de pasajeros en memoria que entiende el
+INSERT multi-fila, la relectura de ids y commit/rollback.
+"""
+
+import pytest
+
+import db
+
+class _BDManifiesto:
+    def __init__(self, fallan=(), salto_ids=1):
+        self.pasajeros = []  # (id_pasajero, nombre_normalizado, numero_vuelo)
+        self.confirmados = []
+        self.siguiente_id = 1
+        self.salto_ids = salto_ids  # >1 simula ids intercalados con otras sesiones
+        self.fallan = set(fallan)
+        self.tras_insertar = None
+
+    def cursor(self):
+        return _CursorManifiesto(self)
+
+    def commit(self):
+        self.confirmados = list(self.pasajeros)
+
+    def rollback(self):
+        self.pasajeros = list(self.confirmados)
+
+    def close(self):
+        pass
+
+class _CursorManifiesto:
+    def __init__(self, bd):
+        self.bd = bd
+        self.rowcount = 0
+        self.lastrowid = None
+        self._resultado = []
+
+    def executemany(self, sql, parametros):
+        if 'INSERT INTO pasajeros' not in sql:
+            return
+        if any(nombre in self.bd.fallan for nombre, _ in parametros):
+            raise db.Error("Data too long for column 'nombre_normalizado'")
+        self.lastrowid = self.bd.siguiente_id
+        for nombre, vuelo in parametros:
+            self.bd.pasajeros.append((self.bd.siguiente_id, nombre, vuelo))
+            self.bd.siguiente_id += self.bd.salto_ids
+        self.rowcount = len(parametros)
+        if self.bd.tras_insertar:
+            self.bd.tras_insertar()
+
+    def execute(self, sql, parametros=()):
+        if 'SELECT id_pasajero' not in sql:
+            return
+        desde, valores = parametros[0], parametros[1:]
+        claves = set(zip(valores[::2], valores[1::2]))
+        self._resultado = [
+            {'id_pasajero': i, 'nombre_normalizado': n, 'numero_vuelo': v}
+            for i, n, v in sorted(self.bd.pasajeros) if i >= desde and (n, v) in claves
+        ]
+
+    def fetchall(self):
+        return self._resultado
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def conectar(monkeypatch):
+    def conectar(bd):
+        monkeypatch.setattr(db, 'get_db_connection', lambda: bd)
+        return bd
+    return conectar
+
+@pytest.mark.parametrize('fila, error', [
+    ('JUAN', 'objeto'),
+    ({'numero_vuelo': 1}, 'Nombre requerido'),
+    ({'nombre': 'x' * 151, 'numero_vuelo': 1}, 'demasiado largo'),
+    ({'nombre': 'Ana', 'numero_vuelo': 'AB'}, 'invalido'),
+    ({'nombre': 'Ana'}, 'invalido'),
+    ({'nombre': 'Ana', 'numero_vuelo': 10000}, 'fuera de rango'),
+])
+def test_validar_fila_invalida(fila, error):
+    datos, mensaje = db._validar_fila_manifiesto(fila)
+    assert datos is None
+    assert error in mensaje
+
+def test_validar_fila_normaliza():
+    datos, error = db._validar_fila_manifiesto({'nombre': ' ana perez ', 'numero_vuelo': ' 42 ',
+                                                 'destino': 'cancun'})
+    assert error is None
+    assert datos == ('ANA PEREZ', 42, 'CANCUN')
+    assert db._validar_fila_manifiesto({'nombre': 'Ana', 'numero_vuelo': 0})[0][2] == 'DESTINO'
+
+def test_ids_intercalados_se_releen_por_clave():
+    bd = _BDManifiesto(salto_ids=3)
+    lote = [(1, ('ANA', 1, 'X')), (2, ('LUIS', 1, 'X')), (3, ('ANA', 1, 'X'))]
+
+    ids = db._insertar_lote_pasajeros(bd.cursor(), lote)
+
+    assert ids == [1, 4, 7]
+
+def test_pasajeros_identicos_de_otra_sesion_son_ambiguos():
+    bd = _BDManifiesto()
+    # Otra sesion inserta el mismo pasajero entre el INSERT y la relectura
+    bd.tras_insertar = lambda: bd.pasajeros.append((bd.siguiente_id, 'ANA', 1))
+
+    with pytest.raises(db.Error):
+        db._insertar_lote_pasajeros(bd.cursor(), [(1, ('ANA', 1, 'X')), (2, ('LUIS', 1, 'X'))])
+
+def test_filas_insertadas_distintas_al_lote():
+    bd = _BDManifiesto()
+    cursor = bd.cursor()
+    cursor.executemany = lambda sql, parametros: setattr(cursor, 'rowcount', len(parametros) - 1)
+    with pytest.raises(db.Error):
+        db._insertar_lote_pasajeros(cursor, [(1, ('ANA', 1, 'X')), (2, ('LUIS', 1, 'X'))])
+
+def test_importar_en_lotes(conectar):
+    bd = conectar(_BDManifiesto())
+    filas = [{'nombre': f'p{i}', 'numero_vuelo': i % 3} for i in range(7)]
+
+    resultados = db.importar_manifiesto(iter(filas), tamano_lote=3)
+
+    assert [r['status'] for r in resultados] == ['ok'] * 7
+    assert [r['id_pasajero'] for r in resultados] == list(range(1, 8))
+    assert [r['fila'] for r in resultados] == list(range(1, 8))
+    assert len(bd.confirmados) == 7
+
+def test_lote_fallido_se_reintenta_fila_por_fila(conectar):
+    bd = conectar(_BDManifiesto(fallan={'MALO'}))
+    filas = [{'nombre': 'a', 'numero_vuelo': 1}, {'nombre': 'malo', 'numero_vuelo': 1},
+             'no es objeto', {'nombre': 'b', 'numero_vuelo': 1}]
+
+    resultados = db.importar_manifiesto(filas, tamano_lote=10)
+
+    assert [r['status'] for r in resultados] == ['ok', 'error', 'error', 'ok']
+    assert 'too long' in resultados[1]['error']
+    assert 'objeto' in resultados[2]['error']
+    assert [n for _, n, _ in bd.confirmados] == ['A', 'B']
+
+def test_sin_conexion(monkeypatch):
+    monkeypatch.setattr(db, 'get_db_connection', lambda: None)
+    assert db.importar_manifiesto([{'nombre': 'a', 'numero_vuelo': 1}]) is None
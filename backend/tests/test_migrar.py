@@ -0,0 +1,44 @@
+"""
+Pruebas del separador de sentencias de las migraciones (migrar.py)
+"""
+
+import migrar
+
+def test_separa_por_punto_y_coma_al_final_de_linea():
+    sql = """
+CREATE TABLE a (
+    id INT PRIMARY KEY
+);
+
+INSERT INTO a VALUES (1);
+"""
+    assert migrar.dividir_sentencias(sql) == [
+        "CREATE TABLE a (\n    id INT PRIMARY KEY\n)",
+        "INSERT INTO a VALUES (1)",
+    ]
+
+def test_descarta_comentarios_de_linea_completa():
+    sql = "-- cabecera;\n  -- indentado;\nSELECT 1;\n-- final"
+    assert migrar.dividir_sentencias(sql) == ["SELECT 1"]
+
+def test_punto_y_coma_dentro_de_la_linea_no_separa():
+    sql = "INSERT INTO t VALUES ('a;b');\nSELECT 2;"
+    assert migrar.dividir_sentencias(sql) == ["INSERT INTO t VALUES ('a;b')", "SELECT 2"]
+
+def test_ultima_sentencia_sin_punto_y_coma():
+    assert migrar.dividir_sentencias("SELECT 1;\nSELECT 2\n") == ["SELECT 1", "SELECT 2"]
+
+def test_vacio():
+    assert migrar.dividir_sentencias("") == []
+    assert migrar.dividir_sentencias("-- solo comentario\n;\n") == []
+
+def test_migraciones_del_repositorio():
+    migraciones = migrar.listar_migraciones()
+    assert [m['version'] for m in migraciones] == list(range(1, len(migraciones) + 1))
+    for migracion in migraciones:
+        with open(migracion['ruta']) as f:
+            sentencias = migrar.dividir_sentencias(f.read())
+        assert sentencias, migracion['nombre']
+        for sentencia in sentencias:
+            assert not sentencia.endswith(';')
+            assert not sentencia.startswith('--')
@@ -0,0 +1,98 @@
+"""
+Pruebas del perfilado de corrutinas del gateway asyncio (perfilado.ejecutar_async)
+"""
+
+import asyncio
+import json
+import pstats
+
+import pytest
+
+import perfilado
+
+@pytest.fixture
+def activo(tmp_path, monkeypatch):
+    monkeypatch.setattr(perfilado, 'PERFILES_DIR', str(tmp_path))
+    monkeypatch.setattr(perfilado, 'metricas', {'llamadas': 0, 'perfiladas': 0, 'errores': 0})
+    def activar(formato='pstats', rutas=None):
+        perfilado.activar(tasa=1.0, duracion_s=60, rutas=rutas, formato=formato)
+    yield activar
+    perfilado.desactivar()
+
+def _funciones(ruta):
+    return {nombre for _, _, nombre in pstats.Stats(str(ruta)).stats}
+
+def trabajo_perfilado():
+    return sum(range(1000))
+
+def trabajo_ajeno():
+    return sum(range(1000))
+
+async def _mensaje(eventos):
+    await asyncio.sleep(0)
+    trabajo_perfilado()
+    await asyncio.sleep(0.01)
+    asyncio.get_running_loop().create_task(perfilado.continuar_async(_tarea_lanzada(eventos)))
+    return 'ok'
+
+async def _tarea_lanzada(eventos):
+    await asyncio.sleep(0.01)
+    eventos.append('tarea')
+
+async def _ajeno(eventos):
+    for _ in range(5):
+        trabajo_ajeno()
+        await asyncio.sleep(0.005)
+    eventos.append('ajeno')
+
+def test_solo_se_perfilan_los_pasos_del_mensaje(activo, tmp_path):
+    activo(rutas=['mqtt:aeropuerto/peso'])
+    eventos = []
+
+    async def escenario():
+        ajeno = asyncio.ensure_future(_ajeno(eventos))
+        resultado = await perfilado.ejecutar_async('mqtt:aeropuerto/peso', _mensaje(eventos))
+        await ajeno
+        await asyncio.sleep(0.05)
+        return resultado
+
+    assert asyncio.run(escenario()) == 'ok'
+    assert sorted(eventos) == ['ajeno', 'tarea']
+
+    archivos = list(tmp_path.glob('*.prof'))
+    assert len(archivos) == 1  # Uno por mensaje, guardado al terminar la tarea lanzada
+    funciones = _funciones(archivos[0])
+    assert 'trabajo_perfilado' in funciones
+    assert '_tarea_lanzada' in funciones
+    assert 'trabajo_ajeno' not in funciones
+    assert perfilado.metricas['perfiladas'] == 1
+
+def test_excepciones_y_topic_no_seleccionado(activo, tmp_path):
+    activo(rutas=['mqtt:aeropuerto/puerta'])
+
+    async def falla():
+        await asyncio.sleep(0)
+        raise KeyError('x')
+
+    with pytest.raises(KeyError):
+        asyncio.run(perfilado.ejecutar_async('mqtt:aeropuerto/puerta/p1', falla()))
+    assert asyncio.run(perfilado.ejecutar_async('mqtt:aeropuerto/peso', _tarea_lanzada([]))) is None
+    assert len(list(tmp_path.glob('*.prof'))) == 1
+
+def test_speedscope_con_varios_pasos(activo, tmp_path):
+    activo(formato='speedscope')
+    asyncio.run(perfilado.ejecutar_async('mqtt:aeropuerto/peso', _mensaje([])))
+
+    archivo, = tmp_path.glob('*.speedscope.json')
+    perfil = json.loads(archivo.read_text())['profiles'][0]
+    abiertos = sum(1 for e in perfil['events'] if e['type'] == 'O')
+    cerrados = sum(1 for e in perfil['events'] if e['type'] == 'C')
+    assert abiertos == cerrados
+    tiempos = [e['at'] for e in perfil['events']]
+    assert tiempos == sorted(tiempos)
+
+def test_desactivado_no_envuelve(tmp_path, monkeypatch):
+    monkeypatch.setattr(perfilado, 'PERFILES_DIR', str(tmp_path))
+    perfilado.desactivar()
+    assert asyncio.run(perfilado.ejecutar_async('mqtt:x', _tarea_lanzada([]))) is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,87 @@
+"""
+Pruebas de la deteccion de maletas por bascula (pesaje.py)
+"""
+
+import pytest
+
+import pesaje
+
+T0 = 1767261600.0
+
+@pytest.fixture(autouse=True)
+def basculas_limpias(monkeypatch, tmp_path):
+    monkeypatch.setattr(pesaje, '_basculas', {})
+    monkeypatch.setattr(pesaje, 'MUESTRAS_DIR', str(tmp_path))
+    monkeypatch.setattr(pesaje, 'MUESTRAS_CRUDAS', False)
+    monkeypatch.setattr(pesaje, 'SILENCIO_RETIRO', 15.0)
+    monkeypatch.setattr(pesaje, 'TOLERANCIA_KG', 0.05)
+
+def _lecturas(pesos, paso=1.0, bascula='b1'):
+    eventos = []
+    for i, peso in enumerate(pesos):
+        eventos.extend(pesaje.procesar_lectura(peso, bascula, T0 + i * paso))
+    return eventos
+
+def test_una_maleta_un_evento():
+    eventos = _lecturas([1.00, 1.20, 1.21, 1.19, 0.0])
+
+    assert len(eventos) == 1
+    evento = eventos[0]
+    assert evento['peso_kg'] == pytest.approx(1.2, abs=1e-3)  # Promedio de la racha asentada
+    assert evento['muestras'] == 4
+    assert evento['duracion_s'] == 4.0
+    assert evento['asentada']
+    assert evento['bascula'] == 'b1'
+
+def test_cambio_de_maleta_sin_vaciar():
+    eventos = _lecturas([1.0, 1.0, 2.0, 2.0, 0.0])
+    assert [e['peso_kg'] for e in eventos] == [1.0, 2.0]
+
+def test_maleta_moviendose_no_se_parte():
+    eventos = _lecturas([1.0, 1.5, 1.52, 0.0])
+    assert len(eventos) == 1
+    assert eventos[0]['peso_kg'] == pytest.approx(1.51, abs=1e-3)
+    assert eventos[0]['muestras'] == 3
+
+def test_sin_asentar():
+    eventos = _lecturas([1.0, 0.0])
+    assert len(eventos) == 1
+    assert not eventos[0]['asentada']
+
+def test_cierre_por_silencio():
+    _lecturas([1.0, 1.0])
+    assert pesaje.revisar_basculas(T0 + 10) == []
+
+    eventos = pesaje.revisar_basculas(T0 + 1 + pesaje.SILENCIO_RETIRO + 0.1)
+    assert len(eventos) == 1
+    assert eventos[0]['duracion_s'] == 1.0  # Hasta la ultima lectura, no hasta la revision
+    assert pesaje.estado()['b1']['estado'] == 'VACIA'
+
+def test_silencio_detectado_en_la_siguiente_lectura():
+    eventos = _lecturas([1.0, 1.0, 1.0], paso=pesaje.SILENCIO_RETIRO + 1)
+    assert len(eventos) == 2
+    assert pesaje.estado()['b1']['estado'] == 'CON_MALETA'
+
+def test_lectura_invalida_solo_se_cuenta():
+    assert pesaje.procesar_lectura(None, 'b1', T0) == []
+    estado = pesaje.estado()['b1']
+    assert estado['invalidas'] == 1
+    assert estado['lecturas'] == 0
+
+def test_basculas_independientes():
+    pesaje.procesar_lectura(1.0, 'b1', T0)
+    pesaje.procesar_lectura(3.0, 'b2', T0)
+    assert pesaje.procesar_lectura(0.0, 'b1', T0 + 1)[0]['peso_kg'] == 1.0
+    assert pesaje.estado()['b2']['peso_actual'] == 3.0
+
+def test_muestras_crudas(monkeypatch, tmp_path):
+    monkeypatch.setattr(pesaje, 'MUESTRAS_CRUDAS', True)
+    pesaje.procesar_lectura(1.5, 'b1', T0)
+    pesaje.procesar_lectura(None, 'b1', T0 + 1)
+
+    archivos = list(tmp_path.iterdir())
+    assert len(archivos) == 1
+    muestras = pesaje.leer_muestras(str(archivos[0]))
+    assert muestras.itemsize == 13
+    assert list(muestras['valido']) == [1, 0]
+    assert muestras['peso'][0] == pytest.approx(1.5)
@@ -0,0 +1,66 @@
+"""
+Deduplicacion de pesos por id_evento (pesos_eventos, migracion 010)
+"""
+
+import db
+import mqtt_gateway
+
+
+class _CursorReclamo:
+    """Simula INSERT IGNORE en pesos_eventos con una PK ya poblada"""
+
+    def __init__(self, existentes=()):
+        self.tabla = {id_evento: 'otro' for id_evento in existentes}
+        self._resultado = []
+
+    def executemany(self, sql, parametros):
+        for id_evento, lote in parametros:
+            self.tabla.setdefault(id_evento, lote)
+
+    def execute(self, sql, parametros):
+        lote, = parametros
+        self._resultado = [{'id_evento': i} for i, l in self.tabla.items() if l == lote]
+
+    def fetchall(self):
+        return self._resultado
+
+
+def _fila(id_evento, fecha_hora='2026-01-01 10:00:00'):
+    return {'id_evento': id_evento, 'fecha_hora': fecha_hora, 'peso_kg': 1.0}
+
+
+def test_reclamo_descarta_existentes_y_repetidos():
+    cursor = _CursorReclamo(existentes=['a'])
+    filas = [_fila('a'), _fila('b'), _fila('b', '2026-01-02 10:00:00'), _fila('c')]
+
+    nuevas = db.reclamar_eventos_peso(cursor, filas)
+
+    assert [f['id_evento'] for f in nuevas] == ['b', 'c']
+    assert nuevas[0]['fecha_hora'] == '2026-01-01 10:00:00'
+
+
+def test_redelivery_con_otra_fecha_hora_se_descarta():
+    cursor = _CursorReclamo()
+    assert db.reclamar_eventos_peso(cursor, [_fila('a', '2026-01-01 23:59:59')])
+    assert db.reclamar_eventos_peso(cursor, [_fila('a', '2026-01-02 00:00:05')]) == []
+
+
+def test_parametros_ordenados_y_unicos():
+    assert db.parametros_reclamo_pesos(['c', 'a', 'c', 'b'], 'L') == [('a', 'L'), ('b', 'L'), ('c', 'L')]
+
+
+def test_parsear_lectura_con_y_sin_secuencia():
+    assert mqtt_gateway.parsear_lectura('  1.25;00a1b2-1f2e3d4c-7') == ('1.25', '00a1b2-1f2e3d4c-7')
+    assert mqtt_gateway.parsear_lectura('1,25') == ('1,25', None)
+    assert mqtt_gateway.parsear_lectura('1.25;') == ('1.25', None)
+    assert mqtt_gateway.parsear_lectura('1.25;con espacio') == ('1.25', None)
+
+
+def test_clave_lectura_no_depende_de_la_llegada():
+    clave = mqtt_gateway.clave_lectura('b1', '00a1b2-1f2e3d4c-7')
+    primera = mqtt_gateway._fila_lectura('b1', 1767261600.0, 1.25, clave)
+    reentrega = mqtt_gateway._fila_lectura('b1', 1767348000.0, 1.25, clave)
+
+    assert primera['id_evento'] == reentrega['id_evento']
+    assert mqtt_gateway.clave_lectura('b2', '00a1b2-1f2e3d4c-7') != clave
+    assert mqtt_gateway.clave_lectura('b1', None) is None
@@ -0,0 +1,80 @@
+"""
+Pruebas de las sesiones del kiosko y del traspaso de la camara (sesiones.py)
+"""
+
+import threading
+import time
+
+import pytest
+
+import sesiones
+
+class _AdquisicionFalsa:
+    """Libera la 'camara' en otro thread un poco despues de detener()"""
+
+    def __init__(self, registro, nombre):
+        self.registro = registro
+        self.nombre = nombre
+        self._liberada = threading.Event()
+
+    def iniciar(self):
+        self.registro.append(('abre', self.nombre))
+        return self
+
+    def detener(self):
+        def liberar():
+            time.sleep(0.05)
+            self.registro.append(('libera', self.nombre))
+            self._liberada.set()
+        threading.Thread(target=liberar).start()
+        self._liberada.wait()
+
+@pytest.fixture(autouse=True)
+def sesiones_limpias(monkeypatch):
+    monkeypatch.setattr(sesiones, '_sesiones', {})
+    monkeypatch.setattr(sesiones, 'metricas', {'abiertas': 0, 'reutilizadas': 0, 'expiradas': 0})
+
+def test_sesion_nueva_abre_la_camara_despues_de_liberar_la_anterior():
+    registro = []
+    sesiones.abrir({'id_pasajero': 1}, _AdquisicionFalsa(registro, 'a').iniciar)
+    sesiones.abrir({'id_pasajero': 2}, _AdquisicionFalsa(registro, 'b').iniciar)
+
+    assert registro == [('abre', 'a'), ('libera', 'a'), ('abre', 'b')]
+    assert sesiones.tomar(1)['adquisicion'] is None
+    assert sesiones.tomar(2)['adquisicion'].nombre == 'b'
+
+def test_liberar_camara_antes_de_la_captura_propia():
+    registro = []
+    sesiones.abrir({'id_pasajero': 1}, _AdquisicionFalsa(registro, 'sesion').iniciar)
+
+    detenidas, propia = sesiones.liberar_camara(_AdquisicionFalsa(registro, 'acceso').iniciar)
+
+    assert detenidas == 1
+    assert propia.nombre == 'acceso'
+    assert registro == [('abre', 'sesion'), ('libera', 'sesion'), ('abre', 'acceso')]
+    assert sesiones.tomar(1) is not None  # La sesion sigue vigente sin camara
+
+def test_sesiones_concurrentes_nunca_abren_dos_camaras():
+    registro = []
+    abiertas = []
+    hilos = [threading.Thread(target=sesiones.abrir,
+                              args=({'id_pasajero': i}, _AdquisicionFalsa(registro, i).iniciar))
+             for i in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    for accion, nombre in registro:
+        if accion == 'abre':
+            assert not abiertas, f"{nombre} abrio con {abiertas} aun abierta"
+            abiertas.append(nombre)
+        else:
+            abiertas.remove(nombre)
+    assert len(abiertas) == 1
+
+def test_sesion_vencida(monkeypatch):
+    monkeypatch.setattr(sesiones, 'TTL_SEGUNDOS', 0.0)
+    sesiones.abrir({'id_pasajero': 1})
+    assert sesiones.tomar(1) is None
+    assert sesiones.estado()['expiradas'] == 1
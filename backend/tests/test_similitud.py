@@ -0,0 +1,67 @@
+"""
+Pruebas del motor de similitud vectorizado (similitud.py)
+"""
+
+import numpy as np
+import pytest
+
+import similitud
+
+def _aleatorios(n, semilla):
+    return np.random.default_rng(semilla).normal(size=(n, 128)).astype(np.float32) * 0.1
+
+def test_como_matriz_sin_copia_si_ya_cumple():
+    matriz = _aleatorios(3, 0)
+    assert similitud.como_matriz(matriz) is matriz
+
+def test_como_matriz_vector_lista_y_no_contigua():
+    assert similitud.como_matriz(np.zeros(128)).shape == (1, 128)
+    assert similitud.como_matriz([[0.0] * 128] * 2).dtype == np.float32
+
+    vista = _aleatorios(4, 1)[:, ::2]
+    assert not vista.flags.c_contiguous
+    assert similitud.como_matriz(vista).flags.c_contiguous
+
+    with pytest.raises(ValueError):
+        similitud.como_matriz(np.zeros((2, 2, 128)))
+
+def test_euclidiana_coincide_con_la_directa():
+    a, b = _aleatorios(5, 2), _aleatorios(7, 3)
+    esperada = np.linalg.norm(a[:, None, :] - b[None, :, :], axis=2)
+
+    distancias = similitud.matriz_distancias(a, b)
+
+    assert distancias.shape == (5, 7)
+    np.testing.assert_allclose(distancias, esperada, rtol=1e-4, atol=1e-5)
+
+def test_misma_entrada_distancia_cero():
+    a = _aleatorios(4, 4)
+    assert np.all(np.diag(similitud.matriz_distancias(a, a)) < 1e-3)
+    assert np.all(np.diag(similitud.matriz_distancias(a, a, 'coseno')) < 1e-5)
+
+def test_coseno_coincide_con_la_directa():
+    a, b = _aleatorios(3, 5), _aleatorios(2, 6)
+    normas = np.linalg.norm(a, axis=1)[:, None] * np.linalg.norm(b, axis=1)[None, :]
+    esperada = 1.0 - (a @ b.T) / normas
+
+    np.testing.assert_allclose(similitud.matriz_distancias(a, b, 'coseno'), esperada, rtol=1e-5, atol=1e-6)
+
+def test_coseno_vector_nulo_no_divide_por_cero():
+    distancias = similitud.matriz_distancias(np.zeros(128), _aleatorios(1, 7), 'coseno')
+    assert np.all(np.isfinite(distancias))
+
+def test_errores_de_entrada():
+    with pytest.raises(ValueError):
+        similitud.matriz_distancias(np.zeros(128), np.zeros(128), 'manhattan')
+    with pytest.raises(ValueError):
+        similitud.matriz_distancias(np.zeros(128), np.zeros(64))
+
+def test_porcentaje_recorta_y_conserva_forma():
+    porcentajes = similitud.distancia_a_porcentaje(np.array([[0.0, 0.3], [0.6, 1.2]]))
+    np.testing.assert_allclose(porcentajes, [[100.0, 50.0], [0.0, 0.0]], atol=1e-4)
+
+def test_matriz_similitud_usa_umbral_de_la_metrica():
+    a = _aleatorios(2, 8)
+    distancias = similitud.matriz_distancias(a, a, 'coseno')
+    esperada = similitud.distancia_a_porcentaje(distancias, similitud.UMBRALES['coseno'])
+    np.testing.assert_allclose(similitud.matriz_similitud(a, a, 'coseno'), esperada)
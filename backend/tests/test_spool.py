@@ -0,0 +1,45 @@
+"""
+Pruebas del spool local (spool.encolar / encolar_varios / estado)
+"""
+
+import os
+
+import pytest
+
+import spool
+
+@pytest.fixture(autouse=True)
+def spool_temporal(tmp_path, monkeypatch):
+    monkeypatch.setattr(spool, 'SPOOL_PATH', str(tmp_path / 'eventos.db'))
+    monkeypatch.setattr(spool, '_conn', None)
+    monkeypatch.setattr(spool, 'metricas', dict.fromkeys(spool.metricas, 0))
+    yield
+    if spool._conn is not None:
+        spool._conn.close()
+
+def test_encolar_repetido_no_cuenta():
+    spool.encolar(spool.TIPO_PESO, {'peso_kg': 1.0}, 'a')
+    spool.encolar(spool.TIPO_PESO, {'peso_kg': 1.0}, 'a')
+
+    estado = spool.estado()
+    assert estado['pendientes'] == 1
+    assert estado['encolados'] == 1
+
+def test_encolar_varios_cuenta_solo_los_insertados():
+    spool.encolar(spool.TIPO_PESO, {'peso_kg': 1.0}, 'a')
+    ids = spool.encolar_varios(spool.TIPO_PESO, [({'peso_kg': 1.0}, 'a'),
+                                                 ({'peso_kg': 2.0}, 'b'),
+                                                 ({'peso_kg': 3.0}, None)])
+
+    assert ids[:2] == ['a', 'b']
+    estado = spool.estado()
+    assert estado['pendientes'] == 3
+    assert estado['encolados'] == 3
+    assert estado['por_tipo'] == {spool.TIPO_PESO: 3}
+
+def test_bytes_incluye_wal_y_shm():
+    spool.encolar(spool.TIPO_PUERTA, {'id_acceso': 1}, 'a')
+
+    archivos = [spool.SPOOL_PATH + sufijo for sufijo in ('', '-wal', '-shm')]
+    assert all(os.path.exists(ruta) for ruta in archivos)
+    assert spool.estado()['bytes'] == sum(os.path.getsize(ruta) for ruta in archivos)
@@ -0,0 +1,281 @@
+"""
+verificar_planes.py - Regresion de planes de ejecucion de consultas criticas
+SmartPort v2.0
+
+Ejecuta EXPLAIN sobre cada consulta caliente de db.py, kiosk.py,
+mqtt_gateway.py y dashboard.py (importando las constantes SQL_* de cada
+modulo, no copias) y falla (exit 1) si alguna hace un full
+scan (type = ALL) sobre una tabla con mas de UMBRAL_FILAS filas estimadas.
+
+Para que el plan sea realista se usa una BD de pruebas aparte, migrada
+con migrar.py y poblada con volumenes de produccion:
+
+    python verificar_planes.py --poblar            # crea/pobla aeropuerto_planes
+    python verificar_planes.py                     # solo EXPLAIN
+
+El usuario necesita permisos sobre la BD de pruebas:
+    GRANT ALL PRIVILEGES ON aeropuerto_planes.* TO 'aero_user'@'localhost';
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pymysql
+
+import dashboard
+import db
+import migrar
+import mqtt_gateway
+from db import DB_CONFIG
+
+BD_PRUEBAS = os.environ.get("SMARTPORT_BD_PLANES", "aeropuerto_planes")
+UMBRAL_FILAS = int(os.environ.get("SMARTPORT_UMBRAL_FILAS", "1000"))
+
+# Volumenes realistas (una temporada de operacion)
+VOLUMENES = {
+    'admins': 20,
+    'vuelos': 500,
+    'pasajeros': 50000,
+    'pesos_equipaje': 200000,
+    'eventos_puerta': 300000,   # ~30 dias de toques, rostros y respuestas
+    'embarques': 500,           # uno por vuelo
+}
+
+# Dispositivos de la bitacora: puertas (RFID + PUERTA) y kioscos (ROSTRO)
+PUERTAS = ['legacy'] + [f"puerta-{i}" for i in range(1, 8)]
+KIOSCOS = [f"kiosko-{i}" for i in range(1, 4)]
+DIAS_EVENTOS = 30
+
+# ========================================
+# CONSULTAS CRITICAS (el mismo texto que ejecuta el codigo)
+# ========================================
+
+def _ultimas_24h():
+    """Rango de las ultimas 24 h para las consultas de eventos"""
+    hasta = datetime.now()
+    return (hasta - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S'), hasta.strftime('%Y-%m-%d %H:%M:%S')
+
+def consultas():
+    """
+    Consultas criticas importadas de sus modulos
+
+    Returns:
+        list: (nombre, sql, parametros)
+    """
+    desde, hasta = _ultimas_24h()
+    return [
+        ('db.verificar_admin', db.SQL_VERIFICAR_ADMIN, ('6EF793C0',)),
+        ('db.listar_admins', db.SQL_LISTAR_ADMINS, ()),
+        ('db.buscar_pasajero_por_rfid', db.SQL_PASAJERO_POR_RFID, ('0000ABCD',)),
+        ('db.registrar_acceso', db.SQL_ACCESO_PASAJERO, (1,)),
+        ('kiosk.usuario_verificar_rostro', db.SQL_PASAJERO_VERIFICACION, (1,)),
+        ('mqtt_gateway.verificar_rfid_para_puerta', mqtt_gateway.SQL_PASAJERO_PUERTA, ('0000ABCD',)),
+        ('mqtt_gateway.verificar_rfid_para_puerta (reclamo)', mqtt_gateway.SQL_RECLAMAR_PUERTA, ('legacy', 1)),
+        ('mqtt_gateway.verificar_rfid_para_puerta (completo)', mqtt_gateway.SQL_COMPLETAR_PASAJERO, (1,)),
+        ('db.SQL_EMBARQUE_COMPLETO', db.SQL_EMBARQUE_COMPLETO, (1,)),
+        ('dashboard.dashboard_pesos (ultimos)', dashboard.SQL_ULTIMOS_PESOS, (50,)),
+        ('dashboard.dashboard_pesos (estadisticas)', dashboard.SQL_ESTADISTICAS_PESOS_HOY, ()),
+        ('dashboard.throughput_eventos',
+         dashboard.sql_throughput_eventos(dashboard.PERIODOS_EVENTOS['hora'], True),
+         (desde, hasta, 'legacy')),
+        ('dashboard.reintentos_eventos', dashboard.SQL_REINTENTOS_EVENTOS, ('ROSTRO', desde, hasta)),
+        ('db.abrir_embarque (conteo)', db.SQL_CONTEO_EMBARQUE, (100,)),
+        ('db.ids_pasajeros_vuelo', db.SQL_IDS_PASAJEROS_VUELO, (100,)),
+        ('db.reclamar_eventos_peso', db.SQL_EVENTOS_PESO_RECLAMADOS, ('0' * 32,)),
+    ]
+
+# ========================================
+# POBLAR BD DE PRUEBAS
+# ========================================
+
+ESTADOS = ('REGISTRADO', 'VALIDADO', 'ABORDADO', 'COMPLETO')
+
+def _evento_sintetico(i):
+    """
+    Fila i de eventos_puerta repartida en DIAS_EVENTOS dias
+
+    Las puertas generan pares toque RFID + respuesta PUERTA; los kioscos,
+    intentos faciales con reintentos del mismo pasajero.
+
+    Returns:
+        tuple: Parametros del INSERT de poblar()
+    """
+    segundos = (VOLUMENES['eventos_puerta'] - i) * DIAS_EVENTOS * 86400 // VOLUMENES['eventos_puerta']
+    id_pasajero = random.randint(1, VOLUMENES['pasajeros'])
+    uid = f"{id_pasajero - 1:08X}"
+
+    if i % 5 == 4:
+        dispositivo = KIOSCOS[i % len(KIOSCOS)]
+        similitud = round(random.uniform(30.0, 99.0), 2)
+        resultado = 'CONCEDIDO' if similitud >= 60 else 'DENEGADO'
+        return (segundos, 'ROSTRO', dispositivo, resultado, id_pasajero, uid,
+                similitud, random.randint(150, 900))
+
+    dispositivo = PUERTAS[i % len(PUERTAS)]
+    if i % 2 == 0:
+        return (segundos, 'RFID', dispositivo, 'REPETIDO' if i % 20 == 0 else 'PRIMERO',
+                None, uid, None, None)
+    return (segundos, 'PUERTA', dispositivo, 'ABRIR' if i % 10 != 1 else 'DENEGAR',
+            id_pasajero, uid, None, random.randint(5, 120))
+
+def poblar(conn):
+    """Crear filas sinteticas hasta alcanzar VOLUMENES (idempotente)"""
+    cursor = conn.cursor()
+
+    def total(tabla):
+        cursor.execute(f"SELECT COUNT(*) AS total FROM {tabla}")
+        return cursor.fetchone()['total']
+
+    faltan = VOLUMENES['admins'] - total('admins')
+    if faltan > 0:
+        cursor.executemany(
+            "INSERT IGNORE INTO admins (rfid_uid, nombre) VALUES (%s, %s)",
+            [(f"AD{i:06X}", f"ADMIN {i}") for i in range(faltan)]
+        )
+
+    cursor.executemany(
+        "INSERT IGNORE INTO vuelos (numero_vuelo, destino) VALUES (%s, 'DESTINO')",
+        [(v,) for v in range(VOLUMENES['vuelos'])]
+    )
+
+    inicio = total('pasajeros')
+    for desde in range(inicio, VOLUMENES['pasajeros'], 5000):
+        hasta = min(desde + 5000, VOLUMENES['pasajeros'])
+        cursor.executemany("""
+            INSERT INTO pasajeros (nombre_normalizado, numero_vuelo, rfid_uid, estado)
+            VALUES (%s, %s, %s, %s)
+        """, [(f"PASAJERO {i}", i % VOLUMENES['vuelos'], f"{i:08X}", ESTADOS[i % len(ESTADOS)])
+              for i in range(desde, hasta)])
+        cursor.execute("""
+            INSERT IGNORE INTO accesos_puerta (id_pasajero, porcentaje_similitud)
+            SELECT id_pasajero, 90.0 FROM pasajeros WHERE id_pasajero > %s
+        """, (desde,))
+        conn.commit()
+
+    inicio = total('pesos_equipaje')
+    for desde in range(inicio, VOLUMENES['pesos_equipaje'], 10000):
+        hasta = min(desde + 10000, VOLUMENES['pesos_equipaje'])
+        cursor.executemany("""
+            INSERT INTO pesos_equipaje (peso_kg, fecha_hora)
+            VALUES (%s, NOW() - INTERVAL %s MINUTE)
+        """, [(round(random.uniform(0.1, 3.0), 2), i) for i in range(desde, hasta)])
+        conn.commit()
+
+    # Una clave de pesos_eventos por peso, en lotes de 50 como los del gateway
+    cursor.execute("""
+        INSERT IGNORE INTO pesos_eventos (id_evento, lote, fecha_registro)
+        SELECT MD5(id_peso), MD5(id_peso DIV 50), fecha_hora FROM pesos_equipaje
+    """)
+    conn.commit()
+
+    inicio = total('eventos_puerta')
+    for desde in range(inicio, VOLUMENES['eventos_puerta'], 10000):
+        hasta = min(desde + 10000, VOLUMENES['eventos_puerta'])
+        cursor.executemany("""
+            INSERT INTO eventos_puerta (fecha_hora, tipo, dispositivo, resultado, id_pasajero,
+                                        rfid_uid, similitud, latencia_ms)
+            VALUES (NOW(3) - INTERVAL %s SECOND, %s, %s, %s, %s, %s, %s, %s)
+        """, [_evento_sintetico(i) for i in range(desde, hasta)])
+        conn.commit()
+
+    # Embarques cerrados con sus contadores y unos pocos abiertos (los del dia)
+    cursor.execute("""
+        INSERT IGNORE INTO embarques (numero_vuelo, abierto, fecha_apertura, fecha_cierre,
+                                      registrados, validados, abordados, completos)
+        SELECT v.numero_vuelo, v.numero_vuelo %% 25 = 0,
+               NOW() - INTERVAL (v.numero_vuelo %% %s) DAY,
+               IF(v.numero_vuelo %% 25 = 0, NULL, NOW() - INTERVAL (v.numero_vuelo %% %s) DAY + INTERVAL 1 HOUR),
+               SUM(p.estado = 'REGISTRADO'), SUM(p.estado = 'VALIDADO'),
+               SUM(p.estado = 'ABORDADO'), SUM(p.estado = 'COMPLETO')
+        FROM vuelos v
+        JOIN pasajeros p ON p.numero_vuelo = v.numero_vuelo
+        WHERE v.numero_vuelo < %s
+        GROUP BY v.numero_vuelo
+    """, (DIAS_EVENTOS, DIAS_EVENTOS, VOLUMENES['embarques']))
+    conn.commit()
+
+    for tabla in VOLUMENES:
+        cursor.execute(f"ANALYZE TABLE {tabla}")
+        cursor.fetchall()
+    for tabla in ('accesos_puerta', 'pesos_eventos'):
+        cursor.execute(f"ANALYZE TABLE {tabla}")
+        cursor.fetchall()
+    conn.commit()
+    cursor.close()
+
+# ========================================
+# VERIFICACION DE PLANES
+# ========================================
+
+def verificar(conn):
+    """
+    EXPLAIN de cada consulta critica
+
+    Returns:
+        list: (nombre, tabla, filas) de cada full scan encontrado
+    """
+    cursor = conn.cursor()
+    fallos = []
+
+    for nombre, sql, parametros in consultas():
+        cursor.execute("EXPLAIN " + sql, parametros)
+        plan = cursor.fetchall()
+
+        for paso in plan:
+            filas = paso.get('rows') or 0
+            full_scan = paso.get('type') == 'ALL' and filas > UMBRAL_FILAS
+            marca = 'FULL SCAN' if full_scan else 'ok'
+            print(f"  {nombre:<50} {str(paso.get('table')):<16} "
+                  f"type={str(paso.get('type')):<7} key={str(paso.get('key')):<22} "
+                  f"rows={filas:<8} {marca}")
+            if full_scan:
+                fallos.append((nombre, paso.get('table'), filas))
+
+    cursor.close()
+    return fallos
+
+def main():
+    parser = argparse.ArgumentParser(description="Regresion de planes EXPLAIN")
+    parser.add_argument('--database', default=BD_PRUEBAS)
+    parser.add_argument('--poblar', action='store_true',
+                        help="Crear/migrar la BD de pruebas y cargar volumenes realistas")
+    args = parser.parse_args()
+
+    if args.database == DB_CONFIG['database'] and args.poblar:
+        print(f"[ERROR] --poblar no se permite sobre la BD de produccion ({args.database})")
+        sys.exit(2)
+
+    try:
+        if args.poblar:
+            config = {k: v for k, v in DB_CONFIG.items() if k != 'database'}
+            conn = pymysql.connect(**config)
+            conn.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+            conn.close()
+            migrar.migrar(args.database)
+
+        conn = migrar.conectar(args.database)
+        try:
+            if args.poblar:
+                print(f"[INFO] Poblando {args.database}...")
+                poblar(conn)
+            print(f"[INFO] EXPLAIN de {len(consultas())} consultas (umbral {UMBRAL_FILAS} filas)")
+            fallos = verificar(conn)
+        finally:
+            conn.close()
+    except pymysql.MySQLError as e:
+        print(f"[ERROR] Error de BD: {e}")
+        sys.exit(2)
+
+    if fallos:
+        print(f"[ERROR] {len(fallos)} consultas con full scan:")
+        for nombre, tabla, filas in fallos:
+            print(f"  - {nombre}: {tabla} ({filas} filas)")
+        sys.exit(1)
+
+    print("[OK] Todas las consultas criticas usan indices")
+
+if __name__ == '__main__':
+    main()